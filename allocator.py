@@ -0,0 +1,102 @@
+"""Batch room allocation for pending group bookings.
+
+plan_allocation() is a pure function: given the pending groups and the
+rooms' free beds it decides, in one pass, which group goes to which room.
+
+Groups are served in priority order: earliest final_timestamp (the moment the
+whole group had accepted), then lowest group_sync_score (members accepted
+close together), then booking id. Each group keeps the room it asked for when
+that room still has space; otherwise it is placed best-fit, in the room whose
+free beds exceed the group size by the least (lowest room_no on ties), which
+keeps large gaps open for large groups that come later. Rooms are bucketed by
+free-bed count, so each placement costs O(max beds + log rooms).
+"""
+import heapq
+import math
+from collections import namedtuple
+
+Group = namedtuple('Group', 'id booked_by size requested_room final_timestamp sync_score')
+Room = namedtuple('Room', 'room_no total_beds free')
+
+
+def _number(value):
+    # final_timestamp is stored in a TEXT column; compare it numerically
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.inf
+
+
+def priority(group):
+    return (_number(group.final_timestamp), _number(group.sync_score), group.id)
+
+
+def plan_allocation(groups, rooms, housed=(), honor_requested=True):
+    """Assign groups to rooms without exceeding free beds.
+
+    housed is a set of residents who already hold an approved booking.
+    Returns (assignments, unplaced): assignments is a list of
+    (group, room_no) in priority order, unplaced a list of (group, reason).
+    """
+    free = {r.room_no: r.free for r in rooms}
+    max_free = max(free.values(), default=0)
+    # buckets[k] holds rooms that had k free beds when pushed; stale entries are skipped
+    buckets = [[] for _ in range(max_free + 1)]
+    for room_no, beds in free.items():
+        if beds > 0:
+            buckets[beds].append(room_no)
+    for bucket in buckets:
+        heapq.heapify(bucket)
+    housed = set(housed)
+    assignments, unplaced = [], []
+
+    def take(room_no, size):
+        free[room_no] -= size
+        if free[room_no] > 0:
+            heapq.heappush(buckets[free[room_no]], room_no)
+
+    for group in sorted(groups, key=priority):
+        if group.booked_by in housed:
+            unplaced.append((group, 'already housed'))
+            continue
+        if group.size <= 0:
+            unplaced.append((group, 'invalid group size'))
+            continue
+        if honor_requested and free.get(group.requested_room, 0) >= group.size:
+            room_no = group.requested_room
+        else:
+            room_no = None
+            for beds in range(group.size, max_free + 1):
+                bucket = buckets[beds]
+                while bucket and free[bucket[0]] != beds:
+                    heapq.heappop(bucket)
+                if bucket:
+                    room_no = heapq.heappop(bucket)
+                    break
+            if room_no is None:
+                unplaced.append((group, 'no room with enough free beds'))
+                continue
+        take(room_no, group.size)
+        housed.add(group.booked_by)
+        assignments.append((group, room_no))
+    return assignments, unplaced
+
+
+def report(assignments, unplaced, rooms, elapsed_ms=None):
+    """Summary dict for an allocation run (JSON-serialisable)."""
+    reasons = {}
+    for _, reason in unplaced:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    out = {
+        'assigned': len(assignments),
+        'moved': sum(1 for g, room_no in assignments if room_no != g.requested_room),
+        'beds_assigned': sum(g.size for g, _ in assignments),
+        'free_beds_before': sum(r.free for r in rooms),
+        'unplaced': len(unplaced),
+        'unplaced_reasons': reasons,
+        'assignments': [{'booking_id': g.id, 'booked_by': g.booked_by, 'size': g.size, 'requested_room': g.requested_room, 'room_no': room_no} for g, room_no in assignments],
+        'unplaced_bookings': [{'booking_id': g.id, 'booked_by': g.booked_by, 'size': g.size, 'reason': reason} for g, reason in unplaced],
+    }
+    if elapsed_ms is not None:
+        out['elapsed_ms'] = round(elapsed_ms, 2)
+    return out
@@ -1,5 +1,10 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from database import init_db, get_user, book_room, submit_service_request, submit_outing_request, get_pending_requests, update_request_status, get_heatmap_data, get_bookings_heatmap, get_user_requests, get_available_rooms, get_user_room, ensure_user, get_next_resident_login, get_profile, upsert_profile
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+from database import get_user, ensure_user, get_profile, upsert_profile, BookingRejected, OutingRejected, to_epoch, now_epoch
+# Request data may be split into per-block databases; shards routes each call (or fans it out)
+from shards import init_db, book_room, submit_service_request, submit_outing_request, get_pending_requests, update_request_status, get_heatmap_data, get_bookings_heatmap, get_user_requests, get_available_rooms, get_user_room, update_request_statuses, list_requests, allocate_pending_bookings, dispatch_service_requests, get_technicians, get_outings_during, get_next_resident_login
+import shards
 from flask_jwt_extended import (
     JWTManager,
     jwt_required,
@@ -10,10 +15,22 @@ from flask_jwt_extended import (
     unset_jwt_cookies,
 )
 from flask_cors import CORS
+from events import sse_stream, current_id, bus
+import cache
+import export
+import fragments
+from passwords import LoginBusy
+from write_queue import WriteQueueFull
+from ratelimit import AttemptLimiter
+from db_pool import start_counting, stop_counting, pool_stats
+import metrics
+import json
 import os
+import threading
 import time
+import urllib.request
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from authlib.integrations.flask_client import OAuth
 
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
 # Load environment variables (e.g., Google OAuth credentials) from backend/.env if present
@@ -30,21 +47,113 @@ app.config['JWT_COOKIE_SAMESITE'] = 'Lax'
 app.config['JWT_COOKIE_CSRF_PROTECT'] = False  # simplify for dev
 # Keep default host-only cookie domain (works for 127.0.0.1). If needed: app.config['JWT_COOKIE_DOMAIN'] = '127.0.0.1'
 jwt = JWTManager(app)
-init_db()
+# Login throttling: failed attempts per client IP and per account. Successful logins are not
+# counted, so many users behind one NAT or proxy address can still sign in
+login_ip_limiter = AttemptLimiter(int(os.environ.get('LOGIN_IP_LIMIT', '30')), 60)
+login_account_limiter = AttemptLimiter(int(os.environ.get('LOGIN_ACCOUNT_LIMIT', '5')), 300)
 
-# Configure OAuth (Google)
-oauth = OAuth(app)
+# Importing this module does no database work; create_app() migrates and seeds once per process
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+def create_app():
+    """The app with its databases ready. WSGI servers should load it through this factory,
+    e.g. gunicorn 'app:create_app()'."""
+    global _bootstrapped
+    with _bootstrap_lock:
+        if not _bootstrapped:
+            init_db()
+            _bootstrapped = True
+    return app
+
+@app.before_request
+def _bootstrap():
+    # Servers pointed straight at app:app get the same setup on their first request
+    if not _bootstrapped:
+        create_app()
+
+# Report database statements per request in an X-DB-Queries header (for tests and profiling)
+app.config['QUERY_COUNT_HEADER'] = os.environ.get('QUERY_COUNT_HEADER') == '1'
+
+@app.before_request
+def _start_query_count():
+    g._request_started = time.perf_counter()
+    if app.config['QUERY_COUNT_HEADER']:
+        g.query_count, g._query_count_token = start_counting()
+
+@app.after_request
+def _report_query_count(resp):
+    if 'query_count' in g:
+        resp.headers['X-DB-Queries'] = str(g.query_count[0])
+    if metrics.ENABLED and '_request_started' in g:
+        metrics.record_request(request.endpoint, request.method, resp.status_code, time.perf_counter() - g._request_started)
+    return resp
+
+@app.teardown_request
+def _stop_query_count(exc):
+    token = g.pop('_query_count_token', None)
+    if token is not None:
+        stop_counting(token)
+
+def current_room():
+    """The signed-in resident's approved room, looked up at most once per request."""
+    if 'resident_room' not in g:
+        g.resident_room = get_user_room(get_jwt_identity())
+    return g.resident_room
+
+# Configure OAuth (Google). authlib is loaded and the client registered on the first Google
+# login, from a discovery document cached on disk, so worker boots make no network calls.
+oauth = None
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
 GOOGLE_DISCOVERY_URL = 'https://accounts.google.com/.well-known/openid-configuration'
-if GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET:
-    oauth.register(
-        name='google',
-        client_id=GOOGLE_CLIENT_ID,
-        client_secret=GOOGLE_CLIENT_SECRET,
-        server_metadata_url=GOOGLE_DISCOVERY_URL,
-        client_kwargs={'scope': 'openid email profile'}
-    )
+GOOGLE_METADATA_CACHE = os.environ.get('GOOGLE_METADATA_CACHE', os.path.join(os.path.dirname(__file__), '.google_openid.json'))
+GOOGLE_METADATA_MAX_AGE = float(os.environ.get('GOOGLE_METADATA_MAX_AGE', '86400'))
+_google_lock = threading.Lock()
+
+def _google_metadata():
+    """Google's OpenID discovery document: the disk copy while it is fresh, else fetched
+    and saved (a stale copy is used if the fetch fails)."""
+    try:
+        with open(GOOGLE_METADATA_CACHE) as f:
+            cached = json.load(f)
+        if time.time() - os.path.getmtime(GOOGLE_METADATA_CACHE) < GOOGLE_METADATA_MAX_AGE:
+            return cached
+    except (OSError, ValueError):
+        cached = None
+    try:
+        with urllib.request.urlopen(GOOGLE_DISCOVERY_URL, timeout=10) as resp:
+            metadata = json.load(resp)
+    except (OSError, ValueError):
+        if cached is None:
+            raise
+        return cached
+    tmp = f"{GOOGLE_METADATA_CACHE}.{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp, GOOGLE_METADATA_CACHE)
+    return metadata
+
+def google_client():
+    """The Google OAuth client, or None when GOOGLE_CLIENT_ID/SECRET are not set."""
+    global oauth
+    if not (GOOGLE_CLIENT_ID and GOOGLE_CLIENT_SECRET):
+        return None
+    with _google_lock:
+        if oauth is None:
+            # authlib pulls in requests; together they are a large share of import time
+            from authlib.integrations.flask_client import OAuth
+            registry = OAuth(app)
+            # The endpoints come from the metadata itself, so authlib never fetches it
+            registry.register(
+                name='google',
+                client_id=GOOGLE_CLIENT_ID,
+                client_secret=GOOGLE_CLIENT_SECRET,
+                client_kwargs={'scope': 'openid email profile'},
+                **_google_metadata()
+            )
+            oauth = registry
+    return oauth.create_client('google')
 
 @app.route('/')
 def index():
@@ -58,20 +167,31 @@ def login():
         email = (data.get('email') or request.form.get('email', '')).strip()
         password = (data.get('password') or request.form.get('password', '')).strip()
         role = (data.get('role') or request.form.get('role', '')).strip()
-        user = get_user(email, password, role)
+        ip = request.remote_addr or ''
+        # Refuse throttled clients before spending any time on password hashing
+        wait = max(login_ip_limiter.retry_after(ip), login_account_limiter.retry_after(email.lower()))
+        if wait:
+            return jsonify({'error': 'Too many login attempts, try again later'}), 429, {'Retry-After': str(wait)}
+        try:
+            user = get_user(email, password, role)
+        except LoginBusy:
+            return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
         if user:
+            login_account_limiter.reset(email.lower())
             # Identity must be a string; put role into additional claims
             token = create_access_token(identity=email, additional_claims={'role': role})
             resp = jsonify({'token': token, 'redirect': url_for('dashboard', role=role)})
             # Set JWT into a cookie so browser navigations include auth automatically
             set_access_cookies(resp, token)
             return resp
+        login_ip_limiter.hit(ip)
+        login_account_limiter.hit(email.lower())
         return jsonify({'error': 'Invalid credentials'}), 401
     return render_template('login.html')
 
 @app.route('/login/google')
 def login_google():
-    client = oauth.create_client('google') if oauth else None
+    client = google_client()
     if client is None:
         return jsonify({'error': 'Google OAuth not configured. Set GOOGLE_CLIENT_ID/GOOGLE_CLIENT_SECRET in backend/.env'}), 500
     redirect_uri = url_for('auth_google_callback', _external=True)
@@ -79,7 +199,7 @@ def login_google():
 
 @app.route('/auth/google/callback')
 def auth_google_callback():
-    client = oauth.create_client('google') if oauth else None
+    client = google_client()
     if client is None:
         return jsonify({'error': 'Google OAuth not configured'}), 500
     token = client.authorize_access_token()
@@ -111,23 +231,98 @@ def auth_google_callback():
     set_access_cookies(resp, token_jwt)
     return resp
 
+def _dashboard_parts(role, email):
+    """name -> (data version scopes, databases they live in) for each part of a dashboard."""
+    if role == 'warden':
+        return {'queue': (['queue'], shards.paths()), 'heatmaps': (['rooms'], shards.paths())}
+    return {'resident': ([f"resident:{email}"], shards.resident_paths(email))}
+
+def _dashboard_data(part, email):
+    # Cached under the data version read just before; the heatmap memos check that version too
+    # (cache.py), so they never hand back a result from before another worker's write
+    if part == 'queue':
+        requests, counters = get_pending_requests()
+        return {'requests': [list(r) for r in requests], 'counters': counters}
+    if part == 'heatmaps':
+        return {'heatmap': [list(r) for r in get_heatmap_data()], 'bookings_heatmap': [list(r) for r in get_bookings_heatmap()]}
+    return {'requests': [list(r) for r in get_user_requests(email)], 'my_room': get_user_room(email, fresh=True), 'profile': get_profile(email)}
+
+def _conditional(role, email, parts):
+    """Versions of the dashboard parts, their ETag / Last-Modified, and a 304 response
+    when the client already has them (else None)."""
+    versions = {name: fragments.version(*_dashboard_parts(role, email)[name]) for name in parts}
+    # Residents' pages differ per person; every warden sees the same one, which names its event bus
+    etag = fragments.token(role, email if role == 'resident' else bus.epoch, sorted((n, v.key) for n, v in versions.items()))
+    changed_at = max(v.changed_at for v in versions.values())
+    last_modified = datetime.fromtimestamp(changed_at, timezone.utc) if changed_at else None
+    not_modified = None
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        not_modified = app.response_class(status=304)
+        _cache_headers(not_modified, etag, last_modified)
+    return versions, etag, last_modified, not_modified
+
+def _cache_headers(resp, etag, last_modified):
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    # Browsers keep the page but revalidate every time; shared caches must not keep it
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.update(('Cookie', 'Authorization'))
+    return resp
+
 @app.route('/dashboard/<role>')
 @jwt_required()
 def dashboard(role):
     current_email = get_jwt_identity()
     claims = get_jwt() or {}
-    if claims.get('role') != role:
+    if claims.get('role') != role or role not in ('resident', 'warden'):
         return redirect(url_for('login'))
+    parts = _dashboard_parts(role, current_email)
+    # Read before the data, so the live stream resumes from here without a gap
+    event_id = current_id()
+    versions, etag, last_modified, not_modified = _conditional(role, current_email, parts)
+    if not_modified is not None:
+        return not_modified
+
+    def data(part):
+        return fragments.get(('data', part, current_email if role == 'resident' else None), versions[part].key, lambda: _dashboard_data(part, current_email))
+
     if role == 'resident':
-        requests = get_user_requests(current_email)
-        my_room = get_user_room(current_email)
-        profile = get_profile(current_email)
-        return render_template('resident.html', requests=requests, my_room=my_room, profile=profile)
-    elif role == 'warden':
-        requests, counters = get_pending_requests()
-    heatmap = get_heatmap_data()
-    bookings_heatmap = get_bookings_heatmap()
-    return render_template('warden.html', requests=requests, heatmap=heatmap, bookings_heatmap=bookings_heatmap, counters=counters)
+        def page():
+            d = data('resident')
+            return render_template('resident.html', requests=d['requests'], my_room=d['my_room'], profile=d['profile'])
+        html = fragments.get(('page', 'resident', current_email), versions['resident'].key, page)
+    else:
+        # Each fragment is rebuilt only when its own data changed; the page around them carries
+        # this request's event id, so it is rendered every time
+        queue_html = fragments.get(('html', 'queue'), versions['queue'].key, lambda: Markup(render_template('warden_queue.html', **data('queue'))))
+        heatmaps_html = fragments.get(('html', 'heatmaps'), versions['heatmaps'].key, lambda: Markup(render_template('warden_heatmaps.html', **data('heatmaps'))))
+        html = render_template('warden.html', queue_html=queue_html, heatmaps_html=heatmaps_html, event_id=event_id)
+    return _cache_headers(app.response_class(html, mimetype='text/html'), etag, last_modified)
+
+@app.route('/dashboard/<role>/data')
+@jwt_required()
+def dashboard_data(role):
+    """Dashboard data as JSON, for refreshing parts of the page (parts=queue,heatmaps for wardens).
+
+    Each part carries a version token; ETag / If-None-Match work as for the page.
+    """
+    current_email = get_jwt_identity()
+    claims = get_jwt() or {}
+    if claims.get('role') != role or role not in ('resident', 'warden'):
+        return jsonify({'error': 'Unauthorized'}), 403
+    available = _dashboard_parts(role, current_email)
+    parts = [p for p in request.args.get('parts', '').split(',') if p] or list(available)
+    if any(p not in available for p in parts):
+        return jsonify({'error': f"parts must be among {', '.join(available)}"}), 400
+    versions, etag, last_modified, not_modified = _conditional(role, current_email, parts)
+    if not_modified is not None:
+        return not_modified
+    body = {
+        'parts': {p: fragments.get(('data', p, current_email if role == 'resident' else None), versions[p].key, lambda p=p: _dashboard_data(p, current_email)) for p in parts},
+        'versions': {p: fragments.token(versions[p].key) for p in parts},
+    }
+    return _cache_headers(jsonify(body), etag, last_modified)
 
 # [Rest of the routes (book, service, outing, approve) remain unchanged]
 @app.route('/book', methods=['POST'])
@@ -157,14 +352,17 @@ def service():
         return jsonify({'error': 'Unauthorized'}), 403
     # Require approved booking before allowing service request
     current_email = get_jwt_identity()
-    if not get_user_room(current_email):
+    if not current_room():
         return jsonify({'error': 'Booking approval required to submit service requests'}), 403
     data = request.get_json()
     # Always use the resident's approved room; ignore any client-provided room_id
-    room_id = get_user_room(current_email)
+    room_id = current_room()
     description = data.get('description', '')
-    submit_service_request(room_id, description, current_email)
-    return jsonify({'msg': 'Service request submitted'})
+    try:
+        new_id = submit_service_request(room_id, description, current_email)
+    except WriteQueueFull:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+    return jsonify({'msg': 'Service request submitted', 'id': new_id})
 
 @app.route('/outing', methods=['POST'])
 @jwt_required()
@@ -174,7 +372,7 @@ def outing():
     if claims.get('role') != 'resident':
         return jsonify({'error': 'Unauthorized'}), 403
     # Require approved booking before allowing outing request
-    if not get_user_room(current_email):
+    if not current_room():
         return jsonify({'error': 'Booking approval required to submit outing requests'}), 403
     data = request.get_json()
     resident_id = current_email
@@ -193,8 +391,107 @@ def outing():
         return jsonify({'error': 'Invalid datetime format'}), 400
     if not reason:
         return jsonify({'error': 'Reason is required'}), 400
-    submit_outing_request(resident_id, start_time, end_time)
-    return jsonify({'msg': 'Outing request submitted'})
+    try:
+        new_id = submit_outing_request(resident_id, start_time, end_time)
+    except OutingRejected as exc:
+        return jsonify({'error': str(exc)}), 409
+    except WriteQueueFull:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+    return jsonify({'msg': 'Outing request submitted', 'id': new_id})
+
+@app.route('/export/<dataset>')
+@jwt_required()
+def export_data(dataset):
+    """Stream bookings, service_requests, outings or occupancy as CSV (default) or NDJSON (wardens only).
+
+    Optional filters: status=approved,rejected and from/to (ISO dates, to is exclusive).
+    """
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    if dataset not in export.DATASETS:
+        return jsonify({'error': 'Unknown export'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    statuses = [s for s in (request.args.get('status') or '').split(',') if s] or None
+    try:
+        start = to_epoch(request.args['from']) if request.args.get('from') else None
+        end = to_epoch(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO dates'}), 400
+    headers = {'Content-Disposition': f'attachment; filename={dataset}.{fmt}'}
+    return Response(export.stream(dataset, fmt, statuses, start, end, shards.paths()), mimetype=export.FORMATS[fmt], headers=headers)
+
+@app.route('/outings/out')
+@jwt_required()
+def outings_out():
+    """Residents out right now, or during ?from=...&to=... (ISO times). status=all includes pending outings."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        if request.args.get('from') or request.args.get('to'):
+            start = to_epoch(request.args['from'])
+            end = to_epoch(request.args['to'])
+        else:
+            start = now_epoch()
+            end = start + 1
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Pass both from and to as ISO datetimes'}), 400
+    if end <= start:
+        return jsonify({'error': 'to must be after from'}), 400
+    statuses = ('approved', 'pending') if request.args.get('status') == 'all' else ('approved',)
+    return jsonify(get_outings_during(start, end, statuses))
+
+@app.route('/approve/batch', methods=['PUT', 'POST'])
+@jwt_required()
+def approve_batch():
+    """Apply a list of {type, id, status, reason} decisions in one transaction."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'Expected a list of {type, id, status, reason} items'}), 400
+    results = update_request_statuses(items)
+    applied = sum(1 for r in results if r['ok'])
+    return jsonify({'results': results, 'applied': applied, 'failed': len(results) - applied})
+
+@app.route('/allocate', methods=['POST'])
+@jwt_required()
+def allocate():
+    """Allocate all pending bookings in one pass; dry_run (default true) only reports the plan."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json(silent=True) or {}
+    dry_run = data.get('dry_run', True) is not False
+    honor_requested = data.get('honor_requested', True) is not False
+    return jsonify(allocate_pending_bookings(dry_run=dry_run, honor_requested=honor_requested))
+
+@app.route('/dispatch', methods=['POST'])
+@jwt_required()
+def dispatch_requests():
+    """Assign waiting service requests to technicians by priority; dry_run (default true) only reports the plan."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json(silent=True) or {}
+    dry_run = data.get('dry_run', True) is not False
+    limit = data.get('limit')
+    if limit is not None and (not isinstance(limit, int) or limit < 0):
+        return jsonify({'error': 'limit must be a non-negative integer'}), 400
+    return jsonify(dispatch_service_requests(limit=limit, dry_run=dry_run))
+
+@app.route('/api/warden/technicians')
+@jwt_required()
+def technicians():
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({'technicians': get_technicians()})
 
 @app.route('/approve/<type>/<int:id>', methods=['PUT'])
 @jwt_required()
@@ -205,9 +502,97 @@ def approve(type, id):
     data = request.get_json()
     status = data.get('status')
     reason = data.get('reason')
-    update_request_status(type, id, status, reason)
+    try:
+        update_request_status(type, id, status, reason)
+    except BookingRejected as e:
+        return jsonify({'error': str(e)}), 409
     return jsonify({'msg': f"{type} updated"})
 
+@app.route('/events/warden')
+@jwt_required()
+def warden_events():
+    """Server-Sent Events stream of pending-queue and heatmap deltas for wardens."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    # EventSource resends the last id it saw after a reconnect; the first connect passes the
+    # page's id as last_id
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    resp = Response(sse_stream(last_id), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@app.route('/stats/cache')
+@jwt_required()
+def cache_stats():
+    """Hit/miss counters for the cached dashboard aggregates (wardens only)."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify(dict(cache.stats(), fragments=fragments.stats()))
+
+def _metrics_allowed():
+    """Scrapers authenticate with METRICS_TOKEN; without one, only local requests are served."""
+    token = os.environ.get('METRICS_TOKEN')
+    if token:
+        return request.headers.get('Authorization') == f'Bearer {token}'
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Query, endpoint, cache and pool metrics in the Prometheus text format."""
+    if not _metrics_allowed():
+        return jsonify({'error': 'Unauthorized'}), 403
+    cache_stats = cache.stats()
+    pools = pool_stats()
+    extra = {
+        'hostel_cache_hits_total': ('Cache hits by cached function.', {(('cache', n),): s['hits'] for n, s in cache_stats.items()}, 'counter'),
+        'hostel_cache_misses_total': ('Cache misses by cached function.', {(('cache', n),): s['misses'] for n, s in cache_stats.items()}, 'counter'),
+        'hostel_cache_entries': ('Live cache entries by cached function.', {(('cache', n),): s['entries'] for n, s in cache_stats.items()}),
+        'hostel_db_pool_idle': ('Idle pooled connections.', {(('db', p),): s['idle'] for p, s in pools.items()}),
+    }
+    return Response(metrics.render_prometheus(extra), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/slow-queries')
+def slow_queries():
+    """Most recent statements over SLOW_QUERY_MS, with their query plans."""
+    if not _metrics_allowed():
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({'threshold_ms': metrics.SLOW_QUERY_MS, 'queries': metrics.slow_queries()})
+
+def _list_args():
+    """Common query-string options for the paginated request listings."""
+    types = [t for t in (request.args.get('type') or '').split(',') if t] or None
+    return {
+        'types': types,
+        'status': request.args.get('status') or None,
+        'room': request.args.get('room', type=int),
+        'cursor': request.args.get('cursor'),
+        'limit': request.args.get('limit', 50, type=int),
+        'include_total': request.args.get('total') in ('1', 'true'),
+    }
+
+@app.route('/api/requests')
+@jwt_required()
+def api_requests():
+    """Paginated warden listing; defaults to the pending queue (status=all lists every status)."""
+    claims = get_jwt() or {}
+    if claims.get('role') != 'warden':
+        return jsonify({'error': 'Unauthorized'}), 403
+    args = _list_args()
+    if args['status'] is None:
+        args['status'] = 'pending'
+    elif args['status'] == 'all':
+        args['status'] = None
+    return jsonify(list_requests(resident=request.args.get('resident') or None, **args))
+
+@app.route('/api/me/requests')
+@jwt_required()
+def api_my_requests():
+    """Paginated request history for the signed-in resident."""
+    return jsonify(list_requests(resident=get_jwt_identity(), with_room_services=True, **_list_args()))
+
 @app.route('/rooms/available')
 @jwt_required()
 def rooms_available():
@@ -217,9 +602,7 @@ def rooms_available():
 @app.route('/me/booking-status')
 @jwt_required()
 def me_booking_status():
-    email = get_jwt_identity()
-    approved_room = get_user_room(email)
-    return jsonify({'approved_room': approved_room})
+    return jsonify({'approved_room': current_room()})
 
 @app.route('/logout', methods=['POST'])
 def logout():
@@ -254,4 +637,4 @@ def next_resident():
     return jsonify({'next': next_login})
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app().run(debug=True, port=5000)
\ No newline at end of file
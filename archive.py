@@ -0,0 +1,83 @@
+"""Move long-resolved requests out of the hot tables.
+
+Approved/rejected service requests and outings, and rejected bookings,
+whose decision is older than ARCHIVE_AFTER_DAYS move to the *_archive
+tables in chunks of chunk_size rows. Each chunk is one short transaction, so
+memory stays bounded and other writers are never blocked for long. Approved
+bookings are live room assignments and stay where they are, and so do
+approved outings that have not ended yet (the overlap check and "who is out"
+need them). Reads that show history (get_user_requests, list_requests, the
+service heatmap) union the archive tables back in.
+
+    python archive.py [--days 90] [--chunk 1000]
+"""
+import os
+import time
+
+import cache
+import database
+
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+
+# table -> extra condition for a resolved row to be archivable
+ARCHIVABLE = {
+    'service_requests': "status IN ('approved', 'rejected')",
+    'outings': "status IN ('approved', 'rejected') AND IFNULL(end_epoch, 0) < :wall_cutoff",
+    'bookings': "status = 'rejected'",
+}
+
+
+def _columns(c, table):
+    c.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in c.fetchall()]
+
+
+def archive_resolved(max_age_days=None, chunk_size=1000, now=None):
+    """Archive resolved rows older than max_age_days; returns rows moved per table."""
+    age = (ARCHIVE_AFTER_DAYS if max_age_days is None else max_age_days) * 86400
+    now = time.time() if now is None else now
+    params = {'cutoff': int(now - age), 'wall_cutoff': database.now_epoch() - int(age), 'now': int(now)}
+    moved = {}
+    for table, condition in ARCHIVABLE.items():
+        moved[table] = 0
+        with database.get_conn() as conn:
+            c = conn.cursor()
+            # Columns both tables share, so a column added to one side later is not a blocker
+            archive_columns = set(_columns(c, f"{table}_archive"))
+            columns = ', '.join(col for col in _columns(c, table) if col in archive_columns)
+            while True:
+                c.execute("BEGIN IMMEDIATE")
+                c.execute(
+                    f"SELECT id FROM {table} WHERE resolved_at < :cutoff AND status != 'pending' AND {condition} ORDER BY resolved_at LIMIT {int(chunk_size)}",
+                    params,
+                )
+                ids = [row[0] for row in c.fetchall()]
+                if not ids:
+                    conn.rollback()
+                    break
+                marks = ','.join('?' * len(ids))
+                c.execute(f"INSERT OR REPLACE INTO {table}_archive ({columns}, archived_at) SELECT {columns}, ? FROM {table} WHERE id IN ({marks})", [params['now']] + ids)
+                c.execute(f"DELETE FROM {table} WHERE id IN ({marks})", ids)
+                conn.commit()
+                moved[table] += len(ids)
+                if len(ids) < chunk_size:
+                    break
+    if moved['service_requests']:
+        cache.invalidate('heatmap', key=database.db_path())
+    if moved['bookings']:
+        cache.invalidate('next_resident', key=database.db_path())
+    return moved
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=float, default=None)
+    parser.add_argument('--chunk', type=int, default=1000)
+    args = parser.parse_args()
+    import shards
+    shards.init_db()
+    # Every block database is archived in turn (just DB_PATH without HOSTEL_BLOCKS)
+    for path in shards.paths():
+        with database.use_db(path):
+            print(path, archive_resolved(args.days, args.chunk))
@@ -0,0 +1,92 @@
+"""Allocation-day benchmark: 10k pending groups into 2k rooms.
+
+Times the pure planner (allocator.plan_allocation) and the full database
+run (allocate_pending_bookings, dry run and applied), then checks no room
+is over capacity and nobody got two rooms. Compares bed utilisation
+with first-come, requested-room-only approval.
+
+    python benchmarks/bench_allocator.py [--groups 10000] [--rooms 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import allocator  # noqa: E402
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _workload(groups, rooms, seed=11):
+    rnd = random.Random(seed)
+    room_list = [allocator.Room(1000 + i, rnd.choice((2, 3, 4, 4, 6)), 0) for i in range(rooms)]
+    room_list = [r._replace(free=r.total_beds) for r in room_list]
+    popular = [r.room_no for r in room_list[:rooms // 10]]
+    base = 1_760_000_000_000
+    group_list = []
+    for i in range(groups):
+        accept = sorted(base + rnd.randint(0, 3_600_000) for _ in range(rnd.choice((1, 1, 2, 2, 3, 4))))
+        final = accept[-1]
+        # Demand is skewed towards a few popular rooms
+        requested = rnd.choice(popular) if rnd.random() < 0.6 else rnd.choice(room_list).room_no
+        group_list.append(allocator.Group(i + 1, f"group{i}@hostel.com", len(accept), requested, final, final - sum(accept) / len(accept)))
+    return group_list, room_list
+
+
+def _first_come(groups, rooms):
+    free = {r.room_no: r.free for r in rooms}
+    placed = 0
+    for g in sorted(groups, key=lambda g: g.id):
+        if free.get(g.requested_room, 0) >= g.size:
+            free[g.requested_room] -= g.size
+            placed += g.size
+    return placed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=10000)
+    parser.add_argument('--rooms', type=int, default=2000)
+    args = parser.parse_args()
+    groups, rooms = _workload(args.groups, args.rooms)
+    start = time.perf_counter()
+    assignments, unplaced = allocator.plan_allocation(groups, rooms)
+    plan_ms = (time.perf_counter() - start) * 1000
+    capacity = sum(r.free for r in rooms)
+    beds = sum(g.size for g, _ in assignments)
+    print(f"planner: {len(groups)} groups into {len(rooms)} rooms ({capacity} beds) in {plan_ms:.1f} ms")
+    print(f"  beds filled {beds}/{capacity}; first-come requested-room approval fills {_first_come(groups, rooms)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        with database.get_conn() as conn:
+            conn.execute("DELETE FROM rooms")
+            conn.executemany("INSERT INTO rooms (room_no, total_beds) VALUES (?, ?)", [(r.room_no, r.total_beds) for r in rooms])
+            conn.executemany(
+                "INSERT INTO bookings (id, room_id, group_id, final_timestamp, group_sync_score, status, booked_by, roommates_count) VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
+                [(g.id, g.requested_room, f"g{g.id}", g.final_timestamp, g.sync_score, g.booked_by, g.size) for g in groups],
+            )
+            conn.commit()
+        dry = database.allocate_pending_bookings(dry_run=True)
+        applied = database.allocate_pending_bookings(dry_run=False)
+        assert dry['assignments'] == applied['assignments']
+        with database.get_conn() as conn:
+            over = conn.execute(
+                "SELECT COUNT(*) FROM rooms r JOIN (SELECT room_id, SUM(roommates_count) s FROM bookings WHERE status = 'approved' GROUP BY room_id) b ON b.room_id = r.room_no WHERE b.s > r.total_beds"
+            ).fetchone()[0]
+            dupes = conn.execute("SELECT COUNT(*) FROM (SELECT booked_by FROM bookings WHERE status = 'approved' GROUP BY booked_by HAVING COUNT(*) > 1)").fetchone()[0]
+        close_pools()
+    assert over == 0 and dupes == 0
+    print(f"database dry run: {dry['elapsed_ms']:.1f} ms; applied: {applied['elapsed_ms']:.1f} ms")
+    summary = {k: v for k, v in applied.items() if k not in ('assignments', 'unplaced_bookings')}
+    print(f"report: {summary}")
+    print("OK: no room over capacity, no resident placed twice")
+
+
+if __name__ == '__main__':
+    main()
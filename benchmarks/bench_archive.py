@@ -0,0 +1,92 @@
+"""Archival of resolved requests: throughput, memory and read transparency.
+
+Seeds --rows resolved services/outings/bookings decided a year ago plus a
+small pending slice. It times the pending queue and a resident's history,
+archives everything older than 90 days, then times them again. It checks
+that get_user_requests returns the same rows before and after, that no
+dashboard data version moved (so no cached page is dropped), and reports
+the peak Python memory used by the archival run (it should not grow with
+--rows).
+
+    python benchmarks/bench_archive.py [--rows 300000] [--chunk 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import archive  # noqa: E402
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(rows):
+    database.init_db()
+    old = int(time.time()) - 365 * 86400
+    per_type = rows // 3
+    status = lambda i: 'pending' if i % 100 == 0 else ('approved' if i % 2 else 'rejected')  # noqa: E731
+    resolved = lambda i: None if i % 100 == 0 else old  # noqa: E731
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.executemany("INSERT INTO service_requests (room_id, description, resident_id, status, resolved_at) VALUES (?, 'Fan', ?, ?, ?)",
+                      ((101 + i % 10, f"resident{i % 60 + 1}@hostel.com", status(i), resolved(i)) for i in range(per_type)))
+        # Spread over the past year so the outing_intervals R*Tree has realistic boxes
+        c.executemany("INSERT INTO outings (resident_id, start_time, end_time, start_epoch, end_epoch, status, resolved_at) VALUES (?, '', '', ?, ?, ?, ?)",
+                      ((f"resident{i % 60 + 1}@hostel.com", old - i * 97, old - i * 97 + 7200, status(i), resolved(i)) for i in range(per_type)))
+        c.executemany("INSERT INTO bookings (room_id, group_id, status, booked_by, roommates_count, resolved_at) VALUES (?, 'g', ?, ?, 1, ?)",
+                      ((101 + i % 10, 'pending' if i % 100 == 0 else 'rejected', f"resident{i % 60 + 1}@hostel.com", resolved(i)) for i in range(per_type)))
+        conn.commit()
+
+
+def _versions():
+    with database.get_conn() as conn:
+        return conn.execute("SELECT scope, version FROM data_versions ORDER BY scope").fetchall()
+
+
+def _time(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=300000)
+    parser.add_argument('--chunk', type=int, default=1000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        _seed(args.rows)
+        pending = lambda: database.get_pending_requests()  # noqa: E731
+        history = lambda: database.get_user_requests('resident7@hostel.com')  # noqa: E731
+        before = sorted(history())
+        heatmap = database.get_heatmap_data.uncached()
+        timings = [(_time(pending), _time(history))]
+        versions = _versions()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        moved = archive.archive_resolved(max_age_days=90, chunk_size=args.chunk)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        total = sum(moved.values())
+        print(f"archived {moved} in {elapsed:.1f} s ({total / elapsed:.0f} rows/s), peak Python memory {peak / 1024:.0f} KiB")
+
+        timings.append((_time(pending), _time(history)))
+        assert sorted(history()) == before, 'history changed after archival'
+        assert database.get_heatmap_data.uncached() == heatmap, 'heatmap changed after archival'
+        assert _versions() == versions, 'archival bumped dashboard data versions'
+        assert archive.archive_resolved(max_age_days=90) == {t: 0 for t in archive.ARCHIVABLE}
+        for label, (p, h) in zip(('hot+cold', 'after'), timings):
+            print(f"{label:9s} pending queue {p:8.2f} ms   resident history {h:8.2f} ms")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
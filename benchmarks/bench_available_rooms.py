@@ -0,0 +1,80 @@
+"""Scaling of get_available_rooms() from 10 to 5,000 rooms.
+
+Compares the previous per-room implementation (two queries per room) with
+the single aggregated query, checks both return the same payload and
+prints milliseconds per call.
+
+    python benchmarks/bench_available_rooms.py [--sizes 10,100,1000,5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def legacy_available_rooms():
+    # The original implementation: two queries per room
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT room_no, total_beds FROM rooms ORDER BY room_no")
+        rooms = c.fetchall()
+        result = []
+        for room_no, total_beds in rooms:
+            c.execute("SELECT IFNULL(SUM(roommates_count),0) FROM bookings WHERE room_id = ? AND status = 'approved'", (room_no,))
+            occupied = c.fetchone()[0]
+            c.execute("SELECT booked_by FROM bookings WHERE room_id = ? AND status = 'approved'", (room_no,))
+            occupants = [row[0] for row in c.fetchall()]
+            resident_logins = [(email.split('@')[0] if isinstance(email, str) and '@' in email else str(email)) for email in occupants]
+            result.append({'room_no': room_no, 'total_beds': total_beds, 'available': max(total_beds - occupied, 0), 'residents': resident_logins})
+    return result
+
+
+def _seed(rooms):
+    database.init_db()
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM rooms")
+        c.executemany("INSERT INTO rooms (room_no, total_beds) VALUES (?, ?)", [(1000 + i, 4) for i in range(rooms)])
+        # Roughly half the beds taken, plus some pending/rejected noise
+        rows = []
+        for i in range(rooms):
+            for k in range(2):
+                rows.append((1000 + i, f"r{i}_{k}@hostel.com", 'approved'))
+            rows.append((1000 + i, f"p{i}@hostel.com", 'pending' if i % 2 else 'rejected'))
+        c.executemany("INSERT INTO bookings (room_id, booked_by, status, roommates_count) VALUES (?, ?, ?, 1)", rows)
+        conn.commit()
+    database.rebuild_occupancy()
+
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,100,1000,5000')
+    args = parser.parse_args()
+    print(f"{'rooms':>6} {'legacy ms':>10} {'set-based ms':>13} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_PATH = os.path.join(tmp, 'hostel.db')
+            _seed(size)
+            assert legacy_available_rooms() == database.get_available_rooms()
+            repeat = max(3, 2000 // size)
+            old = _time(legacy_available_rooms, repeat)
+            new = _time(database.get_available_rooms, repeat)
+            close_pools()
+        print(f"{size:6d} {old:10.2f} {new:13.2f} {old / new:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""1,000 single warden decisions vs one batch.
+
+Seeds pending services, outings and bookings (more booking demand than
+beds), then applies the same decisions once through update_request_status
+per item and once through update_request_statuses. Checks both leave the
+same statuses behind and prints timings plus the batch's capacity rejections.
+Finally checks that an item with an unknown status is refused on its own.
+
+    python benchmarks/bench_batch_approve.py [--items 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(items):
+    database.init_db()
+    per_type = items // 3
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.executemany("INSERT INTO service_requests (room_id, description, resident_id) VALUES (?, 'Bulb', ?)", [(101 + i % 10, f"resident{i % 60 + 1}@hostel.com") for i in range(per_type)])
+        c.executemany("INSERT INTO outings (resident_id, start_time, end_time) VALUES (?, '2026-01-01T10:00', '2026-01-01T12:00')", [(f"resident{i % 60 + 1}@hostel.com",) for i in range(per_type)])
+        # 10 rooms x 4 beds, so most of these approvals must be refused
+        c.executemany("INSERT INTO bookings (room_id, booked_by, status, roommates_count) VALUES (?, ?, 'pending', 1)", [(101 + i % 10, f"batch{i}@hostel.com") for i in range(items - 2 * per_type)])
+        conn.commit()
+    decisions = []
+    for type, table in (('service', 'service_requests'), ('outing', 'outings'), ('booking', 'bookings')):
+        with database.get_conn() as conn:
+            ids = [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE status = 'pending' ORDER BY id")]
+        for n, id in enumerate(ids):
+            status = 'rejected' if n % 5 == 0 else 'approved'
+            decisions.append({'type': type, 'id': id, 'status': status, 'reason': 'bulk' if status == 'rejected' else None})
+    return decisions
+
+
+def _snapshot():
+    with database.get_conn() as conn:
+        return [conn.execute(f"SELECT id, status FROM {t} ORDER BY id").fetchall() for t in ('service_requests', 'outings', 'bookings')]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=1000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'single.db')
+        decisions = _seed(args.items)
+        start = time.perf_counter()
+        refused_single = 0
+        for d in decisions:
+            try:
+                database.update_request_status(d['type'], d['id'], d['status'], d['reason'])
+            except database.BookingRejected:
+                refused_single += 1
+        single = time.perf_counter() - start
+        expected = _snapshot()
+
+        database.DB_PATH = os.path.join(tmp, 'batch.db')
+        decisions = _seed(args.items)
+        start = time.perf_counter()
+        results = database.update_request_statuses(decisions)
+        batch = time.perf_counter() - start
+        assert _snapshot() == expected, "batch and single approvals disagree"
+        first = decisions[0]
+        bogus = database.update_request_statuses([dict(first, status='lol'), dict(first, status='pending')])
+        assert not bogus[0]['ok'] and 'status must be one of' in bogus[0]['error'] and bogus[1]['ok'], bogus
+        assert all(status != 'lol' for rows in _snapshot() for _, status in rows)
+        close_pools()
+    refused = [r for r in results if not r['ok']]
+    assert len(refused) == refused_single
+    print(f"{len(decisions)} single approvals: {single * 1000:8.1f} ms ({len(decisions) / single:8.0f}/s)")
+    print(f"one batch of {len(decisions)}:      {batch * 1000:8.1f} ms ({len(decisions) / batch:8.0f}/s)  speedup {single / batch:.1f}x")
+    print(f"capacity rejections reported per item: {len(refused)} (e.g. {refused[0] if refused else '-'})")
+
+
+if __name__ == '__main__':
+    main()
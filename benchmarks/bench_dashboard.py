@@ -0,0 +1,151 @@
+"""Warden and resident dashboard renders: uncached, cached and 304.
+
+Seeds a hostel with a long pending queue, then times GET /dashboard/warden
+through the test client with the fragment cache cleared before each request
+(full render), with it warm (cached page), with If-None-Match (304), and after
+an outing request, which only touches the queue (the heatmaps fragment is
+reused). It checks that every write changes the ETag and the page, that
+unrelated writes leave a resident's ETag alone, that /dashboard/<role>/data
+agrees, that an approval made by another process shows up (and lets the
+resident file requests) although this one had looked up the resident's room
+and cached the heatmaps, that the heatmaps are served from the patched memo
+after this process files a request, and that the live stream picks up from
+the event id rendered into the page.
+
+    python benchmarks/bench_dashboard.py [--requests 2000] [--repeat 200]
+"""
+import argparse
+import itertools
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+_days = itertools.count()
+
+
+def _outing(email):
+    day = date(2026, 3, 1) + timedelta(days=next(_days))
+    database.submit_outing_request(email, f"{day}T10:00", f"{day}T18:00")
+
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e3 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        import app as hostel  # noqa: E402
+        import fragments  # noqa: E402
+        # The templates sit next to the code in this checkout
+        hostel.app.template_folder = ROOT
+        client = hostel.create_app().test_client()
+        for n in range(1, 21):
+            database.book_room(101 + (n - 1) % 10, f"g{n}", 0, 0, f"resident{n}@hostel.com", 1)
+        for booking_id in range(1, 11):
+            database.update_request_status('booking', booking_id, 'approved', None)
+        with database.get_conn() as conn:
+            conn.executemany("INSERT INTO service_requests (room_id, description, resident_id) VALUES (?, ?, ?)",
+                             [(101 + i % 10, 'Leaking tap', f"resident{1 + i % 10}@hostel.com") for i in range(args.requests)])
+            conn.commit()
+
+        def login(email, role):
+            token = client.post('/login', json={'email': email, 'password': 'pass123', 'role': role}).get_json()['token']
+            return {'Authorization': f'Bearer {token}'}
+
+        warden, resident = login('warden@hostel.com', 'warden'), login('resident1@hostel.com', 'resident')
+
+        def get(headers, path='/dashboard/warden', etag=None):
+            r = client.get(path, headers=dict(headers, **({'If-None-Match': etag} if etag else {})))
+            assert r.status_code in (200, 304), r.status_code
+            return r
+
+        def cold():
+            fragments.clear()
+            get(warden)
+
+        full = _time(cold, max(1, args.repeat // 10))
+        first = get(warden)
+        cached = _time(lambda: get(warden), args.repeat)
+        assert get(warden, etag=first.headers['ETag']).status_code == 304
+        not_modified = _time(lambda: get(warden, etag=first.headers['ETag']), args.repeat)
+        mine = get(resident, '/dashboard/resident')
+
+        before = fragments.stats()['misses']
+        _outing('resident5@hostel.com')
+        after_write = get(warden)
+        # Queue fragment and its data were rebuilt; the heatmaps were not
+        assert fragments.stats()['misses'] - before == 2, fragments.stats()
+        assert after_write.headers['ETag'] != first.headers['ETag'] and after_write.data != first.data
+        assert get(warden, etag=first.headers['ETag']).status_code == 200
+        # Someone else's request leaves resident1's page as it was
+        assert get(resident, '/dashboard/resident', etag=mine.headers['ETag']).status_code == 304
+        database.submit_service_request(101, 'Window stuck', 'resident1@hostel.com')
+        assert get(resident, '/dashboard/resident', etag=mine.headers['ETag']).status_code == 200
+
+        def partial():
+            _outing('resident2@hostel.com')
+            get(warden)
+
+        write_only = _time(lambda: _outing('resident2@hostel.com'), args.repeat // 10 or 1)
+        invalidated = _time(partial, args.repeat // 10 or 1) - write_only
+
+        # Another worker approves resident11's booking right after this process found no room
+        newcomer = login('resident11@hostel.com', 'resident')
+        assert get(newcomer, '/dashboard/resident/data').get_json()['parts']['resident']['my_room'] is None
+        assert hostel.get_user_room('resident11@hostel.com') is None
+        subprocess.run([sys.executable, '-c', f"import sys; sys.path.insert(0, {ROOT!r}); import database; database.DB_PATH = {database.DB_PATH!r}; database.update_request_status('booking', 11, 'approved', None)"], check=True)
+        assert get(newcomer, '/dashboard/resident/data').get_json()['parts']['resident']['my_room'] == 101
+        # and /service no longer refuses them (the memo never kept their missing room)
+        assert hostel.get_user_room('resident11@hostel.com') == 101
+        assert client.post('/service', json={'description': 'Tap'}, headers=newcomer).status_code == 200
+        # The approval moved a bed; the heatmaps come from the memo only while it is current
+        heatmaps = get(warden, '/dashboard/warden/data?parts=heatmaps').get_json()['parts']['heatmaps']
+        assert heatmaps['bookings_heatmap'] == [list(r) for r in database.get_bookings_heatmap.uncached()]
+        memo = database.get_heatmap_data.memo
+        database.submit_service_request(102, 'Bulb fused', 'resident2@hostel.com')
+        hits = memo.hits
+        heatmaps = get(warden, '/dashboard/warden/data?parts=heatmaps').get_json()['parts']['heatmaps']
+        assert heatmaps['heatmap'] == [list(r) for r in database.get_heatmap_data.uncached()] and memo.hits == hits + 1
+
+        # The live stream resumes from the event id the page was rendered at
+        event_id = re.search(r'data-event-id="([^"]+)"', get(warden).get_data(as_text=True)).group(1)
+        _outing('resident6@hostel.com')
+        stream = client.get(f"/events/warden?last_id={event_id}", headers=warden, buffered=False).response
+        next(stream)  # retry: preamble
+        assert b'event: request.created' in next(stream)
+
+        data = get(warden, '/dashboard/warden/data?parts=queue').get_json()
+        pending, counters = database.get_pending_requests()
+        assert data['parts']['queue']['counters'] == counters and len(data['parts']['queue']['requests']) == len(pending)
+        assert client.get('/dashboard/warden/data?parts=nope', headers=warden).status_code == 400
+        close_pools()
+    print(f"full render       {full:8.3f} ms")
+    print(f"cached page       {cached:8.3f} ms")
+    print(f"304               {not_modified:8.3f} ms")
+    print(f"queue invalidated {invalidated:8.3f} ms (render after an outing request)")
+    print("OK: ETags follow writes, resident pages only change with their own data")
+    print(fragments.stats())
+
+
+if __name__ == '__main__':
+    main()
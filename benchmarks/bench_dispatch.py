@@ -0,0 +1,118 @@
+"""Technician dispatch latency with thousands of open tickets.
+
+Loads --tickets waiting service requests over --rooms rooms (a few of them
+hot) into dispatch.Dispatcher, then times single decisions while new tickets
+keep arriving and assigned ones are closed, so every decision works on a
+queue that was just re-planned. Reports p50 / p99 / max per decision and per
+arrival; p99 must stay under a millisecond. It then runs the database path,
+dispatch_service_requests(), dry and applied, and checks that no technician
+ends up with more open tickets than their capacity.
+
+    python benchmarks/bench_dispatch.py [--tickets 5000] [--rooms 400] [--technicians 40]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import dispatch  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+NOW = 1_767_225_600
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1e3, samples[int(len(samples) * 0.99)] * 1e3, samples[-1] * 1e3)
+
+
+def _tickets(rnd, first_id, n, rooms):
+    hot = rooms[:max(1, len(rooms) // 50)]
+    return [dispatch.Ticket(first_id + i, rnd.choice(hot) if rnd.random() < 0.3 else rnd.choice(rooms), NOW - rnd.randint(0, 14 * 86400)) for i in range(n)]
+
+
+def bench_queue(n, room_count, technicians, rounds=5000, seed=3):
+    rnd = random.Random(seed)
+    rooms = list(range(1000, 1000 + room_count))
+    techs = [dispatch.Technician(f"tech{i}", rnd.choice((3, 4, 5)), 0) for i in range(technicians)]
+    start = time.perf_counter()
+    d = dispatch.Dispatcher(techs, _tickets(rnd, 1, n, rooms), heat={r: rnd.randint(0, 200) for r in rooms})
+    print(f"load {n} tickets       {(time.perf_counter() - start) * 1e3:8.2f} ms")
+    next_id = n + 1
+    assigned = []
+    decide, arrive = [], []
+    for _ in range(rounds):
+        ticket = _tickets(rnd, next_id, 1, rooms)[0]
+        next_id += 1
+        t0 = time.perf_counter()
+        d.add(ticket)
+        arrive.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        step = d.next_assignment()
+        decide.append(time.perf_counter() - t0)
+        if step is None:
+            # Everyone is busy: finish a random job so a slot opens
+            d.close(assigned.pop(rnd.randrange(len(assigned))))
+            continue
+        assigned.append(step[0].id)
+        for technician_id, (capacity, load) in d.loads().items():
+            assert load <= capacity, technician_id
+    p50, p99, worst = _percentiles(decide)
+    print(f"decision              p50 {p50:.4f} ms  p99 {p99:.4f} ms  max {worst:.3f} ms  ({len(d)} waiting)")
+    a50, a99, aworst = _percentiles(arrive)
+    print(f"arrival (re-plan)     p50 {a50:.4f} ms  p99 {a99:.4f} ms  max {aworst:.3f} ms")
+    assert p99 < 1.0, f"p99 decision {p99:.3f} ms"
+
+
+def bench_database(n, room_count, technicians, seed=5):
+    rnd = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        with database.get_conn() as conn:
+            c = conn.cursor()
+            c.executemany("INSERT OR IGNORE INTO rooms (room_no, total_beds) VALUES (?, 4)", [(1000 + i,) for i in range(room_count)])
+            c.execute("DELETE FROM technicians")
+            c.executemany("INSERT INTO technicians (id, name, capacity) VALUES (?, ?, ?)", [(f"tech{i}", f"Technician {i}", rnd.choice((3, 4, 5))) for i in range(technicians)])
+            c.executemany(
+                "INSERT INTO service_requests (room_id, description, resident_id, created_at) VALUES (?, 'Fan not working', NULL, ?)",
+                [(t.room, t.created_at) for t in _tickets(rnd, 1, n, list(range(1000, 1000 + room_count)))],
+            )
+            conn.commit()
+        capacity = sum(t['capacity'] for t in database.get_technicians())
+        dry = database.dispatch_service_requests(dry_run=True)
+        assert len(dry['assignments']) == min(n, capacity)
+        print(f"db dry run            {dry['elapsed_ms']:8.2f} ms  (first call loads the queue)")
+        real = database.dispatch_service_requests(dry_run=False)
+        assert [a['id'] for a in real['assignments']] == [a['id'] for a in dry['assignments']]
+        print(f"db applied            {real['elapsed_ms']:8.2f} ms  ({len(real['assignments'])} assignments)")
+        again = database.dispatch_service_requests(dry_run=False)
+        assert again['assignments'] == [], 'technicians at capacity got more work'
+        # Deciding a ticket frees its technician's slot for the next round
+        first = real['assignments'][0]
+        database.update_request_status('service', first['id'], 'approved', None)
+        freed = database.dispatch_service_requests(dry_run=False)
+        assert [a['technician'] for a in freed['assignments']] == [first['technician']], freed['assignments']
+        print(f"db after one decision {freed['elapsed_ms']:8.2f} ms")
+        for t in database.get_technicians():
+            assert t['load'] <= t['capacity'], t
+        close_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=5000)
+    parser.add_argument('--rooms', type=int, default=400)
+    parser.add_argument('--technicians', type=int, default=40)
+    args = parser.parse_args()
+    bench_queue(args.tickets, args.rooms, args.technicians)
+    bench_database(args.tickets, args.rooms, args.technicians)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Streaming export memory check.
+
+Seeds --rows service requests (part of them archived), then streams
+/export/service_requests as CSV and NDJSON through the Flask test client
+without buffering. It counts the rows received and records the peak Python
+memory with tracemalloc. The same export of a tenth of the rows must peak
+at about the same memory, i.e. memory stays flat as the export grows.
+
+    python benchmarks/bench_export.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+
+_tmp = tempfile.TemporaryDirectory()
+database.DB_PATH = os.path.join(_tmp.name, 'hostel.db')
+
+import archive  # noqa: E402
+from app import create_app  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(rows):
+    old = int(time.time()) - 365 * 86400
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM service_requests")
+        c.execute("DELETE FROM service_requests_archive")
+        c.executemany(
+            "INSERT INTO service_requests (room_id, description, resident_id, status, created_at, resolved_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((101 + i % 10, f"Request {i}: fan, light, \"tap\"", f"resident{i % 60 + 1}@hostel.com", 'approved' if i % 2 else 'rejected', old + i, old if i % 3 == 0 else None) for i in range(rows)),
+        )
+        conn.commit()
+    # A third of the rows move to the archive so the export merges both tables
+    archive.archive_resolved(max_age_days=90, chunk_size=5000)
+
+
+def _export(client, headers, fmt, query=''):
+    resp = client.get(f"/export/service_requests?format={fmt}{query}", headers=headers, buffered=False)
+    assert resp.status_code == 200, resp.status_code
+    lines = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for chunk in resp.response:
+        lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resp.close()
+    return lines - (1 if fmt == 'csv' else 0), peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+    client = create_app().test_client()
+    token = client.post('/login', json={'email': 'warden@hostel.com', 'password': 'pass123', 'role': 'warden'}).get_json()['token']
+    headers = {'Authorization': f"Bearer {token}"}
+    peaks = {}
+    for rows in (args.rows // 10, args.rows):
+        _seed(rows)
+        for fmt in ('csv', 'ndjson'):
+            lines, peak, elapsed = _export(client, headers, fmt)
+            assert lines == rows, (fmt, lines, rows)
+            peaks[(fmt, rows)] = peak
+            print(f"{fmt:6s} {rows:9d} rows  {elapsed:6.1f} s  {rows / elapsed:9.0f} rows/s  peak {peak / 1024:8.0f} KiB")
+        lines, _, _ = _export(client, headers, 'csv', '&status=approved')
+        assert lines == rows // 2, lines
+    for fmt in ('csv', 'ndjson'):
+        small, large = peaks[(fmt, args.rows // 10)], peaks[(fmt, args.rows)]
+        assert large < small * 1.5 + 256 * 1024, f"{fmt} export memory grew with row count: {small} -> {large}"
+    print('memory flat: ok')
+    close_pools()
+
+
+if __name__ == '__main__':
+    main()
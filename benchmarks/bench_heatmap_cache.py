@@ -0,0 +1,109 @@
+"""Warden heatmap reads with and without the analytics cache.
+
+Seeds a large service request history, then times get_heatmap_data() and
+get_bookings_heatmap() uncached and cached. It also interleaves writes
+(new requests, approvals, rejections) and checks after each one that the
+patched or invalidated cache matches a fresh query, including when a reader
+refills the cache between a write's commit and its patch, that a patched
+entry is still served from the cache, and that a write made by another
+process (straight SQL here) is seen on the next read.
+
+    python benchmarks/bench_heatmap_cache.py [--requests 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import cache  # noqa: E402
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(requests):
+    database.init_db()
+    for n in range(1, 41):
+        database.book_room(101 + (n - 1) % 10, f"g{n}", 0, 0, f"resident{n}@hostel.com", 1)
+    for booking_id in range(1, 31):
+        database.update_request_status('booking', booking_id, 'approved', None)
+    with database.get_conn() as conn:
+        rows = [(101 + i % 10, 'Leaking tap', f"resident{1 + i % 60}@hostel.com") for i in range(requests)]
+        conn.executemany("INSERT INTO service_requests (room_id, description, resident_id) VALUES (?, ?, ?)", rows)
+        conn.commit()
+    cache.invalidate()
+
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200000)
+    args = parser.parse_args()
+    random.seed(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        _seed(args.requests)
+        for fn in (database.get_heatmap_data, database.get_bookings_heatmap):
+            uncached = _time(fn.uncached, 5)
+            fn()
+            hot = _time(fn, 10000)
+            print(f"{fn.__name__:22s} uncached {uncached:12.1f} us   cached {hot:8.2f} us")
+        # Writes must leave the cache equal to a fresh query
+        for step in range(200):
+            action = random.random()
+            if action < 0.6:
+                email = f"resident{random.randint(1, 40)}@hostel.com"
+                room = database.get_user_room(email)
+                # Same gate as /service: only residents with an approved room can file
+                if room:
+                    database.submit_service_request(room, 'Light flickering', email)
+            else:
+                booking_id = random.randint(1, 40)
+                status = 'approved' if action < 0.85 else 'rejected'
+                try:
+                    database.update_request_status('booking', booking_id, status, None)
+                except database.BookingRejected:
+                    pass
+            assert database.get_heatmap_data() == database.get_heatmap_data.uncached(), f"heatmap drift at step {step}"
+            assert database.get_bookings_heatmap() == database.get_bookings_heatmap.uncached(), f"bookings heatmap drift at step {step}"
+        # A reader filling the cache right after the commit already sees the new row;
+        # the patch that follows must not count it twice
+        patch = cache.patch
+
+        def read_then_patch(name, fn, key=None, versions=None):
+            database.get_heatmap_data()
+            patch(name, fn, key, versions)
+
+        cache.patch = read_then_patch
+        try:
+            cache.invalidate('heatmap')
+            database.submit_service_request(103, 'Door jammed', 'resident3@hostel.com')
+        finally:
+            cache.patch = patch
+        assert database.get_heatmap_data() == database.get_heatmap_data.uncached(), "heatmap counted a write twice"
+        # This process's writes patch the entry and keep it current
+        memo = database.get_heatmap_data.memo
+        database.submit_service_request(104, 'Window stuck', 'resident4@hostel.com')
+        hits = memo.hits
+        assert database.get_heatmap_data() == database.get_heatmap_data.uncached() and memo.hits == hits + 1, "patched entry not served"
+        # Another worker's write bumps the data version, so the entry is not served again
+        with database.get_conn() as conn:
+            conn.execute("INSERT INTO service_requests (room_id, description, resident_id) VALUES (105, 'Fan', 'resident5@hostel.com')")
+            conn.commit()
+        assert database.get_heatmap_data() == database.get_heatmap_data.uncached(), "write from another process not seen"
+        close_pools()
+    print("OK: cache consistent across 200 interleaved writes and a refill during a write")
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Bulk CSV import of residents and rooms vs per-row inserts.
+
+Imports --residents residents (with profiles) and --rooms rooms from
+generated CSV: a dry run, the real import, then a re-import that skips
+every existing row. For comparison it also times ensure_user() called once
+per row on a slice of the intake, and checks the row counts after each step.
+
+    python benchmarks/bench_import.py [--residents 50000] [--rooms 2000]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import importer  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _residents_csv(n, prefix='intake'):
+    buf = io.StringIO()
+    buf.write('email,role,display_name,phone\n')
+    for i in range(n):
+        buf.write(f"{prefix}{i}@hostel.com,resident,Student {i},+91-98{i:08d}\n")
+    buf.seek(0)
+    return buf
+
+
+def _rooms_csv(n):
+    buf = io.StringIO()
+    buf.write('room_no,total_beds\n')
+    for i in range(n):
+        buf.write(f"{2001 + i},{2 + i % 3}\n")
+    buf.seek(0)
+    return buf
+
+
+def _count(sql):
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute(sql)
+        return c.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--residents', type=int, default=50000)
+    parser.add_argument('--rooms', type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        users_before = _count("SELECT COUNT(*) FROM users")
+
+        dry = importer.import_residents(_residents_csv(args.residents), dry_run=True)
+        assert dry['new'] == args.residents and dry['written'] == 0
+        assert _count("SELECT COUNT(*) FROM users") == users_before
+        print(f"residents dry run   {dry['elapsed_ms'] / 1000:7.2f} s  ({dry['new']} new)")
+
+        real = importer.import_residents(_residents_csv(args.residents))
+        assert real['written'] == args.residents and not real['aborted']
+        assert _count("SELECT COUNT(*) FROM users") == users_before + args.residents
+        assert _count("SELECT COUNT(*) FROM profiles") == args.residents
+        print(f"residents import    {real['elapsed_ms'] / 1000:7.2f} s  ({args.residents / real['elapsed_ms'] * 1000:.0f} rows/s)")
+
+        again = importer.import_residents(_residents_csv(args.residents))
+        assert again['existing'] == args.residents and again['written'] == 0
+        print(f"re-import (skip)    {again['elapsed_ms'] / 1000:7.2f} s")
+
+        rooms = importer.import_rooms(_rooms_csv(args.rooms))
+        assert rooms['written'] == args.rooms
+        print(f"rooms import        {rooms['elapsed_ms'] / 1000:7.2f} s  ({args.rooms} rooms)")
+
+        bad = importer.import_residents(['email,role\n', 'not-an-email,resident\n', 'x@hostel.com,janitor\n', 'y@hostel.com,resident\n'])
+        assert bad['aborted'] == 'invalid rows' and len(bad['errors']) == 2 and bad['written'] == 0
+
+        sample = min(args.residents, 5000)
+        start = time.perf_counter()
+        for i in range(sample):
+            database.ensure_user(f"perrow{i}@hostel.com")
+        per_row = (time.perf_counter() - start) / sample
+        print(f"per-row ensure_user {per_row * args.residents:7.2f} s  (extrapolated from {sample} rows)")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Login throughput at the configured scrypt cost.
+
+Runs get_user() from many threads for a few seconds in three modes:
+cold (every login pays the KDF), warm (repeat logins hit the verified
+cache) and storm (more concurrent logins than KDF_WORKERS + KDF_BACKLOG,
+so some are shed with LoginBusy). Prints logins/sec and the shed count.
+First checks that a failed login for an unknown email or a legacy plaintext
+row takes about as long as one for a known account, and that a correct
+legacy login succeeds when its rehash is shed with LoginBusy.
+
+    python benchmarks/bench_login.py [--threads 32] [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import passwords  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _run(threads, seconds, cold):
+    stop = time.perf_counter() + seconds
+    ok = [0] * threads
+    busy = [0] * threads
+
+    def worker(i):
+        while time.perf_counter() < stop:
+            if cold:
+                with passwords._verified_lock:
+                    passwords._verified.clear()
+            try:
+                assert database.get_user(f"resident{i % 60 + 1}@hostel.com", 'pass123', 'resident')
+                ok[i] += 1
+            except passwords.LoginBusy:
+                busy[i] += 1
+                time.sleep(0.01)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(ok) / seconds, sum(busy)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        start = time.perf_counter()
+        passwords.hash_password('pass123')
+        print(f"scrypt n={passwords.SCRYPT_N}: {(time.perf_counter() - start) * 1000:.1f} ms per hash, "
+              f"{passwords.KDF_WORKERS} KDF workers, backlog {passwords.KDF_BACKLOG}")
+        with database.get_conn() as conn:
+            conn.execute("INSERT INTO users (email, password, role) VALUES ('legacy@hostel.com', 'pass123', 'resident')")
+            conn.commit()
+        failed = {}
+        for label, email in (('known', 'resident1@hostel.com'), ('unknown', 'nobody@hostel.com'), ('legacy', 'legacy@hostel.com')):
+            database.get_user(email, 'wrong', 'resident')
+            start = time.perf_counter()
+            for _ in range(5):
+                assert database.get_user(email, 'wrong', 'resident') is None
+            failed[label] = (time.perf_counter() - start) / 5
+        print(f"failed login: {failed['known'] * 1000:.1f} ms known, {failed['unknown'] * 1000:.1f} ms unknown email, {failed['legacy'] * 1000:.1f} ms legacy row")
+        assert failed['unknown'] > failed['known'] / 2 and failed['legacy'] > failed['known'] / 2, failed
+        hash_password = passwords.hash_password
+
+        def busy(password):
+            raise passwords.LoginBusy('Too many logins in progress')
+
+        passwords.hash_password = busy
+        try:
+            assert database.get_user('legacy@hostel.com', 'pass123', 'resident')
+        finally:
+            passwords.hash_password = hash_password
+        assert database.get_user('legacy@hostel.com', 'pass123', 'resident')
+        with database.get_conn() as conn:
+            assert passwords.is_hashed(conn.execute("SELECT password FROM users WHERE email = 'legacy@hostel.com'").fetchone()[0])
+        for label, threads, cold in (('cold', args.threads, True), ('warm', args.threads, False),
+                                     ('storm', passwords.KDF_WORKERS + passwords.KDF_BACKLOG + 32, True)):
+            rate, shed = _run(threads, args.seconds, cold)
+            print(f"{label:5s} {threads:4d} threads: {rate:10.1f} logins/sec, {shed} shed with LoginBusy")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
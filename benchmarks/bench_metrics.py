@@ -0,0 +1,77 @@
+"""Cost of query instrumentation and a check of the slow query log.
+
+Runs a mix of hot read paths with plain pooled connections and with
+instrumented ones and prints the per-call overhead. It then drops the slow
+threshold to zero and checks that statements are logged with a plan, and
+that the Prometheus rendering carries the per-function counters and types
+extra counters as counters.
+
+    python benchmarks/bench_metrics.py [--calls 5000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import metrics  # noqa: E402
+from db_pool import close_pools, configure_pool, count_queries  # noqa: E402
+
+
+def _workload(calls):
+    start = time.perf_counter()
+    for n in range(calls):
+        email = f"resident{1 + n % 40}@hostel.com"
+        database.get_user_room.uncached(email)
+        database.get_user_requests(email)
+        database.get_available_rooms()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=5000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        for n in range(1, 41):
+            database.book_room(101 + (n - 1) % 10, f"g{n}", 0, 0, f"resident{n}@hostel.com", 1)
+        for booking_id in range(1, 31):
+            database.update_request_status('booking', booking_id, 'approved', None)
+
+        timings = {}
+        for enabled in (False, True, False, True):
+            metrics.ENABLED = enabled
+            configure_pool(database.DB_PATH)
+            _workload(200)
+            timings.setdefault(enabled, []).append(_workload(args.calls))
+        plain, instrumented = min(timings[False]), min(timings[True])
+        with count_queries() as counter:
+            _workload(1)
+        print(f"plain        {plain:9.1f} us per call ({counter[0]} statements)")
+        print(f"instrumented {instrumented:9.1f} us per call  (+{(instrumented - plain) / counter[0]:.2f} us per statement)")
+
+        metrics.reset()
+        metrics.SLOW_QUERY_MS = 0
+        database.get_available_rooms()
+        slow = metrics.slow_queries()
+        assert slow and all(q['caller'] == 'database.get_available_rooms' for q in slow), slow
+        assert any(q['plan'] for q in slow), slow
+        queries, _ = metrics.snapshot()
+        calls, _, rows, _ = queries['database.get_available_rooms']
+        assert calls >= 1 and rows > 0, queries
+        text = metrics.render_prometheus()
+        assert 'hostel_db_queries_total{caller="database.get_available_rooms"}' in text
+        text = metrics.render_prometheus({'hostel_cache_hits_total': ('Hits.', {(('cache', 'heatmap'),): 3}, 'counter'), 'hostel_pool_idle': ('Idle.', {(): 2})})
+        assert '# TYPE hostel_cache_hits_total counter' in text and 'hostel_cache_hits_total{cache="heatmap"} 3' in text
+        assert '# TYPE hostel_pool_idle gauge' in text and 'hostel_pool_idle 2' in text
+        print(f"slow log ok: {slow[0]['sql'][:60]}... plan={slow[0]['plan']}")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
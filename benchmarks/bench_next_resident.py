@@ -0,0 +1,80 @@
+"""/next-resident suggestion: full bookings scan vs. resident_no index vs. cache.
+
+Seeds --bookings bookings, most of them by non-resident logins (the worst case
+for the old scan, which read every booking newest first and regex-matched
+each until one looked like residentN@hostel.com). Times that scan, the
+indexed lookup (uncached) and the cached call, then checks that the indexed
+answer matches the scan after random bookings and after archiving.
+
+    python benchmarks/bench_next_resident.py [--bookings 200000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import archive  # noqa: E402
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def scan(max_residents=60):
+    # The pre-index implementation, kept as the reference answer
+    with database.get_conn() as conn:
+        rows = conn.execute("SELECT booked_by FROM bookings ORDER BY id DESC").fetchall()
+    last_n = 0
+    for (email,) in rows:
+        m = re.match(r'^resident(\d+)@hostel\.com$', email.strip(), re.IGNORECASE) if isinstance(email, str) else None
+        if m:
+            last_n = int(m.group(1))
+            break
+    return f"resident{last_n + 1}@hostel.com" if last_n + 1 <= max_residents else None
+
+
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(60)
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bookings', type=int, default=200000)
+    args = parser.parse_args()
+    random.seed(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        with database.get_conn() as conn:
+            rows = [(101 + i % 10, 'rejected', f"resident{i % 50 + 1}@hostel.com" if i < 10 else f"guest{i}@example.com", 1) for i in range(args.bookings)]
+            conn.executemany("INSERT INTO bookings (room_id, status, booked_by, roommates_count) VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+        assert database.get_next_resident_login.uncached(60) == scan() == 'resident11@hostel.com'
+        print(f"regex scan        {_time(scan, 3):12.1f} us")
+        print(f"resident_no index {_time(database.get_next_resident_login.uncached, 1000):12.1f} us")
+        database.get_next_resident_login(60)
+        print(f"cached            {_time(database.get_next_resident_login, 100000):12.3f} us")
+        for step in range(300):
+            email = random.choice([f"resident{random.randint(1, 70)}@hostel.com", f" Resident{random.randint(1, 9)}@HOSTEL.com", 'guest@example.com', 'resident@hostel.com', 'resident1x@hostel.com'])
+            database.book_room(101 + step % 10, f"g{step}", 0, 0, email, 1)
+            assert database.get_next_resident_login(60) == scan(), f"drift at step {step}"
+            if step % 50 == 49:
+                # Archiving old rejected bookings moves the newest resident booking away
+                with database.get_conn() as conn:
+                    conn.execute("UPDATE bookings SET status = 'rejected'")
+                    conn.execute("UPDATE bookings SET resolved_at = 0")
+                    conn.commit()
+                archive.archive_resolved(max_age_days=0)
+                assert database.get_next_resident_login(60) == scan() == 'resident1@hostel.com'
+        close_pools()
+    print("OK: index and cache agree with the scan across 300 bookings and archiving")
+
+
+if __name__ == '__main__':
+    main()
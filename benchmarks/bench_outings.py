@@ -0,0 +1,96 @@
+"""Outing window queries and overlap checks over a large outing history.
+
+Seeds --outings historical outings (default 1M) spread over three years, then
+times "who is out during this window" through the outing_intervals R*Tree
+(database.get_outings_during) against the same predicate answered by
+scanning outings, and checks both return the same ids. It also times
+submit_outing_request, whose overlap check runs on every submit.
+
+    python benchmarks/bench_outings.py [--outings 1000000] [--residents 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+BASE = datetime(2023, 1, 1)
+SPAN_HOURS = 3 * 365 * 24
+
+
+def _seed(outings, residents):
+    database.init_db()
+    rng = random.Random(15)
+    rows = []
+    for _ in range(outings):
+        start = BASE + timedelta(hours=rng.randrange(SPAN_HOURS))
+        end = start + timedelta(hours=rng.choice((2, 4, 8, 12, 36, 72)))
+        s, e = start.isoformat(timespec='minutes'), end.isoformat(timespec='minutes')
+        status = 'approved' if rng.random() < 0.8 else 'rejected'
+        rows.append((f"resident{rng.randrange(residents)}@hostel.com", s, e, database.to_epoch(s), database.to_epoch(e), status))
+    with database.get_conn() as conn:
+        conn.executemany("INSERT INTO outings (resident_id, start_time, end_time, start_epoch, end_epoch, status) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def _scan(start, end):
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id FROM outings WHERE start_epoch < ? AND end_epoch > ? AND status = 'approved'", (end, start))
+        return {row[0] for row in c.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--outings', type=int, default=1000000)
+    parser.add_argument('--residents', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        start = time.perf_counter()
+        _seed(args.outings, args.residents)
+        print(f"seeded {args.outings} outings in {time.perf_counter() - start:.1f} s")
+
+        # Night windows (22:00 -> 06:00) across the history
+        windows = []
+        for _ in range(args.queries):
+            night = BASE + timedelta(days=rng.randrange(3 * 365), hours=22)
+            windows.append((database.to_epoch(night.isoformat()), database.to_epoch((night + timedelta(hours=8)).isoformat())))
+
+        start = time.perf_counter()
+        indexed = [{o['id'] for o in database.get_outings_during(s, e)} for s, e in windows]
+        rtree_ms = (time.perf_counter() - start) * 1000 / len(windows)
+        sample = windows[:max(1, len(windows) // 10)]
+        start = time.perf_counter()
+        scanned = [_scan(s, e) for s, e in sample]
+        scan_ms = (time.perf_counter() - start) * 1000 / len(sample)
+        assert indexed[:len(sample)] == scanned, 'R*Tree and scan disagree'
+        hits = sum(len(ids) for ids in indexed) / len(indexed)
+        print(f"out during window  R*Tree {rtree_ms:8.2f} ms   scan {scan_ms:8.2f} ms   ({hits:.0f} outings per window)")
+
+        # New requests go after the history, so most are accepted; the check still runs on each
+        accepted = rejected = 0
+        start = time.perf_counter()
+        for n in range(args.queries):
+            begin = BASE + timedelta(hours=SPAN_HOURS + rng.randrange(24 * 30))
+            try:
+                database.submit_outing_request(f"resident{rng.randrange(args.residents)}@hostel.com", begin.isoformat(), (begin + timedelta(hours=6)).isoformat())
+                accepted += 1
+            except database.OutingRejected:
+                rejected += 1
+        submit_ms = (time.perf_counter() - start) * 1000 / args.queries
+        print(f"submit with overlap check {submit_ms:6.2f} ms   ({accepted} accepted, {rejected} overlapping)")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
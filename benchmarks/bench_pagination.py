@@ -0,0 +1,75 @@
+"""Page latency of list_requests() as request history grows.
+
+For each history size, seeds services/outings/bookings (a small pending
+slice, the rest resolved), then times the first page, a deep page and a
+resident-filtered page. Also walks every page once and checks no row is
+skipped or repeated.
+
+    python benchmarks/bench_pagination.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(rows):
+    database.init_db()
+    per_type = rows // 3
+    status = lambda i: 'pending' if i % 50 == 0 else ('approved' if i % 2 else 'rejected')  # noqa: E731
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.executemany("INSERT INTO service_requests (room_id, description, resident_id, status) VALUES (?, 'Fan', ?, ?)",
+                      ((101 + i % 10, f"resident{i % 60 + 1}@hostel.com", status(i)) for i in range(per_type)))
+        c.executemany("INSERT INTO outings (resident_id, start_time, end_time, status) VALUES (?, '2026-01-01T10:00', '2026-01-01T12:00', ?)",
+                      ((f"resident{i % 60 + 1}@hostel.com", status(i)) for i in range(per_type)))
+        c.executemany("INSERT INTO bookings (room_id, booked_by, status, roommates_count) VALUES (?, ?, ?, 1)",
+                      ((101 + i % 10, f"hist{i}@hostel.com", 'pending' if i % 50 == 0 else 'rejected') for i in range(per_type)))
+        conn.commit()
+
+
+def _time(fn, repeat=50):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def _walk(**filters):
+    seen, cursor = [], None
+    while True:
+        page = database.list_requests(cursor=cursor, limit=97, **filters)
+        seen.extend((item['type'], item['id']) for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return seen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+    print(f"{'rows':>8} {'first page ms':>14} {'deep page ms':>13} {'resident ms':>12} {'w/ total ms':>12}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_PATH = os.path.join(tmp, 'hostel.db')
+            _seed(size)
+            pending = _walk(status='pending')
+            assert len(pending) == len(set(pending)) == sum(database.get_pending_requests()[1].values())
+            deep = f"service:{size // 6}"
+            first = _time(lambda: database.list_requests(status='pending'))
+            deep_ms = _time(lambda: database.list_requests(cursor=deep))
+            mine = _time(lambda: database.list_requests(resident='resident7@hostel.com', with_room_services=True))
+            total = _time(lambda: database.list_requests(status='pending', include_total=True), 5)
+            close_pools()
+        print(f"{size:8d} {first:14.3f} {deep_ms:13.3f} {mine:12.3f} {total:12.3f}")
+
+
+if __name__ == '__main__':
+    main()
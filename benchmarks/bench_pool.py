@@ -0,0 +1,73 @@
+"""Resident dashboard throughput: connect-per-call vs pooled WAL connections.
+
+Runs the three queries behind /dashboard/resident (get_user_requests,
+get_user_room, get_profile) from several threads against a temporary
+database and prints requests/sec for each mode.
+
+    python benchmarks/bench_pool.py [--threads 8] [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import configure_pool, close_pools  # noqa: E402
+
+
+def _seed(residents=60):
+    database.init_db()
+    for n in range(1, residents + 1):
+        email = f"resident{n}@hostel.com"
+        database.book_room(101 + (n - 1) % 10, f"g{n}", 0, 0, email, 1)
+        database.upsert_profile(email, f"Resident {n}")
+        database.submit_service_request(101 + (n - 1) % 10, 'Fan not working', email)
+
+
+def _run(threads, seconds, residents=60):
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def worker(i):
+        n = i
+        while time.perf_counter() < stop:
+            email = f"resident{n % residents + 1}@hostel.com"
+            database.get_user_requests(email)
+            database.get_user_room(email)
+            database.get_profile(email)
+            counts[i] += 1
+            n += threads
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    modes = [
+        ('connect-per-call, rollback journal', dict(max_size=0, wal=False)),
+        ('pooled, WAL', dict(wal=True)),
+    ]
+    for label, opts in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            database.DB_PATH = os.path.join(tmp, 'hostel.db')
+            configure_pool(database.DB_PATH, **opts)
+            _seed()
+            rps = _run(args.threads, args.seconds)
+            close_pools()
+        print(f"{label:40s} {rps:10.1f} dashboard requests/sec")
+
+
+if __name__ == '__main__':
+    main()
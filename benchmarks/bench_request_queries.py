@@ -0,0 +1,61 @@
+"""Database statements per resident request, with and without the room cache.
+
+Drives the resident endpoints through the Flask test client with the
+X-DB-Queries header turned on and prints the statement count per request.
+It runs once with the email -> approved room cache disabled (request-scoped
+lookup only) and once with it enabled.
+
+    python benchmarks/bench_request_queries.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+
+_tmp = tempfile.TemporaryDirectory()
+database.DB_PATH = os.path.join(_tmp.name, 'hostel.db')
+os.environ['QUERY_COUNT_HEADER'] = '1'
+
+from app import create_app  # noqa: E402
+
+CALLS = [
+    ('POST', '/service', {'description': 'Tap leaking'}),
+    ('POST', '/outing', {'start_time': '2026-01-01T10:00', 'end_time': '2026-01-01T12:00', 'reason': 'Home'}),
+    ('GET', '/me/booking-status', None),
+    ('GET', '/api/me/requests', None),
+]
+
+
+def _token(client, email, role):
+    return client.post('/login', json={'email': email, 'password': 'pass123', 'role': role}).get_json()['token']
+
+
+def main():
+    client = create_app().test_client()
+    resident = {'Authorization': f"Bearer {_token(client, 'resident1@hostel.com', 'resident')}"}
+    warden = {'Authorization': f"Bearer {_token(client, 'warden@hostel.com', 'warden')}"}
+    client.post('/book', json={'room_id': 101}, headers=resident)
+    client.put('/approve/booking/1', json={'status': 'approved'}, headers=warden)
+    memo = database.get_user_room.memo
+    print(f"{'endpoint':28s} {'no room cache':>14s} {'room cache':>11s}")
+    counts = {}
+    for day, ttl in enumerate((0, 30), 1):
+        memo.ttl = ttl
+        memo.invalidate()
+        client.get('/me/booking-status', headers=resident)  # warm the cache when enabled
+        for method, path, body in CALLS:
+            if path == '/outing':
+                # Each round files its outing on another day; overlapping outings are refused
+                body = dict(body, start_time=f"2026-01-{day:02d}T10:00", end_time=f"2026-01-{day:02d}T12:00")
+            resp = client.open(path, method=method, json=body, headers=resident)
+            assert resp.status_code == 200, (path, resp.status_code, resp.get_data(as_text=True))
+            counts.setdefault(path, []).append(int(resp.headers['X-DB-Queries']))
+    for path, (off, on) in counts.items():
+        print(f"{path:28s} {off:14d} {on:11d}")
+
+
+if __name__ == '__main__':
+    main()
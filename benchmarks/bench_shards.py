@@ -0,0 +1,188 @@
+"""Per-block databases: routing checks and write throughput by block count.
+
+First it splits a temporary hostel into three blocks and checks the routing:
+bookings, service requests and outings land in the right block file with ids
+in the block's range; batch decisions span blocks; the warden views and the
+paginated listing merge every block without gaps or duplicates; a resident
+approved in two blocks at once is housed by exactly one, and a failed
+approval does not drop another's claim; a resident's history covers every
+block they booked in; the CSV importer writes rooms into their block's file.
+
+Then --workers processes (like web workers) file service requests for random
+rooms across the whole hostel for --seconds, with the hostel split into 1, 2
+and 4 blocks. Each block has its own writer lock, so throughput should grow
+with the block count until the disk or CPUs run out (on a single core the
+gain is capped by the CPU, not by the lock).
+
+    python benchmarks/bench_shards.py [--workers 4] [--seconds 3]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import importer  # noqa: E402
+import shards  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+ROOMS_PER_BLOCK = 20
+
+
+def _layout(tmp, blocks):
+    return ','.join(f"{chr(65 + i)}:{(i + 1) * 100 + 1}-{(i + 1) * 100 + 99}={os.path.join(tmp, f'block_{i}.db')}" for i in range(blocks))
+
+
+def _setup(tmp, blocks):
+    database.DB_PATH = os.path.join(tmp, 'hostel.db')
+    shards.configure(_layout(tmp, blocks))
+    shards.init_db()
+    for block in shards.BLOCKS:
+        with database.get_conn(block.path) as conn:
+            conn.executemany("INSERT OR IGNORE INTO rooms (room_no, total_beds) VALUES (?, 4)", [(block.first_room + i,) for i in range(ROOMS_PER_BLOCK)])
+            conn.commit()
+
+
+def _count(path, sql, params=()):
+    with database.get_conn(path) as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+
+def check_routing(tmp):
+    _setup(tmp, 3)
+    residents = [f"resident{n}@hostel.com" for n in range(1, 10)]
+    for n, email in enumerate(residents):
+        block = shards.BLOCKS[n % 3]
+        shards.book_room(block.first_room + n, f"g{n}", 0, 0, email, 1)
+    pending, counters = shards.get_pending_requests()
+    assert counters['booking'] == len(residents), counters
+    results = shards.update_request_statuses([{'type': 'booking', 'id': row[0], 'status': 'approved'} for row in pending if row[1] == 'booking'])
+    assert all(r['ok'] for r in results), results
+    for n, email in enumerate(residents):
+        block = shards.BLOCKS[n % 3]
+        assert shards.block_for_resident(email) == block
+        assert shards.get_user_room(email) == block.first_room + n
+        service_id = shards.submit_service_request(block.first_room + n, 'Tap leaking', email)
+        outing_id = shards.submit_outing_request(email, '2026-03-01T10:00', '2026-03-01T18:00')
+        for id in (service_id, outing_id):
+            assert shards.block_for_id(id) == block, (email, id)
+        assert _count(block.path, "SELECT COUNT(*) FROM service_requests WHERE id = ?", (service_id,)) == 1
+        assert {r[0] for r in shards.get_user_requests(email)} == {'booking', 'service', 'outing'}
+    # A resident housed in block A cannot also be approved in block B
+    shards.book_room(shards.BLOCKS[1].first_room + 15, 'gx', 0, 0, residents[0], 1)
+    second = max(row[0] for row in shards.get_pending_requests()[0] if row[1] == 'booking')
+    try:
+        shards.update_request_status('booking', second, 'approved', None)
+        raise AssertionError('resident housed in two blocks')
+    except database.BookingRejected:
+        pass
+    _, counters = shards.get_pending_requests()
+    assert counters == {'service': 9, 'outing': 9, 'booking': 1}, counters
+    # Revoking the block A room frees the resident for block B
+    with database.get_conn(shards.BLOCKS[0].path) as conn:
+        first = conn.execute("SELECT id FROM bookings WHERE booked_by = ? AND status = 'approved'", (residents[0],)).fetchone()[0]
+    shards.update_request_status('booking', first, 'rejected', None)
+    shards.update_request_status('booking', second, 'approved', None)
+    assert shards.block_for_resident(residents[0]) == shards.BLOCKS[1] and shards.get_user_room(residents[0]) == shards.BLOCKS[1].first_room + 15
+    # Their history still shows the block A booking
+    assert {first, second} <= {r[1] for r in shards.get_user_requests(residents[0]) if r[0] == 'booking'}
+    assert {first, second} <= {item['id'] for item in shards.list_requests(types=['booking'], resident=residents[0])['items']}
+    # Two blocks approving one resident at the same moment: the directory claim lets one through
+    email = 'racer@hostel.com'
+    ids = []
+    for block in shards.BLOCKS[:2]:
+        shards.book_room(block.first_room + 16, 'gr', 0, 0, email, 1)
+        ids.append(max(row[0] for row in shards.get_pending_requests()[0] if row[1] == 'booking' and row[3] == email and shards.block_for_id(row[0]) == block))
+    outcomes = list(shards._executor.map(lambda id: shards.update_request_statuses([{'type': 'booking', 'id': id, 'status': 'approved'}])[0]['ok'], ids))
+    assert sorted(outcomes) == [False, True], outcomes
+    housed = [b for b in shards.BLOCKS if _count(b.path, "SELECT COUNT(*) FROM bookings WHERE booked_by = ? AND status = 'approved'", (email,))]
+    assert len(housed) == 1 and shards.block_for_resident(email) == housed[0], housed
+    _, counters = shards.get_pending_requests()
+    assert counters == {'service': 9, 'outing': 9, 'booking': 1}, counters
+    heatmap = dict(shards.get_heatmap_data())
+    assert sum(heatmap.values()) == 9 and len(heatmap) == 3 * ROOMS_PER_BLOCK
+    assert sum(n for _, n in shards.get_bookings_heatmap()) == 10
+    assert len(shards.get_available_rooms()) == 3 * ROOMS_PER_BLOCK
+    seen, cursor = [], None
+    while True:
+        page = shards.list_requests(cursor=cursor, limit=4, include_total=True)
+        seen.extend((item['type'], item['id']) for item in page['items'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == page['total'] == 30, (len(seen), page['total'])
+    plan = shards.dispatch_service_requests(dry_run=False)
+    assert len(plan['assignments']) == 9 and {a['block'] for a in plan['assignments']} == {'A', 'B', 'C'}
+    # A refused booking leaves the directory alone
+    assert shards.book_room(shards.BLOCKS[2].first_room, 'gn', 0, 0, 'nobody@hostel.com', 0) is None
+    assert _count(database.DB_PATH, "SELECT COUNT(*) FROM resident_blocks WHERE email = 'nobody@hostel.com'") == 0
+    # Two approvals in flight in block A; the one that fails must not release the other's claim
+    email, (a, b) = 'claimer@hostel.com', shards.BLOCKS[:2]
+    assert shards._claim(email, a) and shards._claim(email, a)
+    shards._release(email, a, claimed=True)
+    assert not shards._claim(email, b)
+    shards._release(email, a, claimed=True)
+    assert shards._claim(email, b)
+    shards._release(email, b, claimed=True)
+    # Imported rooms land in their block's file; a room outside every block is refused
+    csv_rooms = [block.first_room + 50 for block in shards.BLOCKS]
+    report = importer.import_rooms(io.StringIO('room_no,total_beds\n' + ''.join(f"{n},4\n" for n in csv_rooms + [999])), skip_invalid=True)
+    assert report['written'] == 3 and len(report['errors']) == 1, report
+    for block, room_no in zip(shards.BLOCKS, csv_rooms):
+        assert _count(block.path, "SELECT COUNT(*) FROM rooms WHERE room_no = ?", (room_no,)) == 1
+    assert len(shards.get_available_rooms()) == 3 * ROOMS_PER_BLOCK + 3
+    print('routing: ok (3 blocks)')
+
+
+def _writer(args):
+    tmp, blocks, seconds, seed = args
+    database.DB_PATH = os.path.join(tmp, 'hostel.db')
+    shards.configure(_layout(tmp, blocks))
+    rooms = [b.first_room + i for b in shards.BLOCKS for i in range(ROOMS_PER_BLOCK)]
+    rnd = random.Random(seed)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        shards.submit_service_request(rnd.choice(rooms), 'Light flickering', None)
+        done += 1
+    close_pools()
+    return done
+
+
+def throughput(blocks, workers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(tmp, blocks)
+        close_pools()
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(workers) as pool:
+            done = sum(pool.map(_writer, [(tmp, blocks, seconds, seed) for seed in range(workers)]))
+        _setup(tmp, blocks)
+        stored = sum(_count(b.path, "SELECT COUNT(*) FROM service_requests") for b in shards.BLOCKS)
+        assert stored == done, (stored, done)
+        close_pools()
+    return done / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        check_routing(tmp)
+        close_pools()
+    base = None
+    for blocks in (1, 2, 4):
+        rate = throughput(blocks, args.workers, args.seconds)
+        base = base or rate
+        print(f"{blocks} block(s)  {rate:8.0f} writes/s  ({rate / base:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Load test for the warden event stream.
+
+Parks N idle SSE consumers (each running events.sse_stream exactly as the
+/events/warden response does), then publishes a burst of events and reports
+publish cost and fan-out delivery latency. Optionally drives a running
+server instead: --url http://127.0.0.1:5000 --token <warden JWT>.
+
+    python benchmarks/bench_sse.py [--clients 500] [--events 200] [--interval 0.005]
+"""
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import events  # noqa: E402
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def _publish_cost(n):
+    start = time.perf_counter()
+    for i in range(n):
+        events.publish('request.created', type='service', id=i, ref=101, info='bench', status='pending')
+    return (time.perf_counter() - start) * 1e6 / n
+
+
+def run_in_process(clients, count, interval):
+    idle_cost = _publish_cost(2000)
+    sent_at = {}
+    latencies = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+
+    def consumer():
+        stream = events.sse_stream(keepalive=30.0, max_events=count)
+        next(stream)  # retry: preamble; subscription cursor is now fixed
+        ready.wait()
+        for chunk in stream:
+            if chunk.startswith('id: '):
+                seq = int(chunk[chunk.index('.') + 1:chunk.index('\n')])
+                now = time.perf_counter()
+                with lock:
+                    latencies.append(now - sent_at[seq])
+
+    threads = [threading.Thread(target=consumer, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    time.sleep(0.2)
+    publish_time = 0.0
+    for i in range(count):
+        with events.bus._lock:
+            # Record the send time under the buffer lock so consumers never race ahead of it
+            t0 = time.perf_counter()
+            seq = events.bus.publish('request.created', {'type': 'service', 'id': i, 'ref': 101, 'info': 'bench', 'status': 'pending'})
+            sent_at[seq] = time.perf_counter()
+            publish_time += sent_at[seq] - t0
+        if interval:
+            time.sleep(interval)
+    publish_cost = publish_time * 1e6 / count
+    for t in threads:
+        t.join()
+    print(f"clients={clients} events={count} delivered={len(latencies)} (expected {clients * count})")
+    print(f"publish cost: {idle_cost:.1f} us with no listeners, {publish_cost:.1f} us with {clients} parked listeners")
+    ms = [v * 1000 for v in latencies]
+    print(f"delivery latency ms: p50={_pct(ms, 50):.2f} p95={_pct(ms, 95):.2f} p99={_pct(ms, 99):.2f} mean={statistics.mean(ms):.2f}")
+
+
+def run_against_server(url, token, clients, seconds):
+    parsed = urlparse(url)
+    conns = []
+    start = time.perf_counter()
+    for _ in range(clients):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=seconds + 30)
+        conn.request('GET', '/events/warden', headers={'Authorization': f'Bearer {token}', 'Accept': 'text/event-stream'})
+        resp = conn.getresponse()
+        assert resp.status == 200, resp.status
+        resp.fp.readline()  # retry: preamble
+        conns.append((conn, resp))
+    print(f"opened {clients} SSE connections in {time.perf_counter() - start:.2f}s; holding for {seconds}s")
+    time.sleep(seconds)
+    for conn, _ in conns:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=0.005, help='seconds between events (0 = burst)')
+    parser.add_argument('--url')
+    parser.add_argument('--token')
+    parser.add_argument('--hold', type=float, default=10.0)
+    args = parser.parse_args()
+    if args.url:
+        run_against_server(args.url, args.token, args.clients, args.hold)
+    else:
+        run_in_process(args.clients, args.events, args.interval)
+
+
+if __name__ == '__main__':
+    main()
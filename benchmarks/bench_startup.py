@@ -0,0 +1,133 @@
+"""Worker boot time: importing app.py and create_app().
+
+Each boot is a fresh process (like a gunicorn worker) that imports app and
+calls create_app() against a temporary database holding --requests service
+requests. It times the first boot (migrations and seeding), later boots (the
+bootstrap mark is already set) and, for comparison, boots with the mark
+cleared, which redo the seeding and the service request room backfill the
+way every boot used to. Then --workers processes boot at once on a fresh
+database and it checks the demo data was seeded exactly once.
+
+Finally it checks that boots neither import authlib nor register a Google
+client, and that the first Google login reads the discovery document from the
+disk cache, with network access disabled.
+
+    python benchmarks/bench_startup.py [--requests 200000] [--boots 5] [--workers 8]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+BOOT = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import database
+database.DB_PATH = {db!r}
+import app
+imported = time.perf_counter()
+app.create_app()
+ready = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'create_app': ready - imported, 'google_registered': app.oauth is not None, 'authlib_loaded': 'authlib' in sys.modules}}))
+'''
+
+GOOGLE_LOGIN = '''
+import sys, urllib.request
+sys.path.insert(0, {root!r})
+import database
+database.DB_PATH = {db!r}
+def offline(*args, **kwargs):
+    raise AssertionError('network access during boot or login')
+urllib.request.urlopen = offline
+import app
+app.create_app()
+assert app.oauth is None
+client = app.google_client()
+assert client.load_server_metadata()['authorization_endpoint'] == 'https://accounts.example/auth'
+print('ok')
+'''
+
+
+def _run(code, env=None):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=dict(os.environ, **(env or {})))
+    assert out.returncode == 0, out.stderr
+    return out.stdout.strip().splitlines()[-1]
+
+
+def boot(db):
+    return json.loads(_run(BOOT.format(root=ROOT, db=db)))
+
+
+def _query(db, sql):
+    with sqlite3.connect(db) as conn:
+        return conn.execute(sql).fetchone()[0]
+
+
+def _timed(db, boots, before=None):
+    """Median (whole process, create_app) in ms."""
+    totals, setups = [], []
+    for _ in range(boots):
+        if before:
+            before()
+        start = time.perf_counter()
+        setups.append(boot(db)['create_app'])
+        totals.append(time.perf_counter() - start)
+    return statistics.median(totals) * 1e3, statistics.median(setups) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--boots', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, 'hostel.db')
+        first = boot(db)
+        assert not first['google_registered'] and not first['authlib_loaded']
+        print(f"first boot        import {first['import'] * 1e3:8.1f} ms   create_app {first['create_app'] * 1e3:8.1f} ms")
+        with sqlite3.connect(db) as conn:
+            conn.executemany("INSERT INTO service_requests (room_id, description, resident_id) VALUES (?, ?, ?)",
+                             ((101 + i % 10, 'Leaking tap', f"resident{i % 60 + 1}@hostel.com") for i in range(args.requests)))
+        warm = boot(db)
+        print(f"later boot        import {warm['import'] * 1e3:8.1f} ms   create_app {warm['create_app'] * 1e3:8.1f} ms")
+
+        def clear_mark():
+            with sqlite3.connect(db) as conn:
+                conn.execute("DELETE FROM bootstrap")
+
+        for label, before in (('marked', None), ('mark cleared', clear_mark)):
+            total, setup = _timed(db, args.boots, before)
+            print(f"boot, {label:12s} process {total:8.1f} ms   create_app {setup:8.1f} ms  (median of {args.boots})")
+        print("  (mark cleared = seeding and room backfill on every boot, as before)")
+
+        fresh = os.path.join(tmp, 'fresh.db')
+        start = time.perf_counter()
+        procs = [subprocess.Popen([sys.executable, '-c', BOOT.format(root=ROOT, db=fresh)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) for _ in range(args.workers)]
+        for proc in procs:
+            _, err = proc.communicate()
+            assert proc.returncode == 0, err
+        print(f"{args.workers} workers at once {(time.perf_counter() - start) * 1e3:8.1f} ms  (fresh database)")
+        assert _query(fresh, "SELECT COUNT(*) FROM bootstrap") == 1
+        assert _query(fresh, "SELECT COUNT(*) FROM users") == 64
+        assert _query(fresh, "SELECT COUNT(*) FROM rooms") == 10
+        assert _query(fresh, "SELECT COUNT(*) FROM technicians") == 3
+
+        cache = os.path.join(tmp, 'google_openid.json')
+        with open(cache, 'w') as f:
+            json.dump({'issuer': 'https://accounts.example', 'authorization_endpoint': 'https://accounts.example/auth',
+                       'token_endpoint': 'https://accounts.example/token', 'jwks_uri': 'https://accounts.example/certs'}, f)
+        _run(GOOGLE_LOGIN.format(root=ROOT, db=db), {'GOOGLE_CLIENT_ID': 'id', 'GOOGLE_CLIENT_SECRET': 'secret', 'GOOGLE_METADATA_CACHE': cache})
+    print("OK: seeded once across concurrent boots; Google metadata loaded lazily from the disk cache")
+
+
+if __name__ == '__main__':
+    main()
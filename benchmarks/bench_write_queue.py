@@ -0,0 +1,120 @@
+"""Service/outing inserts under concurrent submitters, direct vs group commit.
+
+Starts --submitters threads that each file --per-thread requests (alternating
+service and outing) through database.submit_service_request and
+submit_outing_request. It runs once with a commit per insert and once with
+WRITE_BEHIND batching, and prints inserts/sec, latency percentiles and errors
+for each run. It then checks that every acknowledged id is in the
+database, and that a full queue raises WriteQueueFull rather than growing.
+
+    python benchmarks/bench_write_queue.py [--submitters 100] [--per-thread 50]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+import write_queue  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _run(submitters, per_thread, rnd):
+    latencies, acked, errors = [], [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(submitters)
+
+    def submitter(n):
+        email = f"resident{1 + n % 60}@hostel.com"
+        mine, ids, errs = [], [], []
+        barrier.wait()
+        for i in range(per_thread):
+            start = time.perf_counter()
+            try:
+                if i % 2:
+                    # A day of its own per submission: overlapping outings are refused
+                    day = date(2026, 3, 1) + timedelta(days=(rnd * submitters + n) * per_thread + i)
+                    ids.append(('outings', database.submit_outing_request(email, f"{day}T09:00", f"{day}T17:00")))
+                else:
+                    ids.append(('service_requests', database.submit_service_request(101 + n % 10, 'Fan not working', email)))
+            except (sqlite3.Error, write_queue.WriteQueueFull) as exc:
+                errs.append(type(exc).__name__)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+            acked.extend(ids)
+            errors.extend(errs)
+
+    threads = [threading.Thread(target=submitter, args=(n,)) for n in range(submitters)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return wall, latencies, acked, errors
+
+
+def _check_acked(acked):
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        for table in ('service_requests', 'outings'):
+            ids = [i for t, i in acked if t == table]
+            c.execute(f"SELECT COUNT(*) FROM {table} WHERE id IN (SELECT value FROM json_each(?))", (str(ids),))
+            assert c.fetchone()[0] == len(ids), table
+
+
+def _check_backpressure(path):
+    writer = write_queue.GroupCommitWriter(path, max_pending=10, enqueue_timeout=0.05)
+    # Hold the write lock so the writer thread cannot drain the queue
+    blocker = sqlite3.connect(path, timeout=10)
+    blocker.execute("BEGIN IMMEDIATE")
+    futures, refused = [], 0
+    for _ in range(100):
+        try:
+            futures.append(writer.submit_async("INSERT INTO outings (resident_id) VALUES (?)", ('backpressure@hostel.com',)))
+        except write_queue.WriteQueueFull:
+            refused += 1
+    blocker.rollback()
+    blocker.close()
+    for future in futures:
+        future.result(timeout=30)
+    writer.close()
+    assert refused > 0 and len(futures) <= 10 + writer.max_batch, (refused, len(futures))
+    return len(futures), refused
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submitters', type=int, default=100)
+    parser.add_argument('--per-thread', type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        database.init_db()
+        for rnd, behind in enumerate((False, True)):
+            database.WRITE_BEHIND = behind
+            wall, latencies, acked, errors = _run(args.submitters, args.per_thread, rnd)
+            _check_acked(acked)
+            n = len(latencies)
+            label = 'group commit' if behind else 'direct'
+            print(f"{label:13s} {len(acked) / wall:9.0f} inserts/s  p50 {latencies[n // 2] * 1000:7.2f} ms  "
+                  f"p99 {latencies[min(n - 1, n * 99 // 100)] * 1000:7.2f} ms  errors {len(errors)}")
+            if behind:
+                writer = write_queue.get_writer(database.DB_PATH)
+                print(f"{'':13s} {writer.rows} rows in {writer.batches} commits ({writer.rows / max(writer.batches, 1):.1f} per commit)")
+        write_queue.close_writers()
+        accepted, refused = _check_backpressure(database.DB_PATH)
+        print(f"backpressure: {accepted} queued, {refused} refused with WriteQueueFull")
+        close_pools()
+
+
+if __name__ == '__main__':
+    main()
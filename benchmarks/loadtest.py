@@ -0,0 +1,305 @@
+"""Load test for the main Flask endpoints.
+
+Seeds a synthetic hostel (rooms, residents, approved bookings and a request
+history) in a temporary database. It then drives /login, /book,
+/rooms/available, /service, /outing, /approve and /dashboard/warden at each
+concurrency level, through the Flask test client and through a real local
+WSGI server (werkzeug, threaded). For every endpoint, mode and level it
+reports p50/p95/p99 latency, throughput and status codes as JSON, so runs
+on two commits can be compared with --compare. The templates live in the
+repository root, so the app's template_folder is pointed there; every timed
+/dashboard/warden response must be a 200, or the run stops.
+
+    python benchmarks/loadtest.py [--rooms 500] [--residents 2000] [--history 100000]
+        [--requests 500] [--concurrency 1,8,32] [--mode client,server]
+        [--out results.json] [--compare baseline.json]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import database  # noqa: E402
+import cache  # noqa: E402
+import passwords  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+_tmp = tempfile.TemporaryDirectory()
+database.DB_PATH = os.path.join(_tmp.name, 'hostel.db')
+
+from app import app  # noqa: E402
+app.template_folder = ROOT
+from flask_jwt_extended import create_access_token  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+ENDPOINTS = ('login', 'book', 'rooms_available', 'service', 'outing', 'approve', 'dashboard_warden')
+FIRST_ROOM = 1001
+
+
+def seed(rooms, residents, history, beds, occupancy):
+    """Fill the database; returns the housed and unhoused resident emails."""
+    database.init_db()
+    rng = random.Random(42)
+    emails = [f"load{n}@hostel.com" for n in range(1, residents + 1)]
+    room_nos = [FIRST_ROOM + n for n in range(rooms)]
+    # House residents one per bed until the target share of beds is taken
+    housed = emails[:min(len(emails), int(rooms * beds * occupancy))]
+    password_hash = passwords.hash_password('pass123')
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN")
+        c.executemany("INSERT OR IGNORE INTO rooms (room_no, total_beds) VALUES (?, ?)", [(r, beds) for r in room_nos])
+        c.executemany("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, 'resident')", [(e, password_hash) for e in emails])
+        room_of = {email: room_nos[i // beds] for i, email in enumerate(housed)}
+        c.executemany(
+            "INSERT INTO bookings (room_id, group_id, final_timestamp, group_sync_score, status, booked_by, roommates_count) VALUES (?, ?, 0, 0, 'approved', ?, 1)",
+            [(room, f"seed-{email}", email) for email, room in room_of.items()],
+        )
+        statuses = ('pending', 'approved', 'approved', 'rejected')
+        services, outings = [], []
+        for n in range(history):
+            email = housed[rng.randrange(len(housed))] if housed else emails[rng.randrange(len(emails))]
+            status = statuses[rng.randrange(len(statuses))]
+            if n % 2:
+                services.append((room_of.get(email, FIRST_ROOM), 'Seeded request', email, status))
+            else:
+                day = 1 + n % 28
+                start, end = f"2026-02-{day:02d}T10:00", f"2026-02-{day:02d}T18:00"
+                outings.append((email, start, end, database.to_epoch(start), database.to_epoch(end), status))
+        c.executemany("INSERT INTO service_requests (room_id, description, resident_id, status) VALUES (?, ?, ?, ?)", services)
+        c.executemany("INSERT INTO outings (resident_id, start_time, end_time, start_epoch, end_epoch, status) VALUES (?, ?, ?, ?, ?, ?)", outings)
+        conn.commit()
+    database.rebuild_occupancy()
+    cache.invalidate()
+    return housed, emails[len(housed):]
+
+
+class Workload:
+    """Builds the (method, path, body, headers) for the n-th call to an endpoint."""
+
+    def __init__(self, housed, unhoused, rooms):
+        with app.app_context():
+            self.tokens = {e: create_access_token(identity=e, additional_claims={'role': 'resident'}) for e in housed[:500] + unhoused[:500]}
+            self.warden = {'Authorization': 'Bearer ' + create_access_token(identity='warden@hostel.com', additional_claims={'role': 'warden'})}
+        self.housed = housed[:500] or unhoused[:1]
+        self.unhoused = unhoused[:500] or housed[:1]
+        self.rooms = rooms
+        self.outing_seq = itertools.count()
+        with database.get_conn() as conn:
+            c = conn.cursor()
+            c.execute("SELECT id FROM service_requests WHERE status = 'pending' ORDER BY id LIMIT 5000")
+            self.pending = [row[0] for row in c.fetchall()] or [1]
+
+    def _auth(self, email):
+        return {'Authorization': 'Bearer ' + self.tokens[email]}
+
+    def call(self, endpoint, n):
+        if endpoint == 'login':
+            email = self.housed[n % len(self.housed)]
+            return 'POST', '/login', {'email': email, 'password': 'pass123', 'role': 'resident'}, {}
+        if endpoint == 'book':
+            email = self.unhoused[n % len(self.unhoused)]
+            return 'POST', '/book', {'room_id': FIRST_ROOM + n % self.rooms}, self._auth(email)
+        if endpoint == 'rooms_available':
+            return 'GET', '/rooms/available', None, self._auth(self.housed[n % len(self.housed)])
+        if endpoint == 'service':
+            return 'POST', '/service', {'description': 'Fan not working'}, self._auth(self.housed[n % len(self.housed)])
+        if endpoint == 'outing':
+            # Numbered across runs: each resident's next outing is a day later, so none overlap
+            k = next(self.outing_seq)
+            day = datetime(2026, 3, 1, 9) + timedelta(days=k // len(self.housed))
+            body = {'start_time': day.isoformat(timespec='minutes'), 'end_time': (day + timedelta(hours=8)).isoformat(timespec='minutes'), 'reason': 'Family visit'}
+            return 'POST', '/outing', body, self._auth(self.housed[k % len(self.housed)])
+        if endpoint == 'approve':
+            request_id = self.pending[n % len(self.pending)]
+            return 'PUT', f"/approve/service/{request_id}", {'status': 'approved'}, self.warden
+        if endpoint == 'dashboard_warden':
+            return 'GET', '/dashboard/warden', None, self.warden
+        raise ValueError(endpoint)
+
+
+def client_sender():
+    local = threading.local()
+
+    def send(method, path, body, headers):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        resp = client.open(path, method=method, json=body, headers=headers)
+        resp.close()
+        return resp.status_code
+    return send
+
+
+def server_sender(port):
+    def send(method, path, body, headers):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        try:
+            payload = json.dumps(body) if body is not None else None
+            if payload is not None:
+                headers = dict(headers, **{'Content-Type': 'application/json'})
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            return resp.status
+        finally:
+            conn.close()
+    return send
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run(send, workload, endpoint, requests, concurrency):
+    counter = itertools.count()
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+
+    def worker():
+        mine, codes = [], Counter()
+        while True:
+            n = next(counter)
+            if n >= requests:
+                break
+            method, path, body, headers = workload.call(endpoint, n)
+            start = time.perf_counter()
+            try:
+                code = send(method, path, body, headers)
+            except Exception as exc:
+                code = type(exc).__name__
+            mine.append(time.perf_counter() - start)
+            codes[str(code)] += 1
+        with lock:
+            latencies.extend(mine)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    if endpoint == 'dashboard_warden':
+        # An error page renders much faster than the dashboard; its timings would be meaningless
+        assert set(statuses) == {'200'}, statuses
+    latencies.sort()
+    ok = sum(n for code, n in statuses.items() if code.isdigit() and int(code) < 400)
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'ok': ok,
+        'status': dict(statuses),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def _commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(__file__) or '.')
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['mode'], r['endpoint'], r['concurrency']): r for r in json.load(f)['results']}
+    print(f"{'mode':7s} {'endpoint':17s} {'conc':>4s} {'p95 ms':>16s} {'rps':>18s}", file=sys.stderr)
+    for r in results:
+        old = baseline.get((r['mode'], r['endpoint'], r['concurrency']))
+        if old is None:
+            continue
+        p95 = f"{old['p95_ms']:.1f}->{r['p95_ms']:.1f}"
+        rps = f"{old['throughput_rps']:.0f}->{r['throughput_rps']:.0f}"
+        print(f"{r['mode']:7s} {r['endpoint']:17s} {r['concurrency']:4d} {p95:>16s} {rps:>18s}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=500)
+    parser.add_argument('--residents', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=100000)
+    parser.add_argument('--beds', type=int, default=4)
+    parser.add_argument('--occupancy', type=float, default=0.75, help='share of beds taken by seeded residents')
+    parser.add_argument('--requests', type=int, default=500, help='calls per endpoint and concurrency level')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--mode', default='client,server')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--out')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+    levels = [int(x) for x in args.concurrency.split(',') if x]
+    modes = [m for m in args.mode.split(',') if m]
+    endpoints = [e for e in args.endpoints.split(',') if e]
+
+    # Per-request logging would dominate the timings
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    app.logger.disabled = True
+
+    seed_start = time.perf_counter()
+    housed, unhoused = seed(args.rooms, args.residents, args.history, args.beds, args.occupancy)
+    seed_seconds = time.perf_counter() - seed_start
+    workload = Workload(housed, unhoused, args.rooms)
+
+    results = []
+    for mode in modes:
+        server = None
+        if mode == 'server':
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            send = server_sender(server.server_port)
+        elif mode == 'client':
+            send = client_sender()
+        else:
+            parser.error(f"unknown mode {mode}")
+        try:
+            for endpoint in endpoints:
+                for level in levels:
+                    row = dict(mode=mode, **run(send, workload, endpoint, args.requests, level))
+                    results.append(row)
+                    print(f"{mode:7s} {endpoint:17s} c={level:<3d} p50 {row['p50_ms']:8.2f} ms  p95 {row['p95_ms']:8.2f} ms  p99 {row['p99_ms']:8.2f} ms  {row['throughput_rps']:8.1f} rps  {row['status']}", file=sys.stderr)
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    report = {
+        'commit': _commit(),
+        'config': {k: getattr(args, k) for k in ('rooms', 'residents', 'history', 'beds', 'occupancy', 'requests')},
+        'seed_seconds': round(seed_seconds, 2),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+    close_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Deterministic simulation of technician dispatch.
+
+Replays a seeded week of service requests through dispatch.Dispatcher:
+tickets arrive at random (bursty in a few hot rooms), technicians finish
+assigned tickets after a random service time, and a dispatch round runs
+every few simulated minutes. After every decision it checks, by brute
+force over all waiting tickets, that the ticket handed out had the highest
+score at that moment, and that no technician is over capacity. The same
+seed must give the same assignment log twice; a different seed must not.
+
+    python benchmarks/sim_dispatch.py [--seed 7] [--days 7] [--technicians 6]
+"""
+import argparse
+import hashlib
+import heapq
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import dispatch  # noqa: E402
+
+START = 1_767_225_600  # 2026-01-01 00:00 hostel time
+
+
+def simulate(seed, days, technicians, check=True):
+    rnd = random.Random(seed)
+    rooms = list(range(101, 161))
+    hot = rooms[:6]
+    techs = [dispatch.Technician(f"tech{i + 1}", rnd.choice((2, 3, 4)), 0) for i in range(technicians)]
+    capacity = {t.id: t.capacity for t in techs}
+    heat = {room: rnd.randint(0, 30) for room in rooms}
+    d = dispatch.Dispatcher(techs, heat=heat)
+    waiting = {}            # ticket id -> Ticket, mirrored for the brute-force check
+    room_of = {}            # ticket id -> room
+    open_rooms = {}         # room -> open (waiting + assigned) tickets
+    heat = dict(heat)
+    finishes = []           # (finish time, ticket id, technician id)
+    load = {t.id: 0 for t in techs}
+    log = []
+    next_id = 1
+    now = START
+    end = START + days * 86400
+    while now < end:
+        now += 300
+        # Arrivals: about 7 an hour, close to what the technicians can clear; a third in the hot rooms
+        for _ in range(rnd.choices((0, 1, 2), (0.55, 0.3, 0.15))[0]):
+            room = rnd.choice(hot) if rnd.random() < 0.33 else rnd.choice(rooms)
+            ticket = dispatch.Ticket(next_id, room, now - rnd.randint(0, 299))
+            next_id += 1
+            d.add(ticket)
+            waiting[ticket.id] = ticket
+            room_of[ticket.id] = room
+            open_rooms[room] = open_rooms.get(room, 0) + 1
+            heat[room] = heat.get(room, 0) + 1
+        # Completions free a technician slot
+        while finishes and finishes[0][0] <= now:
+            _, ticket_id, technician_id = heapq.heappop(finishes)
+            assert d.close(ticket_id)
+            load[technician_id] -= 1
+            open_rooms[room_of[ticket_id]] -= 1
+        # A dispatch round every 15 minutes
+        if now % 900:
+            continue
+        while True:
+            if check and waiting:
+                best = max(waiting.values(), key=lambda t: (_score(t, now, heat, open_rooms), -t.id))
+                assert abs(d.score(best.id, now) - _score(best, now, heat, open_rooms)) < 1e-6
+            step = d.next_assignment()
+            if step is None:
+                assert not waiting or all(load[t] >= capacity[t] for t in load), 'idle technician with tickets waiting'
+                break
+            ticket, technician_id = step
+            if check:
+                # Equal scores may differ in the last bits between the two formulas
+                assert ticket.id == best.id or abs(_score(ticket, now, heat, open_rooms) - _score(best, now, heat, open_rooms)) < 1e-9, \
+                    f"assigned {ticket.id}, highest score was {best.id}"
+            del waiting[ticket.id]
+            load[technician_id] += 1
+            assert load[technician_id] <= capacity[technician_id], f"{technician_id} over capacity"
+            assert d.loads()[technician_id] == (capacity[technician_id], load[technician_id])
+            log.append((ticket.id, ticket.room, technician_id, now))
+            heapq.heappush(finishes, (now + rnd.randint(1800, 4 * 3600), ticket.id, technician_id))
+    return log, len(waiting)
+
+
+def _score(ticket, now, heat, open_rooms):
+    return (dispatch.AGE_WEIGHT * (now - ticket.created_at) / 3600.0
+            + dispatch.HEAT_WEIGHT * math.log1p(heat.get(ticket.room, 0))
+            + dispatch.REPEAT_WEIGHT * (open_rooms[ticket.room] - 1))
+
+
+def _digest(log):
+    return hashlib.sha256(repr(log).encode()).hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--technicians', type=int, default=6)
+    args = parser.parse_args()
+    log, waiting = simulate(args.seed, args.days, args.technicians)
+    again, _ = simulate(args.seed, args.days, args.technicians, check=False)
+    other, _ = simulate(args.seed + 1, args.days, args.technicians, check=False)
+    assert log == again, 'same seed gave a different plan'
+    assert log != other, 'different seeds gave the same plan'
+    print(f"{len(log)} assignments over {args.days} days, {waiting} still waiting at the end")
+    print(f"plan digest {_digest(log)} (seed {args.seed}), deterministic: ok, priority order: ok, capacity: ok")
+
+
+if __name__ == '__main__':
+    main()
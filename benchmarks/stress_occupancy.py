@@ -0,0 +1,104 @@
+"""Concurrent approval stress test for room occupancy counters.
+
+Files three times more pending bookings than there are beds, then lets many
+threads approve, reject and cancel them at random. Afterwards it checks that
+no room is overbooked, that room_occupancy matches the approved bookings and
+that no resident holds two approved bookings. Prints decisions/sec.
+
+    python benchmarks/stress_occupancy.py [--rooms 50] [--threads 16]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import database  # noqa: E402
+from db_pool import close_pools  # noqa: E402
+
+
+def _seed(rooms, beds):
+    database.init_db()
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute("DELETE FROM rooms")
+        c.executemany("INSERT INTO rooms (room_no, total_beds) VALUES (?, ?)", [(1000 + i, beds) for i in range(rooms)])
+        conn.commit()
+    n = 0
+    for i in range(rooms):
+        for _ in range(beds * 3):
+            n += 1
+            database.book_room(1000 + i, f"g{n}", 0, 0, f"stress{n}@hostel.com", random.choice((1, 1, 2)))
+    with database.get_conn() as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM bookings WHERE status = 'pending'")]
+
+
+def _check():
+    with database.get_conn() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT r.room_no, r.total_beds, IFNULL(o.occupied, 0),
+                   (SELECT IFNULL(SUM(roommates_count), 0) FROM bookings b WHERE b.room_id = r.room_no AND b.status = 'approved')
+            FROM rooms r LEFT JOIN room_occupancy o ON o.room_no = r.room_no
+            """
+        )
+        for room_no, total_beds, counter, actual in c.fetchall():
+            assert actual <= total_beds, f"room {room_no} overbooked: {actual}/{total_beds}"
+            assert counter == actual, f"room {room_no} counter {counter} != approved beds {actual}"
+        c.execute("SELECT booked_by FROM bookings WHERE status = 'approved' GROUP BY booked_by HAVING COUNT(*) > 1")
+        assert not c.fetchall(), "resident with two approved bookings"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--beds', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'hostel.db')
+        ids = _seed(args.rooms, args.beds)
+        stats = {'approved': 0, 'rejected_full': 0, 'other': 0}
+        lock = threading.Lock()
+
+        def worker(chunk, rnd):
+            for booking_id in chunk:
+                status = rnd.choices(('approved', 'rejected', 'cancelled'), (8, 1, 1))[0]
+                try:
+                    database.update_request_status('booking', booking_id, status, None)
+                    key = 'approved' if status == 'approved' else 'other'
+                except database.BookingRejected:
+                    key = 'rejected_full'
+                with lock:
+                    stats[key] += 1
+                # Occasionally cancel an approval to free beds while others race for them
+                if status == 'approved' and rnd.random() < 0.05:
+                    database.update_request_status('booking', booking_id, 'cancelled', None)
+
+        random.shuffle(ids)
+        # Every booking is decided twice so threads collide on the same rows too
+        work = ids + random.sample(ids, len(ids))
+        chunks = [work[i::args.threads] for i in range(args.threads)]
+        threads = [threading.Thread(target=worker, args=(chunk, random.Random(i))) for i, chunk in enumerate(chunks)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        _check()
+        close_pools()
+    total = sum(stats.values())
+    print(f"{total} decisions in {elapsed:.2f}s ({total / elapsed:.0f}/s) with {args.threads} threads: {stats}")
+    print("OK: no overbooking, counters consistent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Memoization for dashboard aggregates that only change on writes.
+
+Results are cached per key (database path) and call arguments until a write
+in database.py invalidates or patches them. Writes from other processes are
+seen through version=: a function of the key returning the data version a
+result depends on (a data_versions counter), read before each lookup; an
+entry is served only while it was stamped with the current version. An
+optional TTL bounds staleness otherwise; ttl=0 turns a cache off, and
+store_none=False keeps None results out (so a miss is never remembered).
+Each cache keeps hit/miss counters.
+
+Fills are guarded by a generation number: if a write lands while a result is
+being computed, the (possibly stale) result is returned but not stored. A
+write that patches cached values instead runs under holding(): while it is
+in flight nothing is stored for its key, so a value filled after the commit
+(which already counts the write) can never be patched a second time. A
+patch given the version before and after its write restamps the entries it
+applies to, so they stay current; entries stamped with any other version
+are dropped.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', '0')) or None
+
+_registry = {}
+
+
+class Memo:
+    def __init__(self, name, fn, key=None, ttl=DEFAULT_TTL, version=None, store_none=True):
+        self.name = name
+        self.fn = fn
+        self.key = key or (lambda: None)
+        self.ttl = ttl
+        self.version = version
+        self.store_none = store_none
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._gen = 0
+        self._held = {}
+        self._lock = threading.Lock()
+
+    def get(self, *args):
+        if self.ttl == 0:
+            self.misses += 1
+            return self.fn(*args)
+        k = (self.key(),) + args
+        stamp = self.version(k[0]) if self.version else None
+        entry = self._entries.get(k)
+        if entry is not None and (entry[1] is None or time.monotonic() < entry[1]) and entry[2] == stamp:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        gen = self._gen
+        value = self.fn(*args)
+        with self._lock:
+            if self._gen == gen and k[0] not in self._held and None not in self._held and (value is not None or self.store_none):
+                expires = time.monotonic() + self.ttl if self.ttl else None
+                self._entries[k] = (value, expires, stamp)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._gen += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                for k in [k for k in self._entries if k[0] == key]:
+                    del self._entries[k]
+
+    def hold(self, key=None):
+        with self._lock:
+            self._gen += 1
+            self._held[key] = self._held.get(key, 0) + 1
+
+    def release(self, key=None, failed=False):
+        with self._lock:
+            if self._held[key] > 1:
+                self._held[key] -= 1
+            else:
+                del self._held[key]
+        if failed:
+            # The write may have committed without its patch being applied
+            self.invalidate(key)
+
+    def patch(self, fn, key=None, versions=None):
+        """Replace cached values for key with fn(value); fn must return a new object.
+        versions=(before, after) are the data versions around the write being applied."""
+        with self._lock:
+            self._gen += 1
+            for k, (value, expires, stamp) in list(self._entries.items()):
+                if key is not None and k[0] != key:
+                    continue
+                if versions is None:
+                    self._entries[k] = (fn(value), expires, stamp)
+                elif stamp in versions:
+                    # Stamped after: an earlier patch of the same write (a batch of decisions)
+                    self._entries[k] = (fn(value), expires, versions[1])
+                else:
+                    del self._entries[k]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': round(self.hits / total, 4) if total else 0.0, 'entries': len(self._entries)}
+
+
+def cached(name, key=None, ttl=DEFAULT_TTL, version=None, store_none=True):
+    """Decorator registering fn as a named Memo; the wrapper keeps fn as .uncached."""
+    def decorate(fn):
+        memo = Memo(name, fn, key, ttl, version, store_none)
+        _registry[name] = memo
+
+        @wraps(fn)
+        def wrapper(*args):
+            return memo.get(*args)
+        wrapper.memo = memo
+        wrapper.uncached = fn
+        return wrapper
+    return decorate
+
+
+def invalidate(*names, key=None):
+    for name in names or list(_registry):
+        memo = _registry.get(name)
+        if memo is not None:
+            memo.invalidate(key)
+
+
+@contextmanager
+def holding(*names, key=None):
+    """Run a write whose effect is then patch()ed into the named caches: results computed
+    while it is in flight are not stored, so only pre-write values get the patch."""
+    memos = [_registry[name] for name in names if name in _registry]
+    for memo in memos:
+        memo.hold(key)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        for memo in memos:
+            memo.release(key, failed)
+
+
+def patch(name, fn, key=None, versions=None):
+    memo = _registry.get(name)
+    if memo is not None:
+        memo.patch(fn, key, versions)
+
+
+def stats():
+    return {name: memo.stats() for name, memo in _registry.items()}
@@ -1,83 +1,121 @@
 import sqlite3
 import os
+import calendar
 from datetime import datetime
-import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from contextvars import ContextVar
+from db_pool import get_pool
+from migrations import run_migrations
+from events import publish
+import cache
+import allocator
+import dispatch
+import passwords
+import write_queue
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'hostel.db')
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users (
-        email TEXT PRIMARY KEY,
-        password TEXT NOT NULL,
-        role TEXT NOT NULL
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS bookings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        room_id INTEGER NOT NULL,
-        group_id TEXT,
-        final_timestamp TEXT,
-        group_sync_score FLOAT,
-        status TEXT DEFAULT 'pending'
-    )''')
-    # Add columns to bookings if missing
-    try:
-        c.execute("ALTER TABLE bookings ADD COLUMN booked_by TEXT")
-    except sqlite3.OperationalError:
-        pass
-    try:
-        c.execute("ALTER TABLE bookings ADD COLUMN roommates_count INTEGER DEFAULT 1")
-    except sqlite3.OperationalError:
-        pass
-    # Rooms table with capacities
-    c.execute('''CREATE TABLE IF NOT EXISTS rooms (
-        room_no INTEGER PRIMARY KEY,
-        total_beds INTEGER NOT NULL
-    )''')
-    c.execute('''CREATE TABLE IF NOT EXISTS service_requests (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        room_id INTEGER NOT NULL,
-        description TEXT,
-        status TEXT DEFAULT 'pending',
-        warden_reason TEXT,
-        technician TEXT
-    )''')
-    # Add resident_id to service_requests if missing
+DEFAULT_TOTAL_BEDS = 4
+# Seconds an email -> approved room lookup may be served from memory (0 disables). Only found
+# rooms are kept: a resident approved by another worker must not be refused in the meantime
+USER_ROOM_CACHE_TTL = float(os.environ.get('USER_ROOM_CACHE_TTL', '30'))
+# Seconds the public next-resident suggestion may be served from memory; bookings made
+# by this process invalidate it at once, other processes' after at most this long
+NEXT_RESIDENT_CACHE_TTL = float(os.environ.get('NEXT_RESIDENT_CACHE_TTL', '30'))
+# Batch service/outing inserts through one group-commit writer thread (see write_queue.py)
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND') == '1'
+# Seconds the in-memory dispatch queue is trusted before it is reloaded, which picks up
+# service requests filed or decided by other worker processes
+DISPATCH_RESYNC_SECONDS = float(os.environ.get('DISPATCH_RESYNC_SECONDS', '60'))
+
+class BookingRejected(Exception):
+    """Raised when a booking cannot be approved (room full, resident already housed)."""
+
+class OutingRejected(Exception):
+    """Raised when an outing overlaps one of the resident's pending or approved outings."""
+
+# Set by use_db() while a call is routed to one block's database (see shards.py)
+_routed_path = ContextVar('routed_db_path', default=None)
+
+def db_path():
+    """The database file calls in this context use: the routed block's, else DB_PATH."""
+    return _routed_path.get() or DB_PATH
+
+@contextmanager
+def use_db(path):
+    """Run the database calls in this block against path instead of DB_PATH."""
+    token = _routed_path.set(path)
     try:
-        c.execute("ALTER TABLE service_requests ADD COLUMN resident_id TEXT")
-    except sqlite3.OperationalError:
-        pass
-    c.execute('''CREATE TABLE IF NOT EXISTS outings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        resident_id TEXT,
-        start_time TEXT,
-        end_time TEXT,
-        status TEXT DEFAULT 'pending',
-        warden_reason TEXT
-    )''')
-    # Basic profiles for greeting and details
-    c.execute('''CREATE TABLE IF NOT EXISTS profiles (
-        email TEXT PRIMARY KEY,
-        display_name TEXT,
-        phone TEXT
-    )''')
+        yield
+    finally:
+        _routed_path.reset(token)
+
+def _db_key():
+    # Cached aggregates are kept per database file
+    return db_path()
+
+def _scope_version(c, scope):
+    c.execute("SELECT version FROM data_versions WHERE scope = ?", (scope,))
+    row = c.fetchone()
+    return row[0] if row else 0
+
+def _rooms_version(path):
+    # The heatmaps' data version (see migrations._m010_data_versions), bumped by writes from any process
+    with get_conn(path) as conn:
+        return _scope_version(conn.cursor(), 'rooms')
+
+def get_conn(path=None):
+    """Borrow a pooled connection to db_path() (or path); use as `with get_conn() as conn:`."""
+    return get_pool(path or db_path()).connection()
+
+def init_db(seed_accounts=True, seed_rooms=range(101, 111)):
+    """Migrate db_path() and seed demo data. Block databases (shards.py) seed their own
+    rooms and no accounts; accounts live in DB_PATH.
+
+    Seeding runs once per database file: it is marked done in the bootstrap table in the
+    same transaction, so later boots (and workers that waited on the lock) only check the mark.
+    """
+    with get_conn() as conn:
+        # Schema and indexes are versioned in migrations.py
+        run_migrations(conn)
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM bootstrap WHERE step = 'seed'")
+        if c.fetchone() is None:
+            if conn.in_transaction:
+                conn.commit()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("SELECT 1 FROM bootstrap WHERE step = 'seed'")
+            if c.fetchone() is None:
+                _seed(c, seed_accounts, seed_rooms)
+                c.execute("INSERT INTO bootstrap (step, done_at) VALUES ('seed', ?)", (datetime.utcnow().isoformat(),))
+            conn.commit()
+    cache.invalidate(key=db_path())
+
+def _seed(c, seed_accounts, seed_rooms):
     # Sample data (support both example.com and hostel.com emails)
-    c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", ('resident@example.com', 'pass123', 'resident'))
-    c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", ('warden@example.com', 'pass123', 'warden'))
-    c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", ('resident@hostel.com', 'pass123', 'resident'))
-    c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", ('warden@hostel.com', 'pass123', 'warden'))
+    seed_users = [('resident@example.com', 'resident'), ('warden@example.com', 'warden'), ('resident@hostel.com', 'resident'), ('warden@hostel.com', 'warden')]
     # Seed residents resident1..resident60 (emails: residentN@hostel.com)
-    for n in range(1, 61):
-        email = f"resident{n}@hostel.com"
-        c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", (email, 'pass123', 'resident'))
+    seed_users += [(f"resident{n}@hostel.com", 'resident') for n in range(1, 61)]
+    c.execute(f"SELECT COUNT(*) FROM users WHERE email IN ({','.join('?' * len(seed_users))})", [email for email, _ in seed_users])
+    if seed_accounts and c.fetchone()[0] < len(seed_users):
+        # Demo accounts share one password, so hash it once rather than once per row
+        seed_hash = passwords.hash_password('pass123')
+        c.executemany("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", [(email, seed_hash, role) for email, role in seed_users])
     # Seed rooms if empty
     c.execute("SELECT COUNT(*) FROM rooms")
     if c.fetchone()[0] == 0:
-        # Create rooms 101-110, 4 beds each
-        for rn in range(101, 111):
-            c.execute("INSERT INTO rooms (room_no, total_beds) VALUES (?, ?)", (rn, 4))
-    conn.commit()
+        # Create rooms 101-110 by default, 4 beds each
+        c.executemany("INSERT INTO rooms (room_no, total_beds) VALUES (?, ?)", [(rn, 4) for rn in seed_rooms])
+    # Seed technicians if empty
+    c.execute("SELECT COUNT(*) FROM technicians")
+    if c.fetchone()[0] == 0:
+        c.executemany(
+            "INSERT INTO technicians (id, name, specialization, capacity) VALUES (?, ?, ?, ?)",
+            [('tech1', 'Ravi Kumar', 'electrical', 3), ('tech2', 'Anita Desai', 'plumbing', 3), ('tech3', 'Sameer Khan', 'general', 4)],
+        )
     # Backfill service_requests that accidentally used small room IDs (1,2,3...) by mapping to the resident's approved room
     try:
         c.execute(
@@ -94,235 +132,698 @@ def init_db():
               )
             """
         )
-        conn.commit()
-    except Exception:
+    except sqlite3.Error:
         # Best-effort backfill; ignore if fails
         pass
-    conn.close()
 
 def get_user(email, password, role):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email = ? AND password = ? AND role = ?", (email, password, role))
-    user = c.fetchone()
-    conn.close()
+    """Return the user row if the credentials match, else None.
+
+    Raises passwords.LoginBusy when the KDF pool is saturated. Legacy plaintext
+    rows are re-stored as hashes after a successful login, when the pool has room.
+    """
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT email, password, role FROM users WHERE email = ? AND role = ?", (email, role))
+        user = c.fetchone()
+    # Unknown accounts are verified against a dummy hash, so the response time does not reveal them
+    if not passwords.verify_password(password, user[1] if user else None) or user is None:
+        return None
+    if passwords.needs_rehash(user[1]):
+        try:
+            rehashed = passwords.hash_password(password)
+        except passwords.LoginBusy:
+            # The password checked out; upgrade the row on a later login rather than fail this one
+            return user
+        with get_conn() as conn:
+            # Compare-and-set so a concurrent password change is not overwritten
+            conn.execute("UPDATE users SET password = ? WHERE email = ? AND password = ?", (rehashed, email, user[1]))
+            conn.commit()
     return user
 
 def get_user_requests(email):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # Services created by the user OR for any room the user is booked into (deduplicated)
-    c.execute(
-        """
-        SELECT DISTINCT 'service' as type, id, status, IFNULL(warden_reason,'')
-        FROM service_requests
-        WHERE resident_id = ?
-           OR room_id IN (SELECT room_id FROM bookings WHERE booked_by = ?)
-        ORDER BY id DESC
-        """,
-        (email, email),
-    )
-    services = c.fetchall()
-    # Outings
-    c.execute("SELECT 'outing' as type, id, status, IFNULL(warden_reason,'') FROM outings WHERE resident_id = ?", (email,))
-    outings = c.fetchall()
-    # Bookings by user
-    c.execute("SELECT 'booking' as type, id, status, CAST(room_id AS TEXT) FROM bookings WHERE booked_by = ? ORDER BY id DESC", (email,))
-    bookings = c.fetchall()
-    requests = services + outings + bookings
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        # Services created by the user OR for any room the user is booked into (rows are unique by id).
+        # Every query also reads the archive tables (see archive.py), so history stays visible.
+        rooms = "SELECT room_id FROM bookings WHERE booked_by = ? UNION SELECT room_id FROM bookings_archive WHERE booked_by = ?"
+        c.execute(
+            f"""
+            SELECT 'service' as type, id, status, IFNULL(warden_reason,'')
+            FROM service_requests
+            WHERE resident_id = ? OR room_id IN ({rooms})
+            UNION ALL
+            SELECT 'service', id, status, IFNULL(warden_reason,'')
+            FROM service_requests_archive
+            WHERE resident_id = ? OR room_id IN ({rooms})
+            ORDER BY id DESC
+            """,
+            (email, email, email) * 2,
+        )
+        services = c.fetchall()
+        # Outings
+        c.execute("SELECT 'outing' as type, id, status, IFNULL(warden_reason,'') FROM outings WHERE resident_id = ? UNION ALL SELECT 'outing', id, status, IFNULL(warden_reason,'') FROM outings_archive WHERE resident_id = ?", (email, email))
+        outings = c.fetchall()
+        # Bookings by user
+        c.execute("SELECT 'booking' as type, id, status, CAST(room_id AS TEXT) FROM bookings WHERE booked_by = ? UNION ALL SELECT 'booking', id, status, CAST(room_id AS TEXT) FROM bookings_archive WHERE booked_by = ? ORDER BY id DESC", (email, email))
+        bookings = c.fetchall()
+        requests = services + outings + bookings
     return requests
 
 def book_room(room_id, group_id, final_timestamp, group_sync_score, booked_by, roommates_count):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    try:
-        c.execute("BEGIN TRANSACTION")
-        # Prevent duplicate approved bookings for the same user
-        c.execute("SELECT COUNT(1) FROM bookings WHERE booked_by = ? AND status = 'approved'", (booked_by,))
-        if c.fetchone()[0] > 0:
-            conn.rollback()
-            return
-        # Compute available beds
-        c.execute("SELECT total_beds FROM rooms WHERE room_no = ?", (room_id,))
-        room = c.fetchone()
-        total_beds = room[0] if room else 4
-        c.execute("SELECT IFNULL(SUM(roommates_count),0) FROM bookings WHERE room_id = ? AND status = 'approved'", (room_id,))
-        occupied = c.fetchone()[0]
-        available = max(total_beds - occupied, 0)
-        if roommates_count <= available and roommates_count > 0:
-            c.execute("INSERT INTO bookings (room_id, group_id, final_timestamp, group_sync_score, status, booked_by, roommates_count) VALUES (?, ?, ?, ?, ?, ?, ?)", (room_id, group_id, final_timestamp, group_sync_score, 'pending', booked_by, roommates_count))
-            conn.commit()
-        else:
+    with get_conn() as conn:
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN TRANSACTION")
+            # Prevent duplicate approved bookings for the same user
+            c.execute("SELECT COUNT(1) FROM bookings WHERE booked_by = ? AND status = 'approved'", (booked_by,))
+            if c.fetchone()[0] > 0:
+                conn.rollback()
+                return
+            # Free beds from the maintained occupancy counters (no SUM over bookings)
+            available = _available_beds(c, room_id)
+            if roommates_count <= available and roommates_count > 0:
+                c.execute("INSERT INTO bookings (room_id, group_id, final_timestamp, group_sync_score, status, booked_by, roommates_count, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (room_id, group_id, final_timestamp, group_sync_score, 'pending', booked_by, roommates_count, now_epoch()))
+                conn.commit()
+                cache.invalidate('next_resident', key=db_path())
+                publish('request.created', type='booking', id=c.lastrowid, ref=room_id, info=booked_by, status='pending')
+                return c.lastrowid
+            else:
+                conn.rollback()
+        except:
             conn.rollback()
-    except:
-        conn.rollback()
-    finally:
-        conn.close()
 
+def _patches(*names):
+    """Decorator for writes that patch the named caches once committed (see cache.holding)."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with cache.holding(*names, key=db_path()):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _insert(sql, params):
+    """Insert one row and return its id once committed (batched through write_queue in write-behind mode)."""
+    if WRITE_BEHIND:
+        return write_queue.get_writer(db_path()).submit(sql, params)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute(sql, params)
+        conn.commit()
+        # A conditional INSERT ... SELECT ... WHERE may add nothing
+        return c.lastrowid if c.rowcount else None
+
+@_patches('heatmap')
 def submit_service_request(room_id, description, resident_id=None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO service_requests (room_id, description, resident_id) VALUES (?, ?, ?)", (room_id, description, resident_id))
-    conn.commit()
-    conn.close()
+    created_at = now_epoch()
+    sql, params = "INSERT INTO service_requests (room_id, description, resident_id, created_at) VALUES (?, ?, ?, ?)", (room_id, description, resident_id, created_at)
+    versions = None
+    if WRITE_BEHIND:
+        new_id = _insert(sql, params)
+    else:
+        with get_conn() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            before = _scope_version(c, 'rooms')
+            c.execute(sql, params)
+            new_id = c.lastrowid
+            versions = (before, _scope_version(c, 'rooms'))
+            conn.commit()
+    # Requests are filed against the resident's approved room, which is also their heatmap room
+    cache.patch('heatmap', lambda rows: [(r, n + 1 if r == room_id else n) for r, n in rows], key=db_path(), versions=versions)
+    _update_dispatcher(lambda d: d.add(dispatch.Ticket(new_id, room_id, created_at)))
+    info = (description or '') + (f" (by {resident_id})" if resident_id is not None else '')
+    publish('request.created', type='service', id=new_id, ref=room_id, info=info, status='pending')
+    return new_id
+
+def to_epoch(value):
+    """Epoch seconds for an ISO datetime. Naive times (what the forms send) are
+    hostel wall-clock time and are encoded as if UTC, like SQLite's strftime('%s')."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        return int(dt.timestamp())
+    return calendar.timegm(dt.timetuple())
+
+def now_epoch():
+    return calendar.timegm(datetime.now().timetuple())
 
 def submit_outing_request(resident_id, start_time, end_time):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO outings (resident_id, start_time, end_time) VALUES (?, ?, ?)", (resident_id, start_time, end_time))
-    conn.commit()
-    conn.close()
+    start, end = to_epoch(start_time), to_epoch(end_time)
+    # Overlap check and insert are one statement, so they stay atomic under write-behind too
+    new_id = _insert(
+        "INSERT INTO outings (resident_id, start_time, end_time, start_epoch, end_epoch, created_at) SELECT ?, ?, ?, ?, ?, ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM outings WHERE resident_id = ? AND end_epoch > ? AND start_epoch < ? AND status != 'rejected')",
+        (resident_id, start_time, end_time, start, end, now_epoch(), resident_id, start, end),
+    )
+    if new_id is None:
+        raise OutingRejected('Outing overlaps another outing request')
+    publish('request.created', type='outing', id=new_id, ref=resident_id, info=f"{start_time or ''} → {end_time or ''}", status='pending')
+    return new_id
 
 def get_pending_requests():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT id, 'service' as type, room_id, IFNULL(description,'') || CASE WHEN resident_id IS NOT NULL THEN ' (by '|| resident_id ||')' ELSE '' END as info, status, warden_reason FROM service_requests WHERE status = 'pending' UNION ALL SELECT id, 'outing' as type, resident_id, IFNULL(start_time,'') || ' → ' || IFNULL(end_time,'') as info, status, warden_reason FROM outings WHERE status = 'pending' UNION ALL SELECT id, 'booking' as type, room_id, booked_by, status, NULL FROM bookings WHERE status = 'pending'")
-    requests = c.fetchall()
-    # Also compute simple counters
-    c.execute("SELECT COUNT(*) FROM service_requests WHERE status='pending'")
-    svc = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM outings WHERE status='pending'")
-    out = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM bookings WHERE status='pending'")
-    bok = c.fetchone()[0]
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, 'service' as type, room_id, IFNULL(description,'') || CASE WHEN resident_id IS NOT NULL THEN ' (by '|| resident_id ||')' ELSE '' END as info, status, warden_reason FROM service_requests WHERE status = 'pending' UNION ALL SELECT id, 'outing' as type, resident_id, IFNULL(start_time,'') || ' → ' || IFNULL(end_time,'') as info, status, warden_reason FROM outings WHERE status = 'pending' UNION ALL SELECT id, 'booking' as type, room_id, booked_by, status, NULL FROM bookings WHERE status = 'pending'")
+        requests = c.fetchall()
+        # Also compute simple counters
+        c.execute("SELECT COUNT(*) FROM service_requests WHERE status='pending'")
+        svc = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM outings WHERE status='pending'")
+        out = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM bookings WHERE status='pending'")
+        bok = c.fetchone()[0]
     return requests, {'service': svc, 'outing': out, 'booking': bok}
 
+# Listing order for keyset pagination: by type, then newest id first within a type
+REQUEST_TYPES = ('booking', 'outing', 'service')
+# Statuses a warden decision may set
+REQUEST_STATUSES = ('approved', 'rejected', 'pending')
+MAX_PAGE_SIZE = 200
+
+_LIST_SELECT = {
+    'service': "SELECT id, room_id, IFNULL(description,'') || CASE WHEN resident_id IS NOT NULL THEN ' (by '|| resident_id ||')' ELSE '' END, status, warden_reason FROM {table}",
+    'outing': "SELECT id, resident_id, IFNULL(start_time,'') || ' → ' || IFNULL(end_time,''), status, warden_reason FROM {table}",
+    'booking': "SELECT id, room_id, booked_by, status, NULL FROM {table}",
+}
+_ROOM_FILTER = {
+    'service': "room_id = ?",
+    'outing': "resident_id IN (SELECT booked_by FROM bookings WHERE room_id = ? AND status = 'approved')",
+    'booking': "room_id = ?",
+}
+_LIST_TABLE = {'service': 'service_requests', 'outing': 'outings', 'booking': 'bookings'}
+_RESIDENT_COLUMN = {'service': 'resident_id', 'outing': 'resident_id', 'booking': 'booked_by'}
+
+def parse_cursor(cursor):
+    """Parse a 'type:id' cursor; returns None for a missing or malformed one."""
+    if not cursor or ':' not in cursor:
+        return None
+    type, _, id = cursor.partition(':')
+    if type not in REQUEST_TYPES or not id.isdigit():
+        return None
+    return type, int(id)
+
+def _list_filters(type, status, room, resident, resident_rooms):
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if room is not None:
+        where.append(_ROOM_FILTER[type])
+        params.append(room)
+    if resident:
+        if type == 'service' and resident_rooms:
+            # Residents also see requests filed for rooms they booked into
+            where.append(f"(resident_id = ? OR room_id IN ({','.join('?' * len(resident_rooms))}))")
+            params.extend([resident] + resident_rooms)
+        else:
+            where.append(f"{_RESIDENT_COLUMN[type]} = ?")
+            params.append(resident)
+    return where, params
+
+def list_requests(types=None, status=None, room=None, resident=None, cursor=None, limit=50, include_total=False, with_room_services=False):
+    """One keyset-paginated page of requests across services, outings and bookings.
+
+    Pages are ordered by (type, id DESC) and continue after cursor ('type:id'),
+    so each page is a handful of index range scans however long the history is.
+    with_room_services widens a resident filter to services in rooms they booked,
+    matching get_user_requests. Unless only pending rows are asked for, each type
+    also reads its archive table (merged by id). Returns {'items', 'next_cursor'}
+    and 'total' when asked.
+    """
+    types = [t for t in REQUEST_TYPES if not types or t in types]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    after = parse_cursor(cursor)
+    items = []
+    total = 0 if include_total else None
+    with get_conn() as conn:
+        c = conn.cursor()
+        resident_rooms = []
+        if resident and with_room_services:
+            c.execute("SELECT room_id FROM bookings WHERE booked_by = ? UNION SELECT room_id FROM bookings_archive WHERE booked_by = ?", (resident, resident))
+            resident_rooms = [row[0] for row in c.fetchall()]
+        for type in types:
+            # Archived rows are never pending
+            tables = [_LIST_TABLE[type]] if status == 'pending' else [_LIST_TABLE[type], _LIST_TABLE[type] + '_archive']
+            where, params = _list_filters(type, status, room, resident, resident_rooms)
+            if include_total:
+                where_sql = ' WHERE ' + ' AND '.join(where) if where else ''
+                c.execute('SELECT ' + ' + '.join(f"(SELECT COUNT(*) FROM {t}{where_sql})" for t in tables), params * len(tables))
+                total += c.fetchone()[0]
+            if len(items) > limit or (after and REQUEST_TYPES.index(type) < REQUEST_TYPES.index(after[0])):
+                continue
+            if after and type == after[0]:
+                where = where + ["id < ?"]
+                params = params + [after[1]]
+            where_sql = ' WHERE ' + ' AND '.join(where) if where else ''
+            # A compound ORDER BY merges the per-table index scans, so LIMIT still stops early
+            sql = ' UNION ALL '.join(_LIST_SELECT[type].format(table=t) + where_sql for t in tables) + " ORDER BY id DESC LIMIT ?"
+            c.execute(sql, params * len(tables) + [limit + 1 - len(items)])
+            for id, ref, info, row_status, reason in c.fetchall():
+                items.append({'type': type, 'id': id, 'ref': ref, 'info': info, 'status': row_status, 'reason': reason})
+    # One extra row was fetched to learn whether another page exists
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = f"{items[-1]['type']}:{items[-1]['id']}"
+    page = {'items': items, 'next_cursor': next_cursor}
+    if include_total:
+        page['total'] = total
+    return page
+
 def get_profile(email: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT display_name, phone FROM profiles WHERE email = ?", (email,))
-    row = c.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT display_name, phone FROM profiles WHERE email = ?", (email,))
+        row = c.fetchone()
     if row:
         return {'display_name': row[0], 'phone': row[1]}
     return None
 
 def upsert_profile(email: str, display_name: str, phone: str = None):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO profiles (email, display_name, phone) VALUES (?, ?, ?) ON CONFLICT(email) DO UPDATE SET display_name=excluded.display_name, phone=COALESCE(excluded.phone, profiles.phone)", (email, display_name, phone))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO profiles (email, display_name, phone) VALUES (?, ?, ?) ON CONFLICT(email) DO UPDATE SET display_name=excluded.display_name, phone=COALESCE(excluded.phone, profiles.phone)", (email, display_name, phone))
+        conn.commit()
     return True
 
+def _available_beds(c, room_id):
+    c.execute(
+        "SELECT IFNULL((SELECT total_beds FROM rooms WHERE room_no = ?), ?) - IFNULL((SELECT occupied FROM room_occupancy WHERE room_no = ?), 0)",
+        (room_id, DEFAULT_TOTAL_BEDS, room_id),
+    )
+    return max(c.fetchone()[0], 0)
+
+def _set_booking_status(c, id, status):
+    """Change a booking's status and keep room_occupancy in step.
+
+    Must run inside the caller's write transaction. Approving claims beds with a
+    conditional UPDATE, so two concurrent approvals can never overbook a room.
+    Returns (room_id, change in occupied beds), or None if the booking does not exist.
+    """
+    c.execute("SELECT room_id, booked_by, IFNULL(roommates_count, 0), status FROM bookings WHERE id = ?", (id,))
+    row = c.fetchone()
+    if row is None:
+        return None
+    room_id, booked_by, beds, old_status = row
+    if old_status == status:
+        return room_id, 0
+    delta = 0
+    if status == 'approved':
+        c.execute("SELECT 1 FROM bookings WHERE booked_by = ? AND status = 'approved' AND id != ? LIMIT 1", (booked_by, id))
+        if c.fetchone():
+            raise BookingRejected(f"{booked_by} already has an approved booking")
+        c.execute("INSERT OR IGNORE INTO room_occupancy (room_no, occupied) VALUES (?, 0)", (room_id,))
+        c.execute(
+            "UPDATE room_occupancy SET occupied = occupied + ? WHERE room_no = ? AND occupied + ? <= IFNULL((SELECT total_beds FROM rooms WHERE room_no = ?), ?)",
+            (beds, room_id, beds, room_id, DEFAULT_TOTAL_BEDS),
+        )
+        if c.rowcount == 0:
+            raise BookingRejected(f"Room {room_id} does not have {beds} free bed(s)")
+        delta = beds
+    elif old_status == 'approved':
+        # Rejecting or cancelling an approved booking frees its beds
+        c.execute("UPDATE room_occupancy SET occupied = MAX(occupied - ?, 0) WHERE room_no = ?", (beds, room_id))
+        delta = -beds
+    c.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, id))
+    return room_id, delta
+
+def get_outings_during(start_epoch, end_epoch, statuses=('approved',)):
+    """Outings overlapping [start_epoch, end_epoch), looked up through the outing_intervals R*Tree."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        # CROSS JOIN keeps the R*Tree as the driving table (the planner would rather scan by status).
+        # It stores rounded-out float bounds, so the exact epochs are re-checked on the row.
+        c.execute(
+            "SELECT o.id, o.resident_id, o.start_time, o.end_time, o.status FROM outing_intervals i CROSS JOIN outings o ON o.id = i.id "
+            f"WHERE i.start_epoch <= ? AND i.end_epoch >= ? AND o.start_epoch < ? AND o.end_epoch > ? AND o.status IN ({','.join('?' * len(statuses))}) "
+            "ORDER BY o.start_epoch, o.id",
+            (end_epoch, start_epoch, end_epoch, start_epoch, *statuses),
+        )
+        rows = c.fetchall()
+    return [{'id': r[0], 'resident_id': r[1], 'start_time': r[2], 'end_time': r[3], 'status': r[4]} for r in rows]
+
+_STATUS_TABLES = {'service': 'service_requests', 'outing': 'outings'}
+
+def _status_changed(type, id, status, change, versions=None):
+    """Publish a decision and keep cached heatmaps in step; call after commit with the
+    'rooms' data versions before and after the write."""
+    publish('request.updated', type=type, id=id, status=status)
+    if type == 'service' and status != 'pending':
+        _update_dispatcher(lambda d: d.close(id))
+    if type == 'booking':
+        cache.invalidate('user_room', key=db_path())
+    if change and change[1]:
+        room_no, delta = change
+        cache.patch('bookings_heatmap', lambda rows: [(r, n + delta if r == room_no else n) for r, n in rows], key=db_path(), versions=versions)
+        # Service requests count toward the resident's approved room, which just changed
+        cache.invalidate('heatmap', key=db_path())
+        publish('occupancy', room_no=room_no, delta=delta)
+
+@_patches('bookings_heatmap')
 def update_request_status(type, id, status, reason):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    if type == 'service' or type == 'outing':
-        table = 'service_requests' if type == 'service' else 'outings'
-        c.execute(f"UPDATE {table} SET status = ?, warden_reason = ? WHERE id = ?", (status, reason, id))
-    elif type == 'booking':
-        c.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, id))
-    conn.commit()
-    conn.close()
+    """Apply a warden decision. Raises BookingRejected if a booking cannot be approved."""
+    change = versions = None
+    with get_conn() as conn:
+        c = conn.cursor()
+        if type in _STATUS_TABLES:
+            c.execute(f"UPDATE {_STATUS_TABLES[type]} SET status = ?, warden_reason = ? WHERE id = ?", (status, reason, id))
+        elif type == 'booking':
+            c.execute("BEGIN IMMEDIATE")
+            before = _scope_version(c, 'rooms')
+            try:
+                change = _set_booking_status(c, id, status)
+            except BookingRejected:
+                conn.rollback()
+                raise
+            versions = (before, _scope_version(c, 'rooms'))
+        conn.commit()
+    _status_changed(type, id, status, change, versions)
 
-def get_heatmap_data():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # Count service requests by effective room: prefer resident's approved room if available, else stored room_id
+@_patches('bookings_heatmap')
+def update_request_statuses(items):
+    """Apply many warden decisions in one transaction.
+
+    items is a list of dicts with type, id, status and optional reason. Service
+    and outing updates go through executemany; bookings are applied one by one
+    so each sees the beds claimed by the ones before it. Returns one result
+    dict per item, in order: {'type', 'id', 'ok'} plus 'error' when ok is False.
+    """
+    results = [None] * len(items)
+    plain = {t: [] for t in _STATUS_TABLES}
+    bookings = []
+    for i, item in enumerate(items):
+        type, id, status = item.get('type'), item.get('id'), item.get('status')
+        if type not in _STATUS_TABLES and type != 'booking':
+            results[i] = {'type': type, 'id': id, 'ok': False, 'error': 'Unknown request type'}
+        elif not isinstance(id, int) or not status:
+            results[i] = {'type': type, 'id': id, 'ok': False, 'error': 'id and status are required'}
+        elif status not in REQUEST_STATUSES:
+            results[i] = {'type': type, 'id': id, 'ok': False, 'error': f"status must be one of {', '.join(REQUEST_STATUSES)}"}
+        elif type == 'booking':
+            bookings.append(i)
+        else:
+            plain[type].append(i)
+    changes = {}
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        before = _scope_version(c, 'rooms')
+        try:
+            for type, indexes in plain.items():
+                if not indexes:
+                    continue
+                table = _STATUS_TABLES[type]
+                ids = sorted({items[i]['id'] for i in indexes})
+                found = set()
+                # Look ids up in chunks to stay under SQLite's bound-parameter limit
+                for k in range(0, len(ids), 500):
+                    chunk = ids[k:k + 500]
+                    c.execute(f"SELECT id FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                    found.update(row[0] for row in c.fetchall())
+                c.executemany(
+                    f"UPDATE {table} SET status = ?, warden_reason = ? WHERE id = ?",
+                    [(items[i]['status'], items[i].get('reason'), items[i]['id']) for i in indexes if items[i]['id'] in found],
+                )
+                for i in indexes:
+                    ok = items[i]['id'] in found
+                    results[i] = {'type': type, 'id': items[i]['id'], 'ok': ok}
+                    if not ok:
+                        results[i]['error'] = 'Not found'
+            for i in bookings:
+                item = items[i]
+                try:
+                    change = _set_booking_status(c, item['id'], item['status'])
+                except BookingRejected as e:
+                    results[i] = {'type': 'booking', 'id': item['id'], 'ok': False, 'error': str(e)}
+                    continue
+                if change is None:
+                    results[i] = {'type': 'booking', 'id': item['id'], 'ok': False, 'error': 'Not found'}
+                    continue
+                results[i] = {'type': 'booking', 'id': item['id'], 'ok': True}
+                changes[i] = change
+            versions = (before, _scope_version(c, 'rooms'))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    for i, result in enumerate(results):
+        if result['ok']:
+            _status_changed(result['type'], result['id'], items[i]['status'], changes.get(i), versions)
+    return results
+
+def rebuild_occupancy():
+    """Recompute room_occupancy from approved bookings (repair/maintenance)."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("DELETE FROM room_occupancy")
+        c.execute("INSERT INTO room_occupancy (room_no, occupied) SELECT room_id, IFNULL(SUM(roommates_count),0) FROM bookings WHERE status = 'approved' GROUP BY room_id")
+        conn.commit()
+    cache.invalidate('bookings_heatmap', key=db_path())
+
+@_patches('bookings_heatmap')
+def allocate_pending_bookings(dry_run=True, honor_requested=True, housed_elsewhere=()):
+    """Allocate every pending booking in one pass (see allocator.py).
+
+    With dry_run the plan is only reported. Otherwise assigned bookings are
+    moved to their planned room and approved in a single transaction; unplaced
+    ones stay pending. housed_elsewhere adds residents housed in other databases
+    (shards.py). Returns the allocator report.
+    """
+    start = time.perf_counter()
+    with get_conn() as conn:
+        c = conn.cursor()
+        if not dry_run:
+            # Hold the write lock while planning so the free-bed counts cannot change underneath
+            c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT id, booked_by, IFNULL(roommates_count, 1), room_id, final_timestamp, group_sync_score FROM bookings WHERE status = 'pending'")
+        groups = [allocator.Group(*row) for row in c.fetchall()]
+        c.execute("SELECT r.room_no, r.total_beds, r.total_beds - IFNULL(o.occupied, 0) FROM rooms r LEFT JOIN room_occupancy o ON o.room_no = r.room_no")
+        rooms = [allocator.Room(*row) for row in c.fetchall()]
+        c.execute("SELECT DISTINCT booked_by FROM bookings WHERE status = 'approved'")
+        housed = {row[0] for row in c.fetchall()} | set(housed_elsewhere)
+        assignments, unplaced = allocator.plan_allocation(groups, rooms, housed, honor_requested)
+        changes, versions = [], None
+        if not dry_run:
+            try:
+                before = _scope_version(c, 'rooms')
+                c.executemany("UPDATE bookings SET room_id = ? WHERE id = ?", [(room_no, g.id) for g, room_no in assignments if room_no != g.requested_room])
+                for g, _ in assignments:
+                    changes.append((g.id, _set_booking_status(c, g.id, 'approved')))
+                versions = (before, _scope_version(c, 'rooms'))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    for id, change in changes:
+        _status_changed('booking', id, 'approved', change, versions)
+    result = allocator.report(assignments, unplaced, rooms, (time.perf_counter() - start) * 1000)
+    result['dry_run'] = dry_run
+    return result
+
+_dispatchers = {}
+_dispatch_lock = threading.Lock()
+
+def _update_dispatcher(fn):
+    # Only a queue that is already loaded is kept in step; a new one reads the database
+    with _dispatch_lock:
+        entry = _dispatchers.get(db_path())
+        if entry is not None:
+            fn(entry[1])
+
+def _technician_loads(c):
     c.execute(
-        """
-        WITH svc AS (
-            SELECT COALESCE(b.room_id, sr.room_id) AS eff_room, COUNT(*) AS cnt
-            FROM service_requests sr
-            LEFT JOIN bookings b ON b.booked_by = sr.resident_id AND b.status = 'approved'
-            GROUP BY COALESCE(b.room_id, sr.room_id)
-        )
-        SELECT r.room_no, COALESCE(svc.cnt, 0) AS count
-        FROM rooms r
-        LEFT JOIN svc ON svc.eff_room = r.room_no
-        ORDER BY r.room_no
-        """
+        "SELECT t.id, t.capacity, (SELECT COUNT(*) FROM service_requests s WHERE s.technician = t.id AND s.status = 'pending') "
+        "FROM technicians t WHERE t.active = 1"
     )
-    heatmap = c.fetchall()
-    conn.close()
+    return [dispatch.Technician(*row) for row in c.fetchall()]
+
+def _dispatcher(c):
+    """The process's dispatch queue for db_path(), loaded on first use and every
+    DISPATCH_RESYNC_SECONDS; call with _dispatch_lock held."""
+    entry = _dispatchers.get(db_path())
+    if entry is not None and time.monotonic() - entry[0] < DISPATCH_RESYNC_SECONDS:
+        return entry[1]
+    # Rows from before created_at existed count as the oldest
+    c.execute("SELECT id, room_id, IFNULL(created_at, 0), technician FROM service_requests WHERE status = 'pending'")
+    tickets, assigned = [], []
+    for id, room_id, created_at, technician in c.fetchall():
+        ticket = dispatch.Ticket(id, room_id, created_at)
+        if technician is None:
+            tickets.append(ticket)
+        else:
+            assigned.append((ticket, technician))
+    technicians = [dispatch.Technician(t.id, t.capacity, 0) for t in _technician_loads(c)]
+    d = dispatch.Dispatcher(technicians, tickets, assigned, heat=dict(get_heatmap_data()))
+    _dispatchers[db_path()] = (time.monotonic(), d)
+    return d
+
+def dispatch_service_requests(limit=None, dry_run=True):
+    """Assign waiting service requests to technicians in priority order (see dispatch.py).
+
+    With dry_run the plan is only reported. Otherwise each assignment is written
+    with a conditional UPDATE, so a request that was decided or assigned in the
+    meantime is skipped and dropped from the queue. Technician loads are re-read
+    from the database first, so capacity holds across worker processes.
+    """
+    start = time.perf_counter()
+    skipped = []
+    with get_conn() as conn:
+        c = conn.cursor()
+        if not dry_run:
+            c.execute("BEGIN IMMEDIATE")
+        try:
+            technicians = _technician_loads(c)
+            with _dispatch_lock:
+                d = _dispatcher(c)
+                if dry_run:
+                    d = d.copy()
+                active = {t.id for t in technicians}
+                for t in technicians:
+                    d.set_technician(t.id, t.capacity, t.load)
+                for technician_id in d.loads():
+                    if technician_id not in active:
+                        d.set_technician(technician_id, 0)
+                plan = d.assign(limit)
+            if not dry_run:
+                for ticket, technician_id in plan:
+                    c.execute("UPDATE service_requests SET technician = ? WHERE id = ? AND status = 'pending' AND technician IS NULL", (technician_id, ticket.id))
+                    if not c.rowcount:
+                        skipped.append(ticket.id)
+                conn.commit()
+        except Exception:
+            if not dry_run:
+                conn.rollback()
+                with _dispatch_lock:
+                    _dispatchers.pop(db_path(), None)
+            raise
+    if skipped:
+        with _dispatch_lock:
+            for id in skipped:
+                d.close(id)
+    assignments = [{'id': t.id, 'room_id': t.room, 'technician': technician_id} for t, technician_id in plan if t.id not in skipped]
+    if not dry_run:
+        for a in assignments:
+            publish('request.assigned', type='service', id=a['id'], technician=a['technician'])
+    return {
+        'assignments': assignments,
+        'skipped': skipped,
+        'waiting': len(d),
+        'technicians': {id: {'capacity': cap, 'load': load} for id, (cap, load) in sorted(d.loads().items()) if cap},
+        'dry_run': dry_run,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+def get_technicians():
+    """Active technicians with their current load (open service requests assigned to them)."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, name, specialization FROM technicians WHERE active = 1 ORDER BY id")
+        info = {row[0]: row for row in c.fetchall()}
+        loads = _technician_loads(c)
+    return [{'id': t.id, 'name': info[t.id][1], 'specialization': info[t.id][2], 'capacity': t.capacity, 'load': t.load} for t in sorted(loads)]
+
+@cache.cached('heatmap', key=_db_key, version=_rooms_version)
+def get_heatmap_data():
+    with get_conn() as conn:
+        c = conn.cursor()
+        # Count service requests by effective room: prefer resident's approved room if available, else stored room_id
+        c.execute(
+            """
+            WITH svc AS (
+                SELECT COALESCE(b.room_id, sr.room_id) AS eff_room, COUNT(*) AS cnt
+                FROM (
+                    SELECT room_id, resident_id FROM service_requests
+                    UNION ALL
+                    SELECT room_id, resident_id FROM service_requests_archive
+                ) sr
+                LEFT JOIN bookings b ON b.booked_by = sr.resident_id AND b.status = 'approved'
+                GROUP BY COALESCE(b.room_id, sr.room_id)
+            )
+            SELECT r.room_no, COALESCE(svc.cnt, 0) AS count
+            FROM rooms r
+            LEFT JOIN svc ON svc.eff_room = r.room_no
+            ORDER BY r.room_no
+            """
+        )
+        heatmap = c.fetchall()
     return heatmap
 
+@cache.cached('bookings_heatmap', key=_db_key, version=_rooms_version)
 def get_bookings_heatmap():
     """Return (room_no, count) for approved bookings per room, including rooms with zero approved occupancy.
-    We use SUM(roommates_count) for occupancy count to reflect bed usage.
+    The count is approved bed usage (sum of roommates_count), read from room_occupancy.
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT r.room_no, COALESCE(bk.cnt, 0) AS count
-        FROM rooms r
-        LEFT JOIN (
-            SELECT room_id, COALESCE(SUM(roommates_count),0) AS cnt
-            FROM bookings
-            WHERE status = 'approved'
-            GROUP BY room_id
-        ) bk ON bk.room_id = r.room_no
-        ORDER BY r.room_no
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT r.room_no, IFNULL(o.occupied, 0) AS count
+            FROM rooms r
+            LEFT JOIN room_occupancy o ON o.room_no = r.room_no
+            ORDER BY r.room_no
+            """
+        )
+        rows = c.fetchall()
     return rows
 
 def get_available_rooms():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT room_no, total_beds FROM rooms ORDER BY room_no")
-    rooms = c.fetchall()
+    # One pass over rooms LEFT JOIN approved bookings; rows arrive grouped by room.
+    # Free beds come from the maintained room_occupancy counters.
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT r.room_no, r.total_beds, IFNULL(o.occupied, 0), b.booked_by, b.id
+            FROM rooms r
+            LEFT JOIN room_occupancy o ON o.room_no = r.room_no
+            LEFT JOIN bookings b ON b.room_id = r.room_no AND b.status = 'approved'
+            ORDER BY r.room_no, b.id
+            """
+        )
+        rows = c.fetchall()
     result = []
-    for room_no, total_beds in rooms:
-        c.execute("SELECT IFNULL(SUM(roommates_count),0) FROM bookings WHERE room_id = ? AND status = 'approved'", (room_no,))
-        occupied = c.fetchone()[0]
-        available = max(total_beds - occupied, 0)
-        # Collect resident identifiers for approved bookings in this room
-        c.execute("SELECT booked_by FROM bookings WHERE room_id = ? AND status = 'approved'", (room_no,))
-        occupants = [row[0] for row in c.fetchall()]
+    current = None
+    for room_no, total_beds, occupied, booked_by, booking_id in rows:
+        if current is None or current['room_no'] != room_no:
+            current = {'room_no': room_no, 'total_beds': total_beds, 'available': max(total_beds - occupied, 0), 'residents': []}
+            result.append(current)
+        if booking_id is None:
+            continue
         # Display short login names (before @) when possible
-        resident_logins = [ (email.split('@')[0] if isinstance(email, str) and '@' in email else str(email)) for email in occupants ]
-        result.append({'room_no': room_no, 'total_beds': total_beds, 'available': available, 'residents': resident_logins})
-    conn.close()
+        current['residents'].append(booked_by.split('@')[0] if isinstance(booked_by, str) and '@' in booked_by else str(booked_by))
     return result
 
+@cache.cached('user_room', key=_db_key, ttl=USER_ROOM_CACHE_TTL, store_none=False)
 def get_user_room(email):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT room_id FROM bookings WHERE booked_by = ? AND status = 'approved' ORDER BY id DESC LIMIT 1", (email,))
-    row = c.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT room_id FROM bookings WHERE booked_by = ? AND status = 'approved' ORDER BY id DESC LIMIT 1", (email,))
+        row = c.fetchone()
     return row[0] if row else None
 
 def ensure_user(email: str, role: str = 'resident'):
     """Create user if missing; returns True if ensured."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT email FROM users WHERE email = ?", (email,))
-    exists = c.fetchone() is not None
-    if not exists:
-        # For OAuth users, store a placeholder password
-        c.execute("INSERT INTO users (email, password, role) VALUES (?, ?, ?)", (email, 'oauth', role))
+    with get_conn() as conn:
+        c = conn.cursor()
+        # For OAuth users, store a placeholder password; an existing account is left as it is
+        c.execute("INSERT OR IGNORE INTO users (email, password, role) VALUES (?, ?, ?)", (email, passwords.NO_PASSWORD, role))
         conn.commit()
-    conn.close()
     return True
 
+@cache.cached('next_resident', key=_db_key, ttl=NEXT_RESIDENT_CACHE_TTL)
 def get_next_resident_login(max_residents: int = 60):
     """Return the suggested next resident login (email) based on the last booking created.
     If no bookings exist, suggest resident1@hostel.com. If last is residentN, suggest resident(N+1), capped by max_residents.
     If beyond max_residents, return None.
     """
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT booked_by FROM bookings ORDER BY id DESC")
-    rows = c.fetchall()
-    last_n = 0
-    for (email,) in rows:
-        if isinstance(email, str):
-            m = re.match(r'^resident(\d+)@hostel\.com$', email.strip(), re.IGNORECASE)
-            if m:
-                try:
-                    last_n = int(m.group(1))
-                    break
-                except ValueError:
-                    continue
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        # Newest entry of the partial resident_no index (migration 11); no scan of the bookings
+        c.execute("SELECT resident_no FROM bookings WHERE resident_no IS NOT NULL ORDER BY id DESC LIMIT 1")
+        row = c.fetchone()
+    last_n = row[0] if row else 0
     next_n = last_n + 1
     if next_n <= 0:
         next_n = 1
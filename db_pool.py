@@ -0,0 +1,159 @@
+import sqlite3
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import metrics
+
+# Defaults can be tuned per deployment through the environment
+DEFAULT_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DEFAULT_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+
+
+# Per-request statement counter; None when nobody is counting
+_query_count = ContextVar('query_count', default=None)
+
+
+def _count_statement(sql):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def start_counting():
+    """Start counting statements in this context; returns (counter, token) where counter[0] is the count."""
+    counter = [0]
+    return counter, _query_count.set(counter)
+
+
+def stop_counting(token):
+    _query_count.reset(token)
+
+
+@contextmanager
+def count_queries():
+    """Count statements run on pooled connections in this block; yields a one-item list."""
+    counter, token = start_counting()
+    try:
+        yield counter
+    finally:
+        stop_counting(token)
+
+
+def _open(path, wal=True, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+    """Open a connection with the pragmas every pooled connection shares."""
+    factory = metrics.InstrumentedConnection if metrics.ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000.0, check_same_thread=False, factory=factory)
+    c = conn.cursor()
+    c.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    if wal:
+        # WAL lets readers run alongside the single writer; NORMAL sync is safe in WAL mode
+        c.execute("PRAGMA journal_mode = WAL")
+        c.execute("PRAGMA synchronous = NORMAL")
+    c.execute("PRAGMA temp_store = MEMORY")
+    c.execute("PRAGMA cache_size = -8000")
+    c.close()
+    conn.set_trace_callback(_count_statement)
+    return conn
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections for a single database file.
+
+    Connections are handed out LIFO so the warmest one is reused first. When the
+    pool is empty a new connection is opened; on release, connections beyond
+    max_size are closed. max_size=0 disables pooling (connect/close per call).
+    """
+
+    def __init__(self, path, max_size=DEFAULT_POOL_SIZE, wal=True, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.max_size = max_size
+        self.wal = wal
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _open(self.path, self.wal, self.busy_timeout_ms)
+
+    def release(self, conn):
+        # Never hand a connection with an open transaction to the next caller
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            keep = not self._closed and self._idle.qsize() < self.max_size
+        if keep:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def idle_count(self):
+        return self._idle.qsize()
+
+    def close_all(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = ConnectionPool(path)
+                _pools[path] = pool
+    return pool
+
+
+def configure_pool(path, **kwargs):
+    """Replace the pool for path (e.g. to change size or disable WAL); returns the new pool."""
+    with _pools_lock:
+        old = _pools.get(path)
+        pool = ConnectionPool(path, **kwargs)
+        _pools[path] = pool
+    if old is not None:
+        old.close_all()
+    return pool
+
+
+def pool_stats():
+    """Idle connection count and max size for each pool, keyed by path."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {path: {'idle': pool.idle_count(), 'max_size': pool.max_size} for path, pool in pools}
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
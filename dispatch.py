@@ -0,0 +1,221 @@
+"""Priority dispatch of open service requests to technicians.
+
+A ticket's urgency is
+
+    score = AGE_WEIGHT * hours waited
+          + HEAT_WEIGHT * log1p(requests ever filed for the room)
+          + REPEAT_WEIGHT * (other open tickets in the same room)
+
+Everything but the age term is the same for every ticket in a room, so the
+most urgent ticket of a room is always its oldest one, and the age term grows
+at the same rate for all tickets, so the order never changes just because
+time passes. Dispatcher therefore keeps one heap of waiting tickets per room
+(oldest first) and one heap of rooms keyed by the score of their oldest
+ticket minus the shared age term. A new or closed ticket re-keys only its own
+room; old heap entries are skipped when popped. Each decision pops the top
+room's oldest ticket and gives it to the technician with the lowest
+load / capacity ratio who still has room, so it costs O(log rooms +
+log tickets + log technicians). Ties go to the lower ticket id and the lower
+technician id, which keeps plans deterministic.
+
+A technician's load is the open tickets assigned to them; closing a ticket
+(approve or reject) frees the slot.
+"""
+import heapq
+import math
+from collections import defaultdict, namedtuple
+
+Ticket = namedtuple('Ticket', 'id room created_at')
+Technician = namedtuple('Technician', 'id capacity load')
+
+AGE_WEIGHT = 1.0
+HEAT_WEIGHT = 4.0
+REPEAT_WEIGHT = 6.0
+
+
+class Dispatcher:
+    def __init__(self, technicians=(), tickets=(), assigned=(), heat=None, weights=(AGE_WEIGHT, HEAT_WEIGHT, REPEAT_WEIGHT)):
+        """technicians: Technician tuples; tickets: waiting Tickets; assigned: (Ticket, technician id)
+        pairs already handed out; heat: room -> requests filed so far."""
+        self.age_weight, self.heat_weight, self.repeat_weight = weights
+        self._heat = defaultdict(int, heat or {})
+        self._queued = {}                       # ticket id -> Ticket waiting for a technician
+        self._assigned = {}                     # ticket id -> (Ticket, technician id)
+        self._room_tickets = defaultdict(list)  # room -> heap of (created_at, ticket id)
+        self._room_queued = defaultdict(int)    # waiting tickets per room
+        self._room_open = defaultdict(int)      # waiting + assigned tickets per room
+        self._room_keys = {}                    # room -> (key, ticket id) of its oldest waiting ticket
+        self._heap = []                         # (-key, ticket id, room)
+        self._techs = {}                        # technician id -> [capacity, load]
+        self._tech_heap = []                    # (load / capacity, technician id, load, capacity)
+        for tech in technicians:
+            self._techs[tech.id] = [tech.capacity, tech.load]
+        for ticket, technician_id in assigned:
+            self._assigned[ticket.id] = (ticket, technician_id)
+            self._room_open[ticket.room] += 1
+            if technician_id in self._techs:
+                self._techs[technician_id][1] += 1
+        for ticket in tickets:
+            if ticket.id in self._queued or ticket.id in self._assigned:
+                continue
+            self._queued[ticket.id] = ticket
+            self._room_tickets[ticket.room].append((ticket.created_at, ticket.id))
+            self._room_queued[ticket.room] += 1
+            self._room_open[ticket.room] += 1
+        for room, entries in self._room_tickets.items():
+            heapq.heapify(entries)
+            self._rekey_room(room)
+        for technician_id in self._techs:
+            self._push_tech(technician_id)
+
+    def __len__(self):
+        return len(self._queued)
+
+    # -- scoring -------------------------------------------------------------
+
+    def _room_term(self, room):
+        return self.heat_weight * math.log1p(self._heat[room]) + self.repeat_weight * (self._room_open[room] - 1)
+
+    def score(self, ticket_id, now):
+        """Urgency of a waiting ticket at time now (epoch seconds)."""
+        ticket = self._queued[ticket_id]
+        return self._room_term(ticket.room) + self.age_weight * (now - ticket.created_at) / 3600.0
+
+    def _rekey_room(self, room):
+        entries = self._room_tickets[room]
+        while entries and entries[0][1] not in self._queued:
+            heapq.heappop(entries)
+        if not entries:
+            self._room_keys.pop(room, None)
+            return
+        if len(entries) > 2 * self._room_queued[room] + 16:
+            # Mostly closed tickets: rebuild from the waiting ones
+            entries[:] = [e for e in entries if e[1] in self._queued]
+            heapq.heapify(entries)
+        created_at, ticket_id = entries[0]
+        key = (self._room_term(room) - self.age_weight * created_at / 3600.0, ticket_id)
+        if self._room_keys.get(room) != key:
+            self._room_keys[room] = key
+            heapq.heappush(self._heap, (-key[0], ticket_id, room))
+            if len(self._heap) > 2 * len(self._room_keys) + 64:
+                self._heap = [(-k, t, r) for r, (k, t) in self._room_keys.items()]
+                heapq.heapify(self._heap)
+
+    # -- tickets -------------------------------------------------------------
+
+    def add(self, ticket, new_request=True):
+        """Queue a waiting ticket. new_request also counts it toward the room's heat."""
+        if ticket.id in self._queued or ticket.id in self._assigned:
+            return
+        self._queued[ticket.id] = ticket
+        heapq.heappush(self._room_tickets[ticket.room], (ticket.created_at, ticket.id))
+        self._room_queued[ticket.room] += 1
+        self._room_open[ticket.room] += 1
+        if new_request:
+            self._heat[ticket.room] += 1
+        self._rekey_room(ticket.room)
+
+    def close(self, ticket_id):
+        """Drop a ticket that was approved, rejected or handled elsewhere; False if unknown."""
+        ticket = self._queued.pop(ticket_id, None)
+        if ticket is not None:
+            self._room_queued[ticket.room] -= 1
+        else:
+            ticket, technician_id = self._assigned.pop(ticket_id, (None, None))
+            if ticket is None:
+                return False
+            tech = self._techs.get(technician_id)
+            if tech is not None and tech[1] > 0:
+                tech[1] -= 1
+                self._push_tech(technician_id)
+        self._room_open[ticket.room] -= 1
+        self._rekey_room(ticket.room)
+        return True
+
+    def set_heat(self, room, count):
+        self._heat[room] = count
+        self._rekey_room(room)
+
+    # -- technicians ---------------------------------------------------------
+
+    def set_technician(self, technician_id, capacity, load=None):
+        """Add a technician or change their capacity (and load, when given)."""
+        if load is None:
+            load = self._techs.get(technician_id, (0, 0))[1]
+        self._techs[technician_id] = [capacity, load]
+        self._push_tech(technician_id)
+
+    def _push_tech(self, technician_id):
+        capacity, load = self._techs[technician_id]
+        if load < capacity:
+            heapq.heappush(self._tech_heap, (load / capacity, technician_id, load, capacity))
+
+    def _free_technician(self):
+        # Entries whose load or capacity no longer match are stale
+        while self._tech_heap:
+            _, technician_id, load, capacity = self._tech_heap[0]
+            if self._techs.get(technician_id) == [capacity, load]:
+                return technician_id
+            heapq.heappop(self._tech_heap)
+        return None
+
+    def loads(self):
+        """technician id -> (capacity, load)."""
+        return {technician_id: tuple(v) for technician_id, v in self._techs.items()}
+
+    # -- decisions -----------------------------------------------------------
+
+    def _top_room(self):
+        while self._heap:
+            neg_key, ticket_id, room = self._heap[0]
+            if self._room_keys.get(room) == (-neg_key, ticket_id):
+                return room
+            heapq.heappop(self._heap)
+        return None
+
+    def peek(self):
+        """The ticket the next decision would assign, or None when nothing is waiting."""
+        room = self._top_room()
+        return None if room is None else self._queued[self._room_keys[room][1]]
+
+    def next_assignment(self):
+        """Assign the most urgent ticket; returns (ticket, technician id) or None."""
+        technician_id = self._free_technician()
+        if technician_id is None:
+            return None
+        ticket = self.peek()
+        if ticket is None:
+            return None
+        del self._queued[ticket.id]
+        self._room_queued[ticket.room] -= 1
+        self._assigned[ticket.id] = (ticket, technician_id)
+        self._rekey_room(ticket.room)
+        self._techs[technician_id][1] += 1
+        self._push_tech(technician_id)
+        return ticket, technician_id
+
+    def assign(self, limit=None):
+        """Make up to limit assignments (as many as capacity allows by default)."""
+        plan = []
+        while limit is None or len(plan) < limit:
+            step = self.next_assignment()
+            if step is None:
+                break
+            plan.append(step)
+        return plan
+
+    def copy(self):
+        """Independent copy, for planning without changing this dispatcher (dry runs)."""
+        other = Dispatcher.__new__(Dispatcher)
+        other.__dict__.update(self.__dict__)
+        other._heat = defaultdict(int, self._heat)
+        other._queued = dict(self._queued)
+        other._assigned = dict(self._assigned)
+        other._room_tickets = defaultdict(list, {room: list(entries) for room, entries in self._room_tickets.items()})
+        other._room_queued = defaultdict(int, self._room_queued)
+        other._room_open = defaultdict(int, self._room_open)
+        other._room_keys = dict(self._room_keys)
+        other._heap = list(self._heap)
+        other._techs = {technician_id: list(v) for technician_id, v in self._techs.items()}
+        other._tech_heap = list(self._tech_heap)
+        return other
@@ -0,0 +1,137 @@
+"""In-process change-event bus feeding the warden live stream.
+
+Writes in database.py publish small deltas (new request, status change,
+heatmap increments). Events go into one shared ring buffer with increasing
+sequence numbers; subscribers only remember the last sequence they saw, and
+an idle connection is just a thread parked on a Condition. Publishing appends
+under a short lock and sets a flag; a notifier thread wakes the parked
+streams, so the write that published never waits for hundreds of wardens to
+be woken.
+
+Event ids are "<epoch>.<seq>", where the epoch is random per bus. An id from
+an earlier boot or another worker, or one ahead of this bus, cannot be
+replayed, so the stream starts with a 'resync' event and the client reloads.
+The warden page carries current_id() from just before its data was read, and
+the stream resumes after it, so nothing published in between is lost.
+
+The bus is per process, so a stream only carries the writes made by its own
+worker: live updates need the app to run as a single worker (several
+threads are fine). With more workers, wardens see other workers' writes on
+their next reload.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+BUFFER_SIZE = 1024
+
+
+class EventBus:
+    def __init__(self, size=BUFFER_SIZE):
+        self._events = deque(maxlen=size)
+        self._lock = threading.RLock()
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._notifier = None
+        self._seq = 0
+        self.epoch = os.urandom(4).hex()
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def publish(self, kind, data):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._events.append((seq, kind, data, time.time()))
+        self._wake.set()
+        return seq
+
+    def _notify(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _start_notifier(self):
+        # Started by the first subscriber, so importing this module starts no thread
+        with self._lock:
+            if self._notifier is None:
+                self._notifier = threading.Thread(target=self._notify, name='event-notifier', daemon=True)
+                self._notifier.start()
+
+    def since(self, seq):
+        """Events after seq as (seq, kind, data) tuples, or None if seq fell out of the buffer."""
+        with self._lock:
+            return self._since(seq)
+
+    def _since(self, seq):
+        if seq >= self._seq:
+            return []
+        if not self._events or seq < self._events[0][0] - 1:
+            return None
+        # Sequence numbers are contiguous, so the offset into the ring is direct
+        start = seq - (self._events[0][0] - 1)
+        return [(s, k, d) for s, k, d, _ in islice(self._events, start, None)]
+
+    def wait(self, seq, timeout=15.0):
+        """Block until there are events after seq or timeout expires; see since()."""
+        if self._notifier is None:
+            self._start_notifier()
+        with self._cond:
+            if seq >= self._seq:
+                self._cond.wait_for(lambda: self._seq > seq, timeout)
+        return self.since(seq)
+
+
+bus = EventBus()
+
+
+def publish(kind, **data):
+    return bus.publish(kind, data)
+
+
+def current_id():
+    """The id of the newest event, to resume a stream after (see sse_stream)."""
+    return f"{bus.epoch}.{bus.last_seq}"
+
+
+def _resume_seq(last_id):
+    """The sequence to resume after for a Last-Event-ID value, or None if this bus
+    cannot replay from it (another epoch, ahead of the bus, malformed)."""
+    epoch, _, seq = last_id.partition('.')
+    if epoch != bus.epoch or not seq.isdigit() or int(seq) > bus.last_seq:
+        return None
+    return int(seq)
+
+
+def sse_stream(last_id=None, keepalive=15.0, max_events=None):
+    """Yield Server-Sent Events text chunks starting after the event last_id (default: now)."""
+    seq = bus.last_seq if last_id is None else _resume_seq(last_id)
+    sent = 0
+    yield 'retry: 3000\n\n'
+    if seq is None:
+        # Events from before a restart or on another worker are gone; reload once
+        seq = bus.last_seq
+        yield f'id: {bus.epoch}.{seq}\nevent: resync\ndata: {{}}\n\n'
+    while max_events is None or sent < max_events:
+        events = bus.wait(seq, keepalive)
+        if events is None:
+            # Client missed more than the buffer holds; tell it to reload once
+            seq = bus.last_seq
+            yield f'id: {bus.epoch}.{seq}\nevent: resync\ndata: {{}}\n\n'
+            continue
+        if not events:
+            yield ': keepalive\n\n'
+            continue
+        for s, kind, data in events:
+            payload = json.dumps(data, separators=(',', ':'))
+            yield f'id: {bus.epoch}.{s}\nevent: {kind}\ndata: {payload}\n\n'
+            seq = s
+            sent += 1
+
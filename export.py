@@ -0,0 +1,121 @@
+"""Streaming CSV / NDJSON exports of request history and room occupancy.
+
+Rows are read from an open cursor with fetchmany() and written out in chunks,
+so an export holds one chunk in memory however many rows it covers. History
+exports include the archive tables. Timestamps are exported as local
+datetimes; created_at / start filters use hostel wall-clock epochs (see
+database.to_epoch).
+"""
+import csv
+import io
+import json
+
+import database
+
+CHUNK_ROWS = 500
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# dataset -> (column names, select list, table, column the date range applies to)
+DATASETS = {
+    'bookings': (
+        ('id', 'room_id', 'booked_by', 'group_id', 'roommates_count', 'status', 'created_at', 'resolved_at'),
+        "id, room_id, booked_by, group_id, roommates_count, status, datetime(created_at, 'unixepoch'), datetime(resolved_at, 'unixepoch', 'localtime')",
+        'bookings',
+        'created_at',
+    ),
+    'service_requests': (
+        ('id', 'room_id', 'resident_id', 'description', 'status', 'warden_reason', 'technician', 'created_at', 'resolved_at'),
+        "id, room_id, resident_id, description, status, warden_reason, technician, datetime(created_at, 'unixepoch'), datetime(resolved_at, 'unixepoch', 'localtime')",
+        'service_requests',
+        'created_at',
+    ),
+    'outings': (
+        ('id', 'resident_id', 'start_time', 'end_time', 'status', 'warden_reason', 'created_at', 'resolved_at'),
+        "id, resident_id, start_time, end_time, status, warden_reason, datetime(created_at, 'unixepoch'), datetime(resolved_at, 'unixepoch', 'localtime')",
+        'outings',
+        'start_epoch',
+    ),
+    'occupancy': (
+        ('room_no', 'total_beds', 'occupied', 'free', 'residents'),
+        None,
+        'rooms',
+        None,
+    ),
+}
+
+_OCCUPANCY_SQL = """
+    SELECT r.room_no, r.total_beds, IFNULL(o.occupied, 0), MAX(r.total_beds - IFNULL(o.occupied, 0), 0),
+           IFNULL((SELECT group_concat(b.booked_by, ';') FROM bookings b WHERE b.room_id = r.room_no AND b.status = 'approved'), '')
+    FROM rooms r
+    LEFT JOIN room_occupancy o ON o.room_no = r.room_no
+    ORDER BY r.room_no
+"""
+
+
+def export_rows(dataset, statuses=None, start=None, end=None, path=None):
+    """Yield the rows of one export from path (default database.db_path()); start/end are
+    epochs for [start, end) on the dataset's date column."""
+    _, select, table, date_column = DATASETS[dataset]
+    if select is None:
+        sql, params = _OCCUPANCY_SQL, []
+    else:
+        where, params = [], []
+        if statuses:
+            where.append(f"+status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if start is not None:
+            where.append(f"+{date_column} >= ?")
+            params.append(start)
+        if end is not None:
+            where.append(f"+{date_column} < ?")
+            params.append(end)
+        # Filters are written +column so no index is used for them: each table is then read
+        # in id order and the compound ORDER BY merges the two scans instead of sorting
+        where_sql = ' WHERE ' + ' AND '.join(where) if where else ''
+        sql = ' UNION ALL '.join(f"SELECT {select} FROM {t}{where_sql}" for t in (table, table + '_archive')) + " ORDER BY 1"
+        params = params * 2
+    with database.get_conn(path) as conn:
+        c = conn.cursor()
+        c.execute(sql, params)
+        while True:
+            rows = c.fetchmany(CHUNK_ROWS)
+            if not rows:
+                break
+            yield from rows
+
+
+def _csv_safe(value):
+    # Spreadsheets run cells starting with these as formulas; descriptions are user input
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def stream(dataset, fmt='csv', statuses=None, start=None, end=None, paths=(None,)):
+    """Yield the export as text chunks of about CHUNK_ROWS rows each. With several
+    database paths (one per block, see shards.paths()) their rows follow one another."""
+    columns = DATASETS[dataset][0]
+    rows = (row for path in paths for row in export_rows(dataset, statuses, start, end, path))
+    if fmt == 'ndjson':
+        chunk = []
+        for row in rows:
+            chunk.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            if len(chunk) >= CHUNK_ROWS:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_safe(v) for v in row])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
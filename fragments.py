@@ -0,0 +1,78 @@
+"""Render cache for the dashboards, keyed by data version.
+
+Triggers (see migrations._m010_data_versions) bump a counter per scope on
+every write: 'queue' (pending requests), 'rooms' (heatmaps) and
+'resident:<email>' (one resident's page). A fragment's version is its
+scopes' counters in each database it reads (one per block with shards.py),
+so checking it costs a primary key lookup per scope and database.
+
+Rendered fragments, and the JSON data behind them, are kept in a bounded LRU
+under (name, version). A write changes the version, so nothing is ever
+invalidated; old entries simply fall out. The same versions give the
+dashboards their ETag and Last-Modified.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import database
+
+MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_SIZE', '512'))
+
+# key identifies the data (paths and counters); changed_at is the newest change, epoch seconds
+Version = namedtuple('Version', 'key changed_at')
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def version(scopes, paths):
+    """Current Version of the data behind scopes, read from each database in paths."""
+    key, changed_at = [], 0
+    for path in paths:
+        with database.get_conn(path) as conn:
+            c = conn.cursor()
+            c.execute(f"SELECT scope, version, changed_at FROM data_versions WHERE scope IN ({','.join('?' * len(scopes))})", scopes)
+            found = {scope: (n, at) for scope, n, at in c.fetchall()}
+        for scope in scopes:
+            n, at = found.get(scope, (0, 0))
+            key.append((path, scope, n))
+            changed_at = max(changed_at, at)
+    return Version(tuple(key), changed_at)
+
+
+def token(*parts):
+    """Short stable hash of parts, for ETags and the version fields of the JSON data."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def get(name, key, build):
+    """The cached value of fragment name at key, else build() (stored for next time)."""
+    global _hits, _misses
+    k = (name, key)
+    with _lock:
+        if k in _entries:
+            _entries.move_to_end(k)
+            _hits += 1
+            return _entries[k]
+        _misses += 1
+    value = build()
+    with _lock:
+        _entries[k] = value
+        _entries.move_to_end(k)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return value
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats():
+    total = _hits + _misses
+    return {'hits': _hits, 'misses': _misses, 'hit_ratio': round(_hits / total, 4) if total else 0.0, 'entries': len(_entries)}
@@ -0,0 +1,211 @@
+"""Bulk import of residents and rooms from CSV.
+
+The whole file is parsed and validated first. Rows are then written with
+executemany inside one BEGIN IMMEDIATE transaction, so an import lands
+completely or not at all. With HOSTEL_BLOCKS, rooms go to their block's
+database (shards.py), one transaction per block, all held until every block
+has been checked; a room outside every block is an invalid row. Existing accounts / rooms are handled per
+--on-conflict: skip them (default), update them, or fail the whole import.
+--dry-run reports what would happen without writing anything.
+
+Residents: email (required), role (resident or warden, default resident),
+password (optional; accounts without one sign in through Google),
+display_name, phone. Rooms: room_no, total_beds.
+
+    python importer.py residents intake.csv [--dry-run] [--on-conflict skip|update|fail] [--skip-invalid]
+    python importer.py rooms block_c.csv [--dry-run] [--on-conflict skip|update|fail] [--skip-invalid]
+"""
+import csv
+import re
+import time
+from contextlib import ExitStack
+
+import cache
+import database
+import passwords
+import shards
+
+ON_CONFLICT = ('skip', 'update', 'fail')
+ROLES = ('resident', 'warden')
+_EMAIL = re.compile(r'^[^@\s,;]+@[^@\s,;]+\.[^@\s,;]+$')
+
+
+def _records(lines):
+    reader = csv.DictReader(lines)
+    for record in reader:
+        # Extra cells land under a None key; blank cells become ''
+        yield reader.line_num, {k.strip().lower(): (v or '').strip() for k, v in record.items() if k}
+
+
+def parse_residents(lines):
+    """Validate resident rows; returns (rows, errors) with errors as (line, message)."""
+    rows, errors, seen = [], [], {}
+    for line, record in _records(lines):
+        email = record.get('email', '').lower()
+        role = (record.get('role') or 'resident').lower()
+        if not _EMAIL.match(email):
+            errors.append((line, f"invalid email {email!r}"))
+        elif role not in ROLES:
+            errors.append((line, f"invalid role {role!r}"))
+        elif email in seen:
+            errors.append((line, f"duplicate of line {seen[email]}"))
+        else:
+            seen[email] = line
+            rows.append({
+                'line': line,
+                'email': email,
+                'role': role,
+                'password': record.get('password') or None,
+                'display_name': record.get('display_name') or None,
+                'phone': record.get('phone') or None,
+            })
+    return rows, errors
+
+
+def parse_rooms(lines):
+    """Validate room rows; returns (rows, errors) with errors as (line, message)."""
+    rows, errors, seen = [], [], {}
+    for line, record in _records(lines):
+        try:
+            room_no = int(record.get('room_no', ''))
+            total_beds = int(record.get('total_beds', ''))
+        except ValueError:
+            errors.append((line, 'room_no and total_beds must be integers'))
+            continue
+        if room_no <= 0 or total_beds <= 0:
+            errors.append((line, 'room_no and total_beds must be positive'))
+        elif room_no in seen:
+            errors.append((line, f"duplicate of line {seen[room_no]}"))
+        else:
+            seen[room_no] = line
+            rows.append({'line': line, 'room_no': room_no, 'total_beds': total_beds})
+    return rows, errors
+
+
+def _existing(c, sql, keys):
+    found = {}
+    # Look keys up in chunks to stay under SQLite's bound-parameter limit
+    for k in range(0, len(keys), 500):
+        chunk = keys[k:k + 500]
+        c.execute(sql.format(marks=','.join('?' * len(chunk))), chunk)
+        found.update((row[0], row[1:]) for row in c.fetchall())
+    return found
+
+
+def _run(kind, lines, dry_run, on_conflict, skip_invalid):
+    if on_conflict not in ON_CONFLICT:
+        raise ValueError(f"on_conflict must be one of {ON_CONFLICT}")
+    start = time.perf_counter()
+    rows, errors = (parse_residents if kind == 'residents' else parse_rooms)(lines)
+    key = 'email' if kind == 'residents' else 'room_no'
+    report = {'kind': kind, 'rows': len(rows) + len(errors), 'valid': len(rows), 'errors': [{'line': n, 'error': e} for n, e in errors],
+              'new': 0, 'existing': 0, 'written': 0, 'on_conflict': on_conflict, 'dry_run': dry_run, 'aborted': None}
+    if kind == 'residents' and not dry_run:
+        # Hash before taking the write lock; scrypt is the slow part of a password import
+        with_password = [r for r in rows if r['password']]
+        for r, hashed in zip(with_password, passwords.hash_passwords([r['password'] for r in with_password])):
+            r['password'] = hashed
+    if kind == 'residents':
+        targets = {database.db_path(): rows}
+    else:
+        targets = {}
+        for r in rows:
+            path = shards.db_for_room(r['room_no'])
+            if path is None:
+                report['errors'].append({'line': r['line'], 'error': f"room {r['room_no']} is in no block"})
+            else:
+                targets.setdefault(path, []).append(r)
+        rows = [r for group in targets.values() for r in group]
+        report['valid'] = len(rows)
+    with ExitStack() as stack:
+        conns, cursors = {}, {}
+        for path in targets:
+            conns[path] = stack.enter_context(database.get_conn(path))
+            cursors[path] = conns[path].cursor()
+            if not dry_run:
+                cursors[path].execute("BEGIN IMMEDIATE")
+        existing = {}
+        for path, c in cursors.items():
+            keys = [r[key] for r in targets[path]]
+            if kind == 'residents':
+                existing.update(_existing(c, "SELECT email FROM users WHERE email IN ({marks})", keys))
+            else:
+                existing.update(_existing(c, "SELECT r.room_no, IFNULL(o.occupied, 0) FROM rooms r LEFT JOIN room_occupancy o ON o.room_no = r.room_no WHERE r.room_no IN ({marks})", keys))
+        if kind == 'rooms' and on_conflict == 'update':
+            for r in rows:
+                occupied = existing.get(r['room_no'], (0,))[0]
+                if r['total_beds'] < occupied:
+                    report['errors'].append({'line': r['line'], 'error': f"total_beds below current occupancy ({occupied})"})
+            rows = [r for r in rows if r['total_beds'] >= existing.get(r['room_no'], (0,))[0]]
+        report['existing'] = sum(1 for r in rows if r[key] in existing)
+        report['new'] = len(rows) - report['existing']
+        if report['errors'] and not skip_invalid:
+            report['aborted'] = 'invalid rows'
+        elif on_conflict == 'fail' and report['existing']:
+            report['aborted'] = 'rows already exist'
+        if dry_run or report['aborted']:
+            for conn in conns.values():
+                conn.rollback()
+            report['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            return report
+        if on_conflict == 'skip':
+            rows = [r for r in rows if r[key] not in existing]
+        written = {id(r) for r in rows}
+        for path, c in cursors.items():
+            group = [r for r in targets[path] if id(r) in written]
+            if kind == 'residents':
+                no_password = passwords.NO_PASSWORD
+                c.executemany(
+                    "INSERT INTO users (email, password, role) VALUES (?, ?, ?) "
+                    "ON CONFLICT(email) DO UPDATE SET role = excluded.role, "
+                    "password = CASE WHEN excluded.password = ? THEN users.password ELSE excluded.password END",
+                    [(r['email'], r['password'] or no_password, r['role'], no_password) for r in group],
+                )
+                c.executemany(
+                    "INSERT INTO profiles (email, display_name, phone) VALUES (?, ?, ?) "
+                    "ON CONFLICT(email) DO UPDATE SET display_name = excluded.display_name, phone = COALESCE(excluded.phone, profiles.phone)",
+                    [(r['email'], r['display_name'], r['phone']) for r in group if r['display_name']],
+                )
+            else:
+                c.executemany(
+                    "INSERT INTO rooms (room_no, total_beds) VALUES (?, ?) ON CONFLICT(room_no) DO UPDATE SET total_beds = excluded.total_beds",
+                    [(r['room_no'], r['total_beds']) for r in group],
+                )
+        for conn in conns.values():
+            conn.commit()
+    report['written'] = len(rows)
+    if kind == 'rooms' and rows:
+        for path in targets:
+            cache.invalidate('heatmap', 'bookings_heatmap', key=path)
+    report['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+
+def import_residents(lines, dry_run=False, on_conflict='skip', skip_invalid=False):
+    """Import residents from CSV lines (a file object or list of strings); returns a report dict."""
+    return _run('residents', lines, dry_run, on_conflict, skip_invalid)
+
+
+def import_rooms(lines, dry_run=False, on_conflict='skip', skip_invalid=False):
+    """Import rooms from CSV lines (a file object or list of strings); returns a report dict."""
+    return _run('rooms', lines, dry_run, on_conflict, skip_invalid)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+    parser = argparse.ArgumentParser()
+    parser.add_argument('kind', choices=('residents', 'rooms'))
+    parser.add_argument('path', help="CSV file, or - for stdin")
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--on-conflict', choices=ON_CONFLICT, default='skip')
+    parser.add_argument('--skip-invalid', action='store_true', help='import the valid rows even if some are invalid')
+    args = parser.parse_args()
+    shards.init_db()
+    f = sys.stdin if args.path == '-' else open(args.path, newline='', encoding='utf-8-sig')
+    with f:
+        fn = import_residents if args.kind == 'residents' else import_rooms
+        report = fn(f, args.dry_run, args.on_conflict, args.skip_invalid)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report['aborted'] else 0)
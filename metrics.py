@@ -0,0 +1,236 @@
+"""Low-overhead query and endpoint instrumentation.
+
+Pooled connections are opened with InstrumentedConnection, whose cursors time
+each statement (execute plus the fetch that follows) and count rows fetched.
+Stats are keyed by the calling function, e.g. 'database.get_user_room'.
+Statements slower than SLOW_QUERY_MS go into a bounded slow log together
+with their EXPLAIN QUERY PLAN. app.py records per-endpoint latency histograms.
+render_prometheus() renders it all in the Prometheus text format.
+
+The hot path is a frame lookup, two perf_counter() calls and a locked
+counter update per statement, which is cheap enough to leave on.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '50'))
+SLOW_LOG_SIZE = 100
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_lock = threading.Lock()
+# caller -> [calls, seconds, rows, max seconds]
+_queries = {}
+# (endpoint, method, status) -> Histogram
+_endpoints = {}
+_slow = deque(maxlen=SLOW_LOG_SIZE)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+_caller_names = {}
+
+
+def _caller(depth):
+    frame = sys._getframe(depth + 1)
+    code = frame.f_code
+    name = _caller_names.get(code)
+    if name is None:
+        name = _caller_names[code] = f"{frame.f_globals.get('__name__', '?')}.{code.co_name}"
+    return name
+
+
+def _record_query(caller, seconds, rows, calls=1):
+    with _lock:
+        stat = _queries.get(caller)
+        if stat is None:
+            stat = _queries[caller] = [0, 0.0, 0, 0.0]
+        stat[0] += calls
+        stat[1] += seconds
+        stat[2] += rows
+        if seconds > stat[3]:
+            stat[3] = seconds
+
+
+def record_request(endpoint, method, status, seconds):
+    key = (endpoint or 'unknown', method, str(status))
+    with _lock:
+        hist = _endpoints.get(key)
+        if hist is None:
+            hist = _endpoints[key] = Histogram()
+        hist.observe(seconds)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _caller = None
+    _sql = None
+    _params = ()
+    _elapsed = 0.0
+    _logged = False
+
+    def execute(self, sql, params=()):
+        caller = self.__dict__.pop('_via', None) or _caller(1)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._caller, self._sql, self._params = caller, sql, params
+            self._elapsed, self._logged = 0.0, False
+            self._spent(time.perf_counter() - start, 0, 1)
+
+    def executemany(self, sql, seq):
+        caller = self.__dict__.pop('_via', None) or _caller(1)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            # Parameters are not kept for executemany, so no plan for the slow log
+            self._caller, self._sql, self._params = caller, sql, None
+            self._elapsed, self._logged = 0.0, False
+            self._spent(time.perf_counter() - start, 0, 1)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._spent(time.perf_counter() - start, 0 if row is None else 1, 0)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._spent(time.perf_counter() - start, len(rows), 0)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._spent(time.perf_counter() - start, len(rows), 0)
+        return rows
+
+    def _spent(self, seconds, rows, calls):
+        caller = self._caller
+        if caller is None:
+            return
+        _record_query(caller, seconds, rows, calls)
+        self._elapsed += seconds
+        # Log a statement once, when its execute + fetch time crosses the threshold
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            _log_slow(self.connection, caller, self._sql, self._params, self._elapsed)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        cur = self.cursor()
+        cur._via = _caller(1)
+        return cur.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        cur = self.cursor()
+        cur._via = _caller(1)
+        return cur.executemany(sql, seq)
+
+
+def _log_slow(conn, caller, sql, params, seconds):
+    plan = []
+    if params is not None and sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        try:
+            # A plain cursor so the EXPLAIN itself is not timed or logged
+            c = sqlite3.Cursor(conn)
+            c.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row[-1] for row in c.fetchall()]
+        except sqlite3.Error:
+            pass
+    _slow.append({'caller': caller, 'sql': ' '.join(sql.split()), 'ms': round(seconds * 1000, 3), 'plan': plan, 'at': time.time()})
+
+
+def slow_queries():
+    return list(_slow)
+
+
+def snapshot():
+    with _lock:
+        queries = {k: list(v) for k, v in _queries.items()}
+        endpoints = {k: (list(h.counts), h.sum, h.count) for k, h in _endpoints.items()}
+    return queries, endpoints
+
+
+def reset():
+    with _lock:
+        _queries.clear()
+        _endpoints.clear()
+    _slow.clear()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def render_prometheus(extra=None):
+    """Prometheus text exposition of query, endpoint and extra metrics.
+
+    extra maps metric name -> (help, {labels tuple: value}[, type]) for metrics
+    owned by other modules (cache hit counters, pool sizes). type is 'gauge'
+    (the default) or 'counter'; counter names must end in _total.
+    """
+    queries, endpoints = snapshot()
+    out = []
+    out.append('# HELP hostel_db_queries_total Statements executed, by calling function.')
+    out.append('# TYPE hostel_db_queries_total counter')
+    for caller, (calls, _, _, _) in sorted(queries.items()):
+        out.append(f'hostel_db_queries_total{{caller="{_label(caller)}"}} {calls}')
+    out.append('# HELP hostel_db_query_seconds_total Time spent executing and fetching, by calling function.')
+    out.append('# TYPE hostel_db_query_seconds_total counter')
+    for caller, (_, seconds, _, _) in sorted(queries.items()):
+        out.append(f'hostel_db_query_seconds_total{{caller="{_label(caller)}"}} {seconds:.6f}')
+    out.append('# HELP hostel_db_rows_total Rows fetched, by calling function.')
+    out.append('# TYPE hostel_db_rows_total counter')
+    for caller, (_, _, rows, _) in sorted(queries.items()):
+        out.append(f'hostel_db_rows_total{{caller="{_label(caller)}"}} {rows}')
+    out.append('# HELP hostel_db_query_max_seconds Slowest single statement, by calling function.')
+    out.append('# TYPE hostel_db_query_max_seconds gauge')
+    for caller, (_, _, _, worst) in sorted(queries.items()):
+        out.append(f'hostel_db_query_max_seconds{{caller="{_label(caller)}"}} {worst:.6f}')
+    out.append('# HELP hostel_db_slow_queries Entries in the slow query log.')
+    out.append('# TYPE hostel_db_slow_queries gauge')
+    out.append(f'hostel_db_slow_queries {len(_slow)}')
+    out.append('# HELP hostel_http_request_duration_seconds Request latency by endpoint.')
+    out.append('# TYPE hostel_http_request_duration_seconds histogram')
+    for (endpoint, method, status), (counts, total, count) in sorted(endpoints.items()):
+        labels = f'endpoint="{_label(endpoint)}",method="{method}",status="{status}"'
+        running = 0
+        for bound, n in zip(LATENCY_BUCKETS, counts):
+            running += n
+            out.append(f'hostel_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {running}')
+        out.append(f'hostel_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        out.append(f'hostel_http_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+        out.append(f'hostel_http_request_duration_seconds_count{{{labels}}} {count}')
+    for name, (help_text, series, *kind) in (extra or {}).items():
+        kind = kind[0] if kind else 'gauge'
+        if kind == 'counter' and not name.endswith('_total'):
+            raise ValueError(f"counter {name} must end in _total")
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        for labels, value in series.items():
+            label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels)
+            out.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+    return '\n'.join(out) + '\n'
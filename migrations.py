@@ -0,0 +1,402 @@
+"""Versioned schema migrations for hostel.db.
+
+Each migration runs once, in order, inside its own transaction and is recorded
+in the schema_version table. init_db() calls run_migrations() on startup; when
+the database is already at the latest version this is a single SELECT.
+
+    python migrations.py            # apply pending migrations and print status
+    python migrations.py --explain  # show EXPLAIN QUERY PLAN for hot queries
+"""
+import sqlite3
+from datetime import datetime
+
+
+def _columns(c, table, hidden=False):
+    # table_xinfo also lists generated columns
+    c.execute(f"PRAGMA {'table_xinfo' if hidden else 'table_info'}({table})")
+    return {row[1] for row in c.fetchall()}
+
+
+def _add_column(c, table, column, ddl):
+    if column not in _columns(c, table):
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _m001_base_schema(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS users (
+        email TEXT PRIMARY KEY,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_id INTEGER NOT NULL,
+        group_id TEXT,
+        final_timestamp TEXT,
+        group_sync_score FLOAT,
+        status TEXT DEFAULT 'pending'
+    )''')
+    # Columns added after the first release; older databases may lack them
+    _add_column(c, 'bookings', 'booked_by', 'TEXT')
+    _add_column(c, 'bookings', 'roommates_count', 'INTEGER DEFAULT 1')
+    # Rooms table with capacities
+    c.execute('''CREATE TABLE IF NOT EXISTS rooms (
+        room_no INTEGER PRIMARY KEY,
+        total_beds INTEGER NOT NULL
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS service_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_id INTEGER NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'pending',
+        warden_reason TEXT,
+        technician TEXT
+    )''')
+    _add_column(c, 'service_requests', 'resident_id', 'TEXT')
+    c.execute('''CREATE TABLE IF NOT EXISTS outings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        resident_id TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        status TEXT DEFAULT 'pending',
+        warden_reason TEXT
+    )''')
+    # Basic profiles for greeting and details
+    c.execute('''CREATE TABLE IF NOT EXISTS profiles (
+        email TEXT PRIMARY KEY,
+        display_name TEXT,
+        phone TEXT
+    )''')
+
+
+def _m002_hot_path_indexes(c):
+    # Resident lookups: approved room, duplicate-approval check, own bookings
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_booked_by_status ON bookings(booked_by, status)")
+    # Occupancy per room; covering so SUM(roommates_count) never touches the table
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_room_status ON bookings(room_id, status, roommates_count, booked_by)")
+    # Pending queues on the warden dashboard
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_status ON service_requests(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outings_status ON outings(status)")
+    # Per-resident history
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_resident ON service_requests(resident_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_room ON service_requests(room_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outings_resident ON outings(resident_id)")
+
+
+def _m003_room_occupancy(c):
+    # Approved beds per room, maintained by booking status changes in database.py
+    c.execute('''CREATE TABLE IF NOT EXISTS room_occupancy (
+        room_no INTEGER PRIMARY KEY,
+        occupied INTEGER NOT NULL DEFAULT 0
+    )''')
+    c.execute("DELETE FROM room_occupancy")
+    c.execute("INSERT INTO room_occupancy (room_no, occupied) SELECT room_id, IFNULL(SUM(roommates_count),0) FROM bookings WHERE status = 'approved' GROUP BY room_id")
+
+
+def _m004_partial_pending_bookings_index(c):
+    # A plain status index tempts the planner into using it for status='approved'
+    # joins (most rows); a partial index only ever serves the pending queue.
+    c.execute("DROP INDEX IF EXISTS idx_bookings_status")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings(id) WHERE status = 'pending'")
+
+
+def _m005_outing_epochs(c):
+    # Sortable epoch seconds next to the display strings; naive times are encoded as if UTC
+    _add_column(c, 'outings', 'start_epoch', 'INTEGER')
+    _add_column(c, 'outings', 'end_epoch', 'INTEGER')
+    c.execute("UPDATE outings SET start_epoch = CAST(strftime('%s', start_time) AS INTEGER), end_epoch = CAST(strftime('%s', end_time) AS INTEGER) WHERE start_epoch IS NULL")
+    # Overlap check on submit only needs the resident's outings that end after the new one starts
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outings_resident_end ON outings(resident_id, end_epoch)")
+    c.execute("DROP INDEX IF EXISTS idx_outings_resident")
+    # One-dimensional R*Tree over [start_epoch, end_epoch] for "who is out during a window"
+    c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS outing_intervals USING rtree(id, start_epoch, end_epoch)")
+    c.execute("DELETE FROM outing_intervals")
+    c.execute("INSERT INTO outing_intervals (id, start_epoch, end_epoch) SELECT id, start_epoch, end_epoch FROM outings WHERE end_epoch >= start_epoch")
+    # Triggers keep the R*Tree in step with every write path (direct, write-behind, imports)
+    c.execute('''CREATE TRIGGER IF NOT EXISTS outings_interval_insert AFTER INSERT ON outings
+        WHEN new.end_epoch >= new.start_epoch
+        BEGIN
+            INSERT INTO outing_intervals (id, start_epoch, end_epoch) VALUES (new.id, new.start_epoch, new.end_epoch);
+        END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS outings_interval_update AFTER UPDATE OF start_epoch, end_epoch ON outings
+        BEGIN
+            DELETE FROM outing_intervals WHERE id = old.id;
+            INSERT INTO outing_intervals (id, start_epoch, end_epoch) SELECT new.id, new.start_epoch, new.end_epoch WHERE new.end_epoch >= new.start_epoch;
+        END''')
+    c.execute('''CREATE TRIGGER IF NOT EXISTS outings_interval_delete AFTER DELETE ON outings
+        BEGIN
+            DELETE FROM outing_intervals WHERE id = old.id;
+        END''')
+
+
+def _m006_archive_tables(c):
+    for table in ('service_requests', 'outings', 'bookings'):
+        # Stamp every decision so archival can tell how long a row has been resolved
+        _add_column(c, table, 'resolved_at', 'INTEGER')
+        c.execute(f"UPDATE {table} SET resolved_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE status != 'pending' AND resolved_at IS NULL")
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_resolved AFTER UPDATE OF status ON {table}
+            WHEN new.status IS NOT old.status
+            BEGIN
+                UPDATE {table} SET resolved_at = CASE WHEN new.status = 'pending' THEN NULL ELSE CAST(strftime('%s', 'now') AS INTEGER) END WHERE id = new.id;
+            END''')
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_resolved ON {table}(resolved_at) WHERE status != 'pending'")
+    # Cold copies of resolved rows; ids are kept (AUTOINCREMENT never hands them out again)
+    c.execute('''CREATE TABLE IF NOT EXISTS service_requests_archive (
+        id INTEGER PRIMARY KEY,
+        room_id INTEGER NOT NULL,
+        description TEXT,
+        status TEXT,
+        warden_reason TEXT,
+        technician TEXT,
+        resident_id TEXT,
+        resolved_at INTEGER,
+        archived_at INTEGER
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS outings_archive (
+        id INTEGER PRIMARY KEY,
+        resident_id TEXT,
+        start_time TEXT,
+        end_time TEXT,
+        status TEXT,
+        warden_reason TEXT,
+        start_epoch INTEGER,
+        end_epoch INTEGER,
+        resolved_at INTEGER,
+        archived_at INTEGER
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS bookings_archive (
+        id INTEGER PRIMARY KEY,
+        room_id INTEGER NOT NULL,
+        group_id TEXT,
+        final_timestamp TEXT,
+        group_sync_score FLOAT,
+        status TEXT,
+        booked_by TEXT,
+        roommates_count INTEGER,
+        resolved_at INTEGER,
+        archived_at INTEGER
+    )''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_archive_resident ON service_requests_archive(resident_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_archive_room ON service_requests_archive(room_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_outings_archive_resident ON outings_archive(resident_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_archive_booked_by ON bookings_archive(booked_by)")
+
+
+def _m007_created_at(c):
+    # Submission time in hostel wall-clock epoch seconds (same encoding as the outing epochs);
+    # rows from before this migration have none
+    for table in ('service_requests', 'outings', 'bookings'):
+        _add_column(c, table, 'created_at', 'INTEGER')
+        _add_column(c, f"{table}_archive", 'created_at', 'INTEGER')
+
+
+def _m008_technicians(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS technicians (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        specialization TEXT,
+        capacity INTEGER NOT NULL DEFAULT 3,
+        active INTEGER NOT NULL DEFAULT 1
+    )''')
+    # Load per technician = open tickets assigned to them
+    c.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_technician ON service_requests(technician) WHERE status = 'pending'")
+
+
+def _m009_resident_blocks(c):
+    # Block directory kept in DB_PATH when the hostel is split into per-block databases (shards.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS resident_blocks (
+        email TEXT PRIMARY KEY,
+        block TEXT NOT NULL
+    )''')
+
+
+def _bump(scopes):
+    # scopes: a SELECT yielding scope names (NULLs are skipped)
+    return (f"INSERT INTO data_versions (scope, version, changed_at) "
+            f"SELECT scope, 1, CAST(strftime('%s', 'now') AS INTEGER) FROM ({scopes}) WHERE scope IS NOT NULL "
+            f"ON CONFLICT(scope) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at;")
+
+
+def _m010_data_versions(c):
+    # A counter per slice of the dashboards, bumped by triggers on every write path, so a page
+    # can be revalidated (ETag) or served from the render cache with one primary key lookup.
+    # 'queue' = pending requests, 'rooms' = heatmaps, 'resident:<email>' = one resident's page
+    c.execute('''CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL,
+        changed_at INTEGER NOT NULL
+    )''')
+    # Residents also see service requests filed for rooms they booked into
+    room_residents = "SELECT 'resident:' || booked_by AS scope FROM bookings WHERE room_id = {row}.room_id"
+    triggers = {
+        'bookings': {
+            'INSERT': ["SELECT 'queue' AS scope", "SELECT 'resident:' || new.booked_by AS scope"],
+            'UPDATE': ["SELECT 'queue' AS scope UNION ALL SELECT 'rooms'", "SELECT 'resident:' || new.booked_by AS scope"],
+            'DELETE': ["SELECT 'queue' AS scope UNION ALL SELECT 'rooms'", "SELECT 'resident:' || old.booked_by AS scope"],
+        },
+        'service_requests': {
+            'INSERT': ["SELECT 'queue' AS scope UNION ALL SELECT 'rooms'", "SELECT 'resident:' || new.resident_id AS scope UNION " + room_residents.format(row='new')],
+            'UPDATE': ["SELECT 'queue' AS scope", "SELECT 'resident:' || new.resident_id AS scope UNION " + room_residents.format(row='new')],
+            'DELETE': ["SELECT 'queue' AS scope"],
+        },
+        'outings': {
+            'INSERT': ["SELECT 'queue' AS scope", "SELECT 'resident:' || new.resident_id AS scope"],
+            'UPDATE': ["SELECT 'queue' AS scope", "SELECT 'resident:' || new.resident_id AS scope"],
+            'DELETE': ["SELECT 'queue' AS scope"],
+        },
+        'profiles': {
+            'INSERT': ["SELECT 'resident:' || new.email AS scope"],
+            'UPDATE': ["SELECT 'resident:' || new.email AS scope"],
+        },
+        'rooms': {
+            'INSERT': ["SELECT 'rooms' AS scope"],
+            'UPDATE': ["SELECT 'rooms' AS scope"],
+            'DELETE': ["SELECT 'rooms' AS scope"],
+        },
+    }
+    for table, events in triggers.items():
+        for event, scopes in events.items():
+            body = '\n'.join(_bump(s) for s in scopes)
+            c.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN\n{body}\nEND")
+    # Service requests moving to another room change the heatmap too
+    rooms_bump = _bump("SELECT 'rooms' AS scope")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS service_requests_version_room AFTER UPDATE OF room_id ON service_requests WHEN new.room_id IS NOT old.room_id BEGIN\n{rooms_bump}\nEND")
+
+
+def _m011_resident_no(c):
+    # N of a residentN@hostel.com booking (else NULL), for the next-resident suggestion.
+    # A virtual column stays right through inserts, edits and archiving without triggers;
+    # the partial index holds only matching bookings, newest last.
+    email = "trim(booked_by, char(32, 9, 10, 13))"
+    digits = f"substr({email}, 9, length({email}) - 19)"
+    if 'resident_no' not in _columns(c, 'bookings', hidden=True):
+        c.execute(f"ALTER TABLE bookings ADD COLUMN resident_no INTEGER GENERATED ALWAYS AS "
+                  f"(CASE WHEN {email} LIKE 'resident_%@hostel.com' AND {digits} NOT GLOB '*[^0-9]*' THEN CAST({digits} AS INTEGER) END) VIRTUAL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_bookings_resident_no ON bookings(id, resident_no) WHERE resident_no IS NOT NULL")
+
+
+def _m012_bootstrap(c):
+    # One row per database once init_db() has seeded it, so later worker boots skip the seeding
+    c.execute('''CREATE TABLE IF NOT EXISTS bootstrap (
+        step TEXT PRIMARY KEY,
+        done_at TEXT NOT NULL
+    )''')
+
+
+def _m013_resident_housed(c):
+    # Set while the resident's block holds an approved booking for them; approvals claim it with
+    # one guarded upsert (shards._claim), so two blocks cannot both house a resident
+    _add_column(c, 'resident_blocks', 'housed', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def _m014_resident_claims(c):
+    # Approvals in flight for the resident in their block; the housed flag is only cleared at zero
+    _add_column(c, 'resident_blocks', 'claims', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def _m015_delete_version_triggers(c):
+    # Only archive.py deletes requests, and it moves resolved rows that history reads union back
+    # in: bump a scope only for rows it can still see (pending ones, approved bookings' beds)
+    triggers = {
+        'bookings': ("old.status IN ('pending', 'approved')",
+                     ["SELECT 'queue' AS scope WHERE old.status = 'pending' UNION ALL SELECT 'rooms' WHERE old.status = 'approved'",
+                      "SELECT 'resident:' || old.booked_by AS scope"]),
+        'service_requests': ("old.status = 'pending'", ["SELECT 'queue' AS scope"]),
+        'outings': ("old.status = 'pending'", ["SELECT 'queue' AS scope"]),
+    }
+    for table, (when, scopes) in triggers.items():
+        body = '\n'.join(_bump(s) for s in scopes)
+        c.execute(f"DROP TRIGGER IF EXISTS {table}_version_delete")
+        c.execute(f"CREATE TRIGGER {table}_version_delete AFTER DELETE ON {table} WHEN {when} BEGIN\n{body}\nEND")
+
+
+# (version, name, function) - append only; never renumber or edit applied entries
+MIGRATIONS = [
+    (1, 'base schema', _m001_base_schema),
+    (2, 'hot path indexes', _m002_hot_path_indexes),
+    (3, 'room occupancy counters', _m003_room_occupancy),
+    (4, 'partial pending bookings index', _m004_partial_pending_bookings_index),
+    (5, 'outing epochs and interval index', _m005_outing_epochs),
+    (6, 'resolved_at stamps and archive tables', _m006_archive_tables),
+    (7, 'created_at on requests', _m007_created_at),
+    (8, 'technicians', _m008_technicians),
+    (9, 'resident block directory', _m009_resident_blocks),
+    (10, 'dashboard data versions', _m010_data_versions),
+    (11, 'resident number on bookings', _m011_resident_no),
+    (12, 'bootstrap marker', _m012_bootstrap),
+    (13, 'housed flag in resident block directory', _m013_resident_housed),
+    (14, 'in-flight approval claims in resident block directory', _m014_resident_claims),
+    (15, 'data version bumps only for visible deleted rows', _m015_delete_version_triggers),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, name TEXT, applied_at TEXT)")
+    c.execute("SELECT IFNULL(MAX(version), 0) FROM schema_version")
+    return c.fetchone()[0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations in order; returns the list of versions applied."""
+    if current_version(conn) >= LATEST_VERSION:
+        return []
+    applied = []
+    c = conn.cursor()
+    for version, name, fn in MIGRATIONS:
+        if conn.in_transaction:
+            conn.commit()
+        # IMMEDIATE takes the write lock so concurrent workers apply each step once
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.execute("SELECT 1 FROM schema_version WHERE version = ?", (version,))
+            if c.fetchone():
+                conn.rollback()
+                continue
+            fn(c)
+            c.execute("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)", (version, name, datetime.utcnow().isoformat()))
+            conn.commit()
+            applied.append(version)
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    return applied
+
+
+# Queries on the request path, used to check that they hit an index
+HOT_QUERIES = [
+    ("SELECT room_id FROM bookings WHERE booked_by = ? AND status = 'approved' ORDER BY id DESC LIMIT 1", ('resident1@hostel.com',)),
+    ("SELECT IFNULL(SUM(roommates_count),0) FROM bookings WHERE room_id = ? AND status = 'approved'", (101,)),
+    ("SELECT COUNT(*) FROM bookings WHERE status='pending'", ()),
+    ("SELECT COUNT(*) FROM service_requests WHERE status='pending'", ()),
+    ("SELECT COUNT(*) FROM outings WHERE status='pending'", ()),
+    ("SELECT id, status FROM service_requests WHERE resident_id = ?", ('resident1@hostel.com',)),
+    ("SELECT id, status FROM outings WHERE resident_id = ?", ('resident1@hostel.com',)),
+    ("SELECT 1 FROM outings WHERE resident_id = ? AND end_epoch > ? AND start_epoch < ? AND status != 'rejected' LIMIT 1", ('resident1@hostel.com', 1772355600, 1772384400)),
+    ("SELECT COUNT(*) FROM service_requests WHERE technician = ? AND status = 'pending'", ('tech1',)),
+    ("SELECT resident_no FROM bookings WHERE resident_no IS NOT NULL ORDER BY id DESC LIMIT 1", ()),
+    ("SELECT o.id FROM outing_intervals i CROSS JOIN outings o ON o.id = i.id WHERE i.start_epoch <= ? AND i.end_epoch >= ? AND o.start_epoch < ? AND o.end_epoch > ? AND o.status = 'approved'", (1772402400, 1772316000, 1772402400, 1772316000)),
+]
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for sql."""
+    c = conn.cursor()
+    c.execute("EXPLAIN QUERY PLAN " + sql, params)
+    return [row[-1] for row in c.fetchall()]
+
+
+if __name__ == '__main__':
+    import sys
+    import database
+    with database.get_conn() as conn:
+        applied = run_migrations(conn)
+        print(f"schema version {current_version(conn)} (applied now: {applied or 'none'})")
+        if '--explain' in sys.argv:
+            for sql, params in HOT_QUERIES:
+                print(sql)
+                for line in explain(conn, sql, params):
+                    print('    ' + line)
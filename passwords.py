@@ -0,0 +1,140 @@
+"""Salted password hashing with a bounded KDF worker pool.
+
+Hashes are stored as 'scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>'. Rows from
+before hashing hold the plaintext; verify() still accepts them and
+needs_rehash() tells the caller to upgrade the row after a successful login.
+
+scrypt is deliberately slow, so it runs on a small thread pool (hashlib
+releases the GIL while it works). At most KDF_WORKERS hashes run at once
+and at most KDF_BACKLOG wait; past that, LoginBusy is raised at once
+instead of letting a login storm queue without bound. Successful
+verifications are remembered for a short time, keyed by an HMAC under a
+per-process secret, so repeat logins skip the KDF. Unknown, OAuth-only and
+legacy plaintext accounts are also checked against a dummy hash with the
+same parameters, so a login takes as long whatever the account's row holds.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+KDF_WORKERS = int(os.environ.get('KDF_WORKERS', str(os.cpu_count() or 2)))
+KDF_BACKLOG = int(os.environ.get('KDF_BACKLOG', '64'))
+VERIFIED_TTL = float(os.environ.get('LOGIN_CACHE_TTL', '300'))
+VERIFIED_MAX = 4096
+
+# Placeholder stored for accounts that can only sign in through OAuth
+NO_PASSWORD = 'oauth'
+
+
+class LoginBusy(Exception):
+    """Raised when the KDF pool is saturated; the caller should ask the client to retry."""
+
+
+_executor = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix='kdf')
+_slots = threading.BoundedSemaphore(KDF_WORKERS + KDF_BACKLOG)
+_cache_key = os.urandom(32)
+_verified = OrderedDict()
+_verified_lock = threading.Lock()
+_dummy = None
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024)
+
+
+def _run(fn, *args):
+    """Run fn on the KDF pool and wait for it, or raise LoginBusy if the pool is full."""
+    if not _slots.acquire(blocking=False):
+        raise LoginBusy('Too many logins in progress')
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _hash(password):
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def _verify(password, stored):
+    try:
+        _, n, r, p, salt, digest = stored.split('$')
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def _reject(password):
+    # Hashed on first use rather than at import; a race only hashes it twice
+    global _dummy
+    if _dummy is None:
+        _dummy = _hash(os.urandom(16).hex())
+    _verify(password, _dummy)
+    return False
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith('scrypt$')
+
+
+def hash_password(password):
+    return _run(_hash, password)
+
+
+def hash_passwords(passwords):
+    """Hash many passwords on the KDF pool (bulk imports; bypasses the login backlog limit)."""
+    return list(_executor.map(_hash, passwords))
+
+
+def verify_password(password, stored):
+    """Check password against a stored hash or legacy plaintext value.
+
+    stored is None for an unknown account; that still costs one KDF run.
+    """
+    if not password:
+        return False
+    if not stored or stored == NO_PASSWORD:
+        return _run(_reject, password)
+    if not is_hashed(stored):
+        _run(_reject, password)
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+    key = hmac.new(_cache_key, f"{stored}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+    now = time.monotonic()
+    with _verified_lock:
+        expires = _verified.get(key)
+        if expires is not None and expires > now:
+            return True
+    ok = _run(_verify, password, stored)
+    if ok:
+        with _verified_lock:
+            _verified[key] = now + VERIFIED_TTL
+            _verified.move_to_end(key)
+            while len(_verified) > VERIFIED_MAX:
+                _verified.popitem(last=False)
+    return ok
+
+
+def needs_rehash(stored):
+    if not is_hashed(stored):
+        return stored != NO_PASSWORD
+    try:
+        _, n, r, p, _, _ = stored.split('$')
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
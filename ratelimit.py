@@ -0,0 +1,52 @@
+"""In-memory sliding-window attempt limiter (per process).
+
+Used on /login to cap failed attempts per account and per client IP;
+throttled clients are refused before any password hashing is done.
+"""
+import threading
+import time
+from collections import deque
+
+
+class AttemptLimiter:
+    def __init__(self, limit, window_seconds, max_keys=100000):
+        self.limit = limit
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if not hits:
+            del self._hits[key]
+            return None
+        return hits
+
+    def retry_after(self, key):
+        """Seconds until key may try again, or 0 if it is under the limit."""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None or len(hits) < self.limit:
+                return 0
+            return max(1, int(hits[0] + self.window - now) + 1)
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._prune(key, now)
+            if hits is None:
+                if len(self._hits) >= self.max_keys:
+                    # Drop the oldest-inserted key rather than grow without bound
+                    self._hits.pop(next(iter(self._hits)))
+                hits = self._hits[key] = deque(maxlen=self.limit)
+            hits.append(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
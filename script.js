@@ -258,6 +258,34 @@ document.addEventListener('DOMContentLoaded', () => {
     const bookingsHeatmapCanvas = document.getElementById('bookingsHeatmap');
     if (serviceRequestsList || outingRequestsList || heatmapCanvas || bookingsHeatmapCanvas) {
         const tkn = localStorage.getItem('token');
+        const liveUpdates = !!window.EventSource;
+        let serviceChart = null;
+        let bookingsChart = null;
+        const decide = (type, id, body, errorMsg) => {
+            fetch(`/approve/${type}/${id}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/json', ...(tkn ? { 'Authorization': `Bearer ${tkn}` } : {}) },
+                credentials: 'include',
+                body: JSON.stringify(body)
+            }).then(res => res.json()).then(data => {
+                showNotification(data.error || data.msg || 'Updated');
+                // With the live stream connected, lists and heatmaps update in place
+                if (!liveUpdates) location.reload();
+            }).catch(() => showNotification(errorMsg));
+        };
+        // Delegated so items added by the live stream get working buttons too
+        document.addEventListener('click', (e) => {
+            const btn = e.target.closest('.approveBtn, .rejectBtn');
+            if (!btn) return;
+            const id = btn.dataset.id;
+            const type = btn.dataset.type;
+            if (btn.classList.contains('approveBtn')) {
+                decide(type, id, { status: 'approved' }, 'Error approving request');
+            } else {
+                const reason = prompt('Enter rejection reason');
+                if (reason) decide(type, id, { status: 'rejected', reason }, 'Error rejecting request');
+            }
+        });
         fetch('/dashboard/warden', { credentials: 'include', headers: { ...(tkn ? { 'Authorization': `Bearer ${tkn}` } : {}) } })
             .then(res => res.text()).then(html => {
                 const parser = new DOMParser();
@@ -272,42 +300,6 @@ document.addEventListener('DOMContentLoaded', () => {
                     const items = doc.getElementById('outingRequestsList').getElementsByTagName('li');
                     Array.from(items).forEach(li => outingRequestsList.appendChild(li));
                 }
-
-                document.querySelectorAll('.approveBtn').forEach(btn => {
-                    btn.addEventListener('click', () => {
-                        const id = btn.dataset.id;
-                        const type = btn.dataset.type;
-                                    fetch(`/approve/${type}/${id}`, {
-                            method: 'PUT',
-                                        headers: { 'Content-Type': 'application/json', ...(tkn ? { 'Authorization': `Bearer ${tkn}` } : {}) },
-                                        credentials: 'include',
-                            body: JSON.stringify({ status: 'approved' })
-                        }).then(res => res.json()).then(data => {
-                            showNotification(data.msg || 'Updated');
-                            // Reload to refresh heatmaps and lists after approval
-                            location.reload();
-                        }).catch(() => showNotification('Error approving request'));
-                    });
-                });
-
-                document.querySelectorAll('.rejectBtn').forEach(btn => {
-                    btn.addEventListener('click', () => {
-                        const id = btn.dataset.id;
-                        const type = btn.dataset.type;
-                        const reason = prompt('Enter rejection reason');
-                        if (reason) {
-                                            fetch(`/approve/${type}/${id}`, {
-                                method: 'PUT',
-                                                headers: { 'Content-Type': 'application/json', ...(tkn ? { 'Authorization': `Bearer ${tkn}` } : {}) },
-                                                credentials: 'include',
-                                body: JSON.stringify({ status: 'rejected', reason })
-                            }).then(res => res.json()).then(data => {
-                                showNotification(data.msg || 'Updated');
-                                location.reload();
-                            }).catch(() => showNotification('Error rejecting request'));
-                        }
-                    });
-                });
             }).catch(err => console.error('Error fetching warden data:', err));
 
             if (heatmapCanvas) {
@@ -318,25 +310,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 if (window.Chart && Array.isArray(heatmapData)) {
                     // Build a color scale based on counts (green -> yellow -> red)
                     const counts = heatmapData.map(d => d[1]);
-                    const max = Math.max(1, ...counts);
-                    const colors = counts.map(c => {
-                        const t = c / max; // 0..1
-                        // interpolate: green (0,200,0) -> yellow (255,200,0) -> red (220,0,0)
-                        let r, g, b;
-                        if (t < 0.5) {
-                            const k = t / 0.5;
-                            r = Math.round(0 + k * 255);
-                            g = 200;
-                            b = 0;
-                        } else {
-                            const k = (t - 0.5) / 0.5;
-                            r = 255 - Math.round(k * 35); // 255 -> 220
-                            g = 200 - Math.round(k * 200); // 200 -> 0
-                            b = 0;
-                        }
-                        return `rgba(${r}, ${g}, ${b}, 0.6)`;
-                    });
-                    const chart = new Chart(ctx, {
+                    const colors = heatColors(counts);
+                    serviceChart = new Chart(ctx, {
                         type: 'bar',
                         data: {
                             labels: heatmapData.map(d => (d[0] === 101 ? 'Room1' : `Room ${d[0]}`)),
@@ -365,15 +340,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     const bookingsData = bookingsDataScript ? JSON.parse(bookingsDataScript.textContent || '[]') : [];
                     if (window.Chart && Array.isArray(bookingsData)) {
                         const counts2 = bookingsData.map(d => d[1]);
-                        const max2 = Math.max(1, ...counts2);
-                        const colors2 = counts2.map(c => {
-                            const t = c / max2;
-                            let r, g, b;
-                            if (t < 0.5) { const k = t / 0.5; r = Math.round(0 + k * 255); g = 200; b = 0; }
-                            else { const k = (t - 0.5) / 0.5; r = 255 - Math.round(k * 35); g = 200 - Math.round(k * 200); b = 0; }
-                            return `rgba(${r}, ${g}, ${b}, 0.6)`;
-                        });
-                        new Chart(ctx2, {
+                        const colors2 = heatColors(counts2);
+                        bookingsChart = new Chart(ctx2, {
                             type: 'bar',
                             data: {
                                 labels: bookingsData.map(d => (d[0] === 101 ? 'Room1' : `Room ${d[0]}`)),
@@ -412,6 +380,69 @@ document.addEventListener('DOMContentLoaded', () => {
                             // leave empty or show a message
                         });
                 }
+
+                // Live updates: patch lists, counters and heatmaps from the warden event stream
+                if (liveUpdates) {
+                    const listFor = { service: serviceRequestsList, outing: outingRequestsList, booking: document.getElementById('bookingRequestsList') };
+                    const counterFor = { service: document.getElementById('serviceCount'), outing: document.getElementById('outingCount') };
+                    const bump = (type, by) => {
+                        const el = counterFor[type];
+                        if (el) el.textContent = Math.max(0, (parseInt(el.textContent, 10) || 0) + by);
+                    };
+                    const patchChart = (chart, roomNo, by) => {
+                        if (!chart) return;
+                        const idx = chart.data.labels.indexOf(roomNo === 101 ? 'Room1' : `Room ${roomNo}`);
+                        if (idx < 0) return;
+                        const data = chart.data.datasets[0].data;
+                        data[idx] = Math.max(0, data[idx] + by);
+                        chart.data.datasets[0].backgroundColor = heatColors(data);
+                        chart.update();
+                    };
+                    const decisionButton = (cls, label, item) => {
+                        const btn = document.createElement('button');
+                        btn.className = `${cls} btn btn-sm ms-2 ${cls === 'approveBtn' ? 'btn-success' : 'btn-danger'}`;
+                        btn.dataset.id = item.id;
+                        btn.dataset.type = item.type;
+                        btn.textContent = label;
+                        return btn;
+                    };
+                    // Resume after the event the page was rendered at, so nothing in between is missed
+                    const eventId = document.body.dataset.eventId;
+                    const source = new EventSource(`/events/warden${eventId ? `?last_id=${encodeURIComponent(eventId)}` : ''}`, { withCredentials: true });
+                    source.addEventListener('request.created', (e) => {
+                        const item = JSON.parse(e.data);
+                        // The page may already list a request published just before it was read
+                        if (document.querySelector(`.approveBtn[data-type="${item.type}"][data-id="${item.id}"]`)) return;
+                        const list = listFor[item.type];
+                        if (list) {
+                            const li = document.createElement('li');
+                            li.className = 'list-group-item';
+                            const label = item.type === 'booking' ? `Booking #${item.id}: Room ${item.ref} (by ${item.info})`
+                                : item.type === 'outing' ? `Request #${item.id}: Resident ${item.ref} (${item.info})`
+                                : `Request #${item.id}: Room ${item.ref} - ${item.info}`;
+                            li.textContent = `${label} [Status: ${item.status}]`;
+                            li.appendChild(decisionButton('approveBtn', 'Approve', item));
+                            li.appendChild(decisionButton('rejectBtn', 'Reject', item));
+                            list.appendChild(li);
+                        }
+                        bump(item.type, 1);
+                        if (item.type === 'service') patchChart(serviceChart, item.ref, 1);
+                    });
+                    source.addEventListener('request.updated', (e) => {
+                        const item = JSON.parse(e.data);
+                        const btn = document.querySelector(`.approveBtn[data-type="${item.type}"][data-id="${item.id}"]`);
+                        if (btn && item.status !== 'pending') {
+                            btn.closest('li').remove();
+                            bump(item.type, -1);
+                        }
+                    });
+                    source.addEventListener('occupancy', (e) => {
+                        const change = JSON.parse(e.data);
+                        patchChart(bookingsChart, change.room_no, change.delta);
+                    });
+                    // The server could not replay what we missed; start from a fresh page
+                    source.addEventListener('resync', () => location.reload());
+                }
         }
     }
 
@@ -439,4 +470,25 @@ function showNotification(message) {
     div.textContent = message;
     notifications.appendChild(div);
     setTimeout(() => div.remove(), 3000);
-}
\ No newline at end of file
+}
+
+// Color scale for heatmap counts: green (low) -> yellow (medium) -> red (high)
+function heatColors(counts) {
+    const max = Math.max(1, ...counts);
+    return counts.map(c => {
+        const t = c / max; // 0..1
+        let r, g, b;
+        if (t < 0.5) {
+            const k = t / 0.5;
+            r = Math.round(0 + k * 255);
+            g = 200;
+            b = 0;
+        } else {
+            const k = (t - 0.5) / 0.5;
+            r = 255 - Math.round(k * 35); // 255 -> 220
+            g = 200 - Math.round(k * 200); // 200 -> 0
+            b = 0;
+        }
+        return `rgba(${r}, ${g}, ${b}, 0.6)`;
+    });
+}
@@ -0,0 +1,447 @@
+"""Per-block databases behind one routing layer.
+
+HOSTEL_BLOCKS splits the hostel into blocks, each with its own SQLite file and
+so its own writer lock:
+
+    HOSTEL_BLOCKS="A:101-199=hostel.db,B:201-299=block_b.db,C:301-399=block_c.db"
+
+Each entry is name:first_room-last_room=path (relative paths are next to this
+file). Entries are append-only: a block's position fixes its id range. Block i
+hands out request ids above i * ID_SPAN, so an id names its block and merged
+views never see two rows with one id; listing the existing hostel.db first
+keeps its ids valid.
+
+Accounts, profiles and the resident -> block directory stay in
+database.DB_PATH. Room operations go to the block that owns the room, resident
+operations to the resident's block (the block of their latest approved booking,
+else of their first booking, else the first block), and decisions to the block
+that owns the id. Warden-wide views run on every block in parallel and are
+merged. Without HOSTEL_BLOCKS each function here is the plain database call.
+
+The directory is written once per resident on their first accepted booking,
+and on approvals: before a block approves a booking it claims the resident
+with one guarded upsert in DB_PATH (_claim), which fails if another block
+houses them, and releases the claim once the block has written (_release).
+Service requests and outings never write to DB_PATH. A resident's own history
+is read from every block, since they may have booked in more than one.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from database import BookingRejected
+
+ID_SPAN = 10 ** 9
+
+Block = namedtuple('Block', 'name first_room last_room path index')
+
+BLOCKS = []
+_executor = None
+
+
+def parse_blocks(spec):
+    """Parse a HOSTEL_BLOCKS string into Blocks; raises ValueError on a bad or overlapping entry."""
+    blocks = []
+    for entry in (e.strip() for e in spec.split(',')):
+        if not entry:
+            continue
+        name, _, rest = entry.partition(':')
+        rooms, _, path = rest.partition('=')
+        first, _, last = rooms.partition('-')
+        if not name or not path or not first.strip().isdigit() or not last.strip().isdigit() or int(first) > int(last):
+            raise ValueError(f"bad HOSTEL_BLOCKS entry {entry!r} (expected name:first-last=path)")
+        path = path.strip()
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(__file__), path)
+        block = Block(name.strip(), int(first), int(last), path, len(blocks))
+        for other in blocks:
+            if other.name == block.name or other.path == block.path:
+                raise ValueError(f"block {block.name!r} repeats the name or file of block {other.name!r}")
+            if block.first_room <= other.last_room and other.first_room <= block.last_room:
+                raise ValueError(f"rooms of block {block.name!r} overlap block {other.name!r}")
+        blocks.append(block)
+    return blocks
+
+
+def configure(spec):
+    """Replace the block layout (HOSTEL_BLOCKS syntax; '' turns sharding off)."""
+    global BLOCKS, _executor
+    BLOCKS = parse_blocks(spec)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(max_workers=len(BLOCKS), thread_name_prefix='shard') if BLOCKS else None
+
+
+configure(os.environ.get('HOSTEL_BLOCKS', ''))
+
+
+def init_db():
+    """Migrate and seed DB_PATH and every block; each block gets its id range."""
+    if not BLOCKS:
+        return database.init_db()
+    if database.DB_PATH not in {b.path for b in BLOCKS}:
+        database.init_db(seed_rooms=())
+    for block in BLOCKS:
+        with database.use_db(block.path):
+            database.init_db(seed_accounts=block.path == database.DB_PATH, seed_rooms=range(block.first_room, min(block.first_room + 10, block.last_room + 1)))
+        floor = block.index * ID_SPAN
+        with database.get_conn(block.path) as conn:
+            c = conn.cursor()
+            for table in ('bookings', 'service_requests', 'outings'):
+                c.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?", (floor, table, floor))
+                c.execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)", (table, floor, table))
+            conn.commit()
+    _backfill_housed()
+
+
+def _backfill_housed():
+    # Directories from before the housed flag learn it once from the blocks' approved bookings
+    with database.get_conn(database.DB_PATH) as conn:
+        if conn.execute("SELECT 1 FROM bootstrap WHERE step = 'housed'").fetchone():
+            return
+    housed = []
+    for block in BLOCKS:
+        with database.get_conn(block.path) as conn:
+            housed += [(email, block.name) for (email,) in conn.execute("SELECT DISTINCT booked_by FROM bookings WHERE status = 'approved' AND booked_by IS NOT NULL")]
+    with database.get_conn(database.DB_PATH) as conn:
+        c = conn.cursor()
+        if conn.in_transaction:
+            conn.commit()
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT 1 FROM bootstrap WHERE step = 'housed'")
+        if c.fetchone() is None:
+            c.executemany("INSERT INTO resident_blocks (email, block, housed) VALUES (?, ?, 1) ON CONFLICT(email) DO UPDATE SET block = excluded.block, housed = 1", housed)
+            c.execute("INSERT INTO bootstrap (step, done_at) VALUES ('housed', datetime('now'))")
+        conn.commit()
+
+
+# -- routing -----------------------------------------------------------------
+
+def block_for_room(room_no):
+    for block in BLOCKS:
+        if block.first_room <= room_no <= block.last_room:
+            return block
+    return None
+
+
+def db_for_room(room_no):
+    """Database file holding room_no: its block's (None outside every block), or db_path() unsharded."""
+    if not BLOCKS:
+        return database.db_path()
+    block = block_for_room(room_no)
+    return block.path if block else None
+
+
+def block_for_id(id):
+    index = (id - 1) // ID_SPAN
+    return BLOCKS[index] if 0 <= index < len(BLOCKS) else None
+
+
+def block_for_resident(email):
+    with database.get_conn(database.DB_PATH) as conn:
+        c = conn.cursor()
+        c.execute("SELECT block FROM resident_blocks WHERE email = ?", (email,))
+        row = c.fetchone()
+    for block in BLOCKS:
+        if row and block.name == row[0]:
+            return block
+    return BLOCKS[0]
+
+
+def _note_first_booking(email, block):
+    # Only a resident's first accepted booking writes the directory; later ones just read it
+    if not email:
+        return
+    with database.get_conn(database.DB_PATH) as conn:
+        if conn.execute("SELECT 1 FROM resident_blocks WHERE email = ?", (email,)).fetchone():
+            return
+        conn.execute("INSERT OR IGNORE INTO resident_blocks (email, block) VALUES (?, ?)", (email, block.name))
+        conn.commit()
+
+
+def _claim(email, block):
+    """Mark email as housed in block, unless another block houses them (then False).
+    Check and claim are one statement, so two blocks cannot both approve a resident.
+    A successful claim is in flight until _release(email, block, claimed=True)."""
+    with database.get_conn(database.DB_PATH) as conn:
+        c = conn.execute(
+            "INSERT INTO resident_blocks (email, block, housed, claims) VALUES (?, ?, 1, 1) "
+            "ON CONFLICT(email) DO UPDATE SET block = excluded.block, housed = 1, claims = resident_blocks.claims + 1 "
+            "WHERE resident_blocks.housed = 0 OR resident_blocks.block = excluded.block",
+            (email, block.name),
+        )
+        conn.commit()
+    return c.rowcount == 1
+
+
+def _release(email, block, claimed):
+    """After block wrote an approval (claimed) or a revocation: end the claim, and clear the
+    housed flag if no claim is in flight and block holds no approved booking for email.
+    Claims are taken under DB_PATH's write lock, which this holds while it looks, so a
+    concurrent approval is either still counted or already committed in block."""
+    with database.get_conn(database.DB_PATH) as conn:
+        c = conn.cursor()
+        if conn.in_transaction:
+            conn.commit()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if claimed:
+                c.execute("UPDATE resident_blocks SET claims = claims - 1 WHERE email = ? AND block = ? AND claims > 0", (email, block.name))
+            c.execute("SELECT claims FROM resident_blocks WHERE email = ? AND block = ? AND housed = 1", (email, block.name))
+            row = c.fetchone()
+            if row and row[0] == 0 and _on(block, database.get_user_room.uncached, email) is None:
+                c.execute("UPDATE resident_blocks SET housed = 0 WHERE email = ? AND block = ?", (email, block.name))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def _housed_rejection(email):
+    return BookingRejected(f"Resident already has an approved room in block {block_for_resident(email).name}")
+
+
+def _on(block, fn, *args, **kwargs):
+    with database.use_db(block.path):
+        return fn(*args, **kwargs)
+
+
+def _fan_out(fn, *args, **kwargs):
+    """fn(*args, **kwargs) on every block in parallel; results in block order."""
+    return list(_executor.map(lambda block: _on(block, fn, *args, **kwargs), BLOCKS))
+
+
+def paths():
+    """Database files holding request data, in block (and so id) order."""
+    return [b.path for b in BLOCKS] or [database.DB_PATH]
+
+
+def resident_paths(email):
+    """Database files a resident's own data is read from: every block's, then DB_PATH (profile)."""
+    return list(dict.fromkeys(paths() + [database.DB_PATH]))
+
+
+# -- per-room and per-resident operations --------------------------------------
+
+def book_room(room_id, group_id, final_timestamp, group_sync_score, booked_by, roommates_count):
+    if not BLOCKS:
+        return database.book_room(room_id, group_id, final_timestamp, group_sync_score, booked_by, roommates_count)
+    block = block_for_room(room_id)
+    if block is None:
+        return None
+    id = _on(block, database.book_room, room_id, group_id, final_timestamp, group_sync_score, booked_by, roommates_count)
+    if id is not None:
+        _note_first_booking(booked_by, block)
+    return id
+
+
+def submit_service_request(room_id, description, resident_id=None):
+    if not BLOCKS:
+        return database.submit_service_request(room_id, description, resident_id)
+    block = block_for_room(room_id) or block_for_resident(resident_id)
+    return _on(block, database.submit_service_request, room_id, description, resident_id)
+
+
+def submit_outing_request(resident_id, start_time, end_time):
+    if not BLOCKS:
+        return database.submit_outing_request(resident_id, start_time, end_time)
+    return _on(block_for_resident(resident_id), database.submit_outing_request, resident_id, start_time, end_time)
+
+
+def get_user_room(email, fresh=False):
+    # fresh=True reads past the in-process memo (for results cached by data version)
+    fn = database.get_user_room.uncached if fresh else database.get_user_room
+    if not BLOCKS:
+        return fn(email)
+    return _on(block_for_resident(email), fn, email)
+
+
+def get_user_requests(email):
+    """database.get_user_requests on every block, merged: services, outings, then bookings, newest first."""
+    if not BLOCKS:
+        return database.get_user_requests(email)
+    order = {'service': 0, 'outing': 1, 'booking': 2}
+    return sorted((row for rows in _fan_out(database.get_user_requests, email) for row in rows), key=lambda row: (order[row[0]], -row[1]))
+
+
+# -- decisions ---------------------------------------------------------------
+
+def _booking(block, id):
+    """(booked_by, status) of a booking in block, or (None, None)."""
+    with database.get_conn(block.path) as conn:
+        c = conn.cursor()
+        c.execute("SELECT booked_by, status FROM bookings WHERE id = ?", (id,))
+        row = c.fetchone()
+    return row if row else (None, None)
+
+
+def update_request_status(type, id, status, reason):
+    if not BLOCKS:
+        return database.update_request_status(type, id, status, reason)
+    block = block_for_id(id)
+    if block is None:
+        return None
+    email, was = _booking(block, id) if type == 'booking' else (None, None)
+    claimed = bool(email) and status == 'approved'
+    if claimed and not _claim(email, block):
+        raise _housed_rejection(email)
+    ok = False
+    try:
+        result = _on(block, database.update_request_status, type, id, status, reason)
+        ok = True
+        return result
+    finally:
+        if claimed or (email and ok and was == 'approved'):
+            _release(email, block, claimed)
+
+
+def update_request_statuses(items):
+    """database.update_request_statuses per block, in parallel. Each block's share is
+    one transaction; a batch spanning blocks is not atomic across them."""
+    if not BLOCKS:
+        return database.update_request_statuses(items)
+    results = [None] * len(items)
+    groups = {}
+    claimed, revoked = {}, {}
+    for i, item in enumerate(items):
+        id = item.get('id')
+        block = block_for_id(id) if isinstance(id, int) else None
+        if block is None:
+            if isinstance(id, int) and item.get('type') in database.REQUEST_TYPES and item.get('status'):
+                results[i] = {'type': item.get('type'), 'id': id, 'ok': False, 'error': 'Not found'}
+                continue
+            # Let database report the validation error
+            block = BLOCKS[0]
+        if item.get('type') == 'booking' and isinstance(id, int):
+            email, was = _booking(block, id)
+            if email and item.get('status') == 'approved':
+                if not _claim(email, block):
+                    results[i] = {'type': 'booking', 'id': id, 'ok': False, 'error': str(_housed_rejection(email))}
+                    continue
+                claimed[i] = email
+            elif email and was == 'approved':
+                revoked[i] = email
+        groups.setdefault(block, []).append(i)
+    blocks = list(groups)
+    done = _executor.map(lambda block: _on(block, database.update_request_statuses, [items[i] for i in groups[block]]), blocks)
+    for block, block_results in zip(blocks, done):
+        for i, result in zip(groups[block], block_results):
+            results[i] = result
+            if i in claimed or (i in revoked and result['ok']):
+                _release(claimed.get(i) or revoked[i], block, i in claimed)
+    return results
+
+
+def allocate_pending_bookings(dry_run=True, honor_requested=True):
+    """Allocation per block (a booking only moves between rooms of its own block)."""
+    if not BLOCKS:
+        return database.allocate_pending_bookings(dry_run=dry_run, honor_requested=honor_requested)
+    # Block by block, so a resident with pending bookings in two blocks is placed only once
+    reports, placed = [], set()
+    for block in BLOCKS:
+        with database.get_conn(database.DB_PATH) as conn:
+            elsewhere = {email for (email,) in conn.execute("SELECT email FROM resident_blocks WHERE housed = 1 AND block != ?", (block.name,))}
+        report = _on(block, database.allocate_pending_bookings, dry_run=dry_run, honor_requested=honor_requested, housed_elsewhere=elsewhere | placed)
+        for a in report['assignments']:
+            placed.add(a['booked_by'])
+            if not dry_run and _claim(a['booked_by'], block):
+                _release(a['booked_by'], block, claimed=True)
+        reports.append(report)
+    return {
+        'dry_run': dry_run,
+        'assigned': sum(r['assigned'] for r in reports),
+        'unplaced': sum(r['unplaced'] for r in reports),
+        'blocks': {block.name: report for block, report in zip(BLOCKS, reports)},
+    }
+
+
+def dispatch_service_requests(limit=None, dry_run=True):
+    """Dispatch per block; each block has its own technicians. limit applies per block."""
+    if not BLOCKS:
+        return database.dispatch_service_requests(limit=limit, dry_run=dry_run)
+    reports = _fan_out(database.dispatch_service_requests, limit=limit, dry_run=dry_run)
+    return {
+        'dry_run': dry_run,
+        'assignments': [dict(a, block=block.name) for block, r in zip(BLOCKS, reports) for a in r['assignments']],
+        'waiting': sum(r['waiting'] for r in reports),
+        'blocks': {block.name: report for block, report in zip(BLOCKS, reports)},
+    }
+
+
+# -- warden-wide views ---------------------------------------------------------
+
+def get_pending_requests():
+    if not BLOCKS:
+        return database.get_pending_requests()
+    requests, counters = [], {'service': 0, 'outing': 0, 'booking': 0}
+    for block_requests, block_counters in _fan_out(database.get_pending_requests):
+        requests.extend(block_requests)
+        for type, n in block_counters.items():
+            counters[type] += n
+    # Same grouping as one database: services, then outings, then bookings
+    order = {'service': 0, 'outing': 1, 'booking': 2}
+    requests.sort(key=lambda row: order[row[1]])
+    return requests, counters
+
+
+def get_heatmap_data():
+    if not BLOCKS:
+        return database.get_heatmap_data()
+    return sorted(row for rows in _fan_out(database.get_heatmap_data) for row in rows)
+
+
+def get_bookings_heatmap():
+    if not BLOCKS:
+        return database.get_bookings_heatmap()
+    return sorted(row for rows in _fan_out(database.get_bookings_heatmap) for row in rows)
+
+
+def get_available_rooms():
+    if not BLOCKS:
+        return database.get_available_rooms()
+    return sorted((room for rooms in _fan_out(database.get_available_rooms) for room in rooms), key=lambda r: r['room_no'])
+
+
+def get_technicians():
+    if not BLOCKS:
+        return database.get_technicians()
+    return [dict(t, block=block.name) for block, techs in zip(BLOCKS, _fan_out(database.get_technicians)) for t in techs]
+
+
+def get_outings_during(start_epoch, end_epoch, statuses=('approved',)):
+    if not BLOCKS:
+        return database.get_outings_during(start_epoch, end_epoch, statuses)
+    rows = [row for rows in _fan_out(database.get_outings_during, start_epoch, end_epoch, statuses) for row in rows]
+    return sorted(rows, key=lambda r: (database.to_epoch(r['start_time']), r['id']))
+
+
+def get_next_resident_login(max_residents=60):
+    """The furthest suggestion of any block (suggestions count up as residents book)."""
+    if not BLOCKS:
+        return database.get_next_resident_login(max_residents)
+    suggestions = _fan_out(database.get_next_resident_login, max_residents)
+    if None in suggestions:
+        return None
+    return max(suggestions, key=lambda email: int(email[len('resident'):].split('@')[0]))
+
+
+def list_requests(types=None, status=None, room=None, resident=None, cursor=None, limit=50, include_total=False, with_room_services=False):
+    """database.list_requests across blocks. A room filter reads one block; otherwise
+    (a resident may have booked in several blocks) every block returns its first page after cursor and the pages are merged
+    in (type, id DESC) order, which works because ids are unique across blocks."""
+    kwargs = dict(types=types, status=status, room=room, resident=resident, cursor=cursor, limit=limit, include_total=include_total, with_room_services=with_room_services)
+    if not BLOCKS:
+        return database.list_requests(**kwargs)
+    if room is not None:
+        # A room outside every block has no requests; any block answers that
+        return _on(block_for_room(room) or BLOCKS[0], database.list_requests, **kwargs)
+    pages = _fan_out(database.list_requests, **kwargs)
+    limit = max(1, min(int(limit), database.MAX_PAGE_SIZE))
+    items = sorted((item for page in pages for item in page['items']), key=lambda item: (database.REQUEST_TYPES.index(item['type']), -item['id']))
+    more = len(items) > limit or any(page['next_cursor'] for page in pages)
+    items = items[:limit]
+    page = {'items': items, 'next_cursor': f"{items[-1]['type']}:{items[-1]['id']}" if more and items else None}
+    if include_total:
+        page['total'] = sum(p['total'] for p in pages)
+    return page
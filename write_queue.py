@@ -0,0 +1,161 @@
+"""Write-behind queue with group commit for small inserts.
+
+One writer thread per database drains a bounded queue and commits the
+queued inserts in batches of up to max_batch rows, waiting at most
+max_delay_ms for a batch to fill. Under a burst, many submitters share one
+transaction, so they stop competing for SQLite's write lock.
+
+Durability: submit() returns the new rowid only after the batch holding the
+row has committed, so an acknowledged write is exactly as durable as a
+direct commit on the same connection settings. Rows still queued when the
+process dies were never acknowledged. close_writers() (registered with
+atexit) drains the queue on a clean shutdown.
+
+Backpressure: the queue holds at most max_pending rows. When it is full,
+submit() waits up to enqueue_timeout seconds and then raises WriteQueueFull,
+which callers should turn into a retryable error (HTTP 503).
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from db_pool import get_pool
+
+MAX_BATCH = int(os.environ.get('WRITE_QUEUE_BATCH', '64'))
+MAX_DELAY_MS = float(os.environ.get('WRITE_QUEUE_DELAY_MS', '5'))
+MAX_PENDING = int(os.environ.get('WRITE_QUEUE_MAX_PENDING', '2000'))
+ENQUEUE_TIMEOUT = float(os.environ.get('WRITE_QUEUE_TIMEOUT', '1'))
+
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class GroupCommitWriter:
+    def __init__(self, path, max_batch=MAX_BATCH, max_delay_ms=MAX_DELAY_MS, max_pending=MAX_PENDING, enqueue_timeout=ENQUEUE_TIMEOUT):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name=f"group-commit:{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def submit_async(self, sql, params=()):
+        """Queue one INSERT; the returned Future resolves to its rowid once committed (None if no row was added)."""
+        if self._closed:
+            raise WriteQueueFull('write queue is closed')
+        future = Future()
+        try:
+            self._queue.put((sql, params, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise WriteQueueFull('write queue is full')
+        return future
+
+    def submit(self, sql, params=()):
+        """Queue one INSERT and block until it is committed; returns its rowid."""
+        return self.submit_async(sql, params).result()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def close(self):
+        """Stop accepting writes, commit everything already queued and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is _STOP:
+            return None, True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+        # Anything that slipped in behind the stop marker is refused, not dropped silently
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[2].set_exception(WriteQueueFull('write queue is closed'))
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with get_pool(self.path).connection() as conn:
+                c = conn.cursor()
+                c.execute("BEGIN IMMEDIATE")
+                for sql, params, future in batch:
+                    # A failing row (e.g. a constraint) only rolls back its own statement
+                    try:
+                        c.execute(sql, params)
+                        results.append((future, c.lastrowid if c.rowcount else None, None))
+                    except sqlite3.Error as exc:
+                        results.append((future, None, exc))
+                conn.commit()
+        except Exception as exc:
+            # Nothing in the batch was committed
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        for future, rowid, exc in results:
+            if exc is None:
+                future.set_result(rowid)
+            else:
+                future.set_exception(exc)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path):
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = GroupCommitWriter(path)
+    return writer
+
+
+def close_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_writers)